@@ -0,0 +1,3 @@
+"""
+FARMS airspeed velocity (asv) benchmarks.
+"""
@@ -0,0 +1,43 @@
+"""
+DISC model benchmarks.
+
+Run ``asv continuous <base> HEAD -b DISC`` to compare the vectorized DISC
+model against an earlier commit.
+"""
+
+import numpy as np
+
+from benchmarks.common import SCALES, domain_shape, require_memory
+from farms.disc import disc
+
+
+class DISC:
+    """Time and peak memory of disc() on (8760, n_sites) hourly data."""
+
+    params = [SCALES]
+    param_names = ['n_cells']
+    timeout = 600
+
+    def setup(self, n_cells):
+        """Make random hourly ghi, sza, and pressure inputs."""
+        require_memory(n_cells, cell_bytes=160)
+        rng = np.random.default_rng(0)
+        shape = domain_shape(n_cells)
+        self.ghi = rng.uniform(0, 1100, shape)
+        self.sza = rng.uniform(0, 100, shape)
+        self.doy = np.arange(shape[0]) // 24 % 365 + 1
+        self.pressure = rng.uniform(700, 1050, shape)
+        self.out = np.empty(shape)
+
+    def time_disc(self, n_cells):  # noqa: ARG002
+        """Time disc() with a 1D day of year."""
+        disc(self.ghi, self.sza, self.doy, pressure=self.pressure)
+
+    def time_disc_out(self, n_cells):  # noqa: ARG002
+        """Time disc() writing into a preallocated output array."""
+        disc(self.ghi, self.sza, self.doy, pressure=self.pressure,
+             out=self.out)
+
+    def peakmem_disc(self, n_cells):  # noqa: ARG002
+        """Peak memory of disc() with a 1D day of year."""
+        disc(self.ghi, self.sza, self.doy, pressure=self.pressure)
@@ -0,0 +1,86 @@
+"""
+FARMS and FARMS-DNI benchmarks.
+
+Time and peak memory of farms() and the FARMS-DNI stages on (8760, n_sites)
+domains of 1e3 to 1e8 cells and several cloud fractions. Scales that do not
+fit in the available memory are skipped.
+"""
+
+import numpy as np
+
+from benchmarks.common import CLOUD_FRACTIONS, SCALES, farms_inputs
+from farms import SOLAR_CONSTANT
+from farms.farms import farms
+from farms.farms_dni import TDD2, Pice, Pwater, farms_dni
+from farms.utilities import classify_cloud_type
+
+
+class FARMS:
+    """farms() over scales and cloud fractions."""
+
+    params = [SCALES, CLOUD_FRACTIONS]
+    param_names = ['n_cells', 'cloud_fraction']
+    timeout = 600
+
+    def setup(self, n_cells, cloud_fraction):
+        """Make synthetic inputs."""
+        self.inputs = farms_inputs(n_cells, cloud_fraction)
+
+    def time_farms(self, n_cells, cloud_fraction):  # noqa: ARG002
+        """Time farms() with the numpy backend."""
+        farms(**self.inputs)
+
+    def time_farms_lut(self, n_cells, cloud_fraction):  # noqa: ARG002
+        """Time farms() with the cloud optics lookup tables."""
+        farms(**self.inputs, lut=True)
+
+    def time_farms_compact(self, n_cells, cloud_fraction):  # noqa: ARG002
+        """Time farms() on the daylight cloudy cells only."""
+        farms(**self.inputs, compact=True)
+
+    def peakmem_farms(self, n_cells, cloud_fraction):  # noqa: ARG002
+        """Peak memory of farms() with the numpy backend."""
+        farms(**self.inputs)
+
+
+class FARMSDNI:
+    """farms_dni() and its Pwater, Pice, and TDD2 stages over scales."""
+
+    params = [SCALES]
+    param_names = ['n_cells']
+    timeout = 600
+
+    def setup(self, n_cells):
+        """Make synthetic FARMS-DNI inputs."""
+        inputs = farms_inputs(n_cells)
+        self.cosz = np.cos(np.radians(inputs['solar_zenith_angle']))
+        self.Z = inputs['solar_zenith_angle']
+        self.tau = inputs['tau']
+        self.De = 2 * inputs['cloud_effective_radius']
+        self.phase = classify_cloud_type(inputs['cloud_type'])
+        self.F0 = SOLAR_CONSTANT / inputs['radius']**2
+        self.Tddclr = inputs['Tddclr']
+        self.Ftotal = 0.6 * self.F0 * self.cosz
+        self.F1 = 0.9 * self.Ftotal
+
+    def time_farms_dni(self, n_cells):  # noqa: ARG002
+        """Time farms_dni()."""
+        farms_dni(self.F0, self.tau, self.cosz, self.De, self.phase,
+                  self.Tddclr, self.Ftotal, self.F1)
+
+    def time_pwater(self, n_cells):  # noqa: ARG002
+        """Time the water cloud DNI transmittance."""
+        Pwater(self.Z, self.tau, self.De)
+
+    def time_pice(self, n_cells):  # noqa: ARG002
+        """Time the ice cloud DNI transmittance."""
+        Pice(self.Z, self.tau, self.De)
+
+    def time_tdd2(self, n_cells):  # noqa: ARG002
+        """Time the circumsolar surface-cloud reflection."""
+        TDD2(self.Z, self.Ftotal, self.F1)
+
+    def peakmem_farms_dni(self, n_cells):  # noqa: ARG002
+        """Peak memory of farms_dni()."""
+        farms_dni(self.F0, self.tau, self.cosz, self.De, self.phase,
+                  self.Tddclr, self.Ftotal, self.F1)
@@ -0,0 +1,23 @@
+"""
+Import time benchmarks.
+
+Worker processes pay the package import cost every time they start, so the
+compute modules must not import pandas or pytest or parse the packaged CSV
+tables at import time.
+"""
+
+
+def timeraw_import_farms():
+    """Time importing the FARMS compute module in a fresh interpreter."""
+    return 'import farms.farms'
+
+
+def timeraw_import_utilities():
+    """Time importing the FARMS utilities in a fresh interpreter."""
+    return 'import farms.utilities'
+
+
+def timeraw_import_radius_csv():
+    """Time importing FARMS and loading the pandas RADIUS table (the
+    import cost before resources were loaded lazily)."""
+    return 'import farms\nfarms.RADIUS'
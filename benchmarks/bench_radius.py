@@ -0,0 +1,47 @@
+"""
+Sun-earth radius vector benchmarks.
+
+ti_to_radius() evaluates the SPA heliocentric radius with a module-level
+cache of computed timesteps, ti_to_radius_csv() looks up the day-of-year
+climatology. Scales are the number of (time, site) cells of the broadcast
+(n_times, n_cols) output with up to 1e6 timesteps.
+"""
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import SCALES, require_memory
+from farms import utilities
+from farms.utilities import ti_to_radius, ti_to_radius_csv
+
+
+class Radius:
+    """ti_to_radius() and ti_to_radius_csv() over scales."""
+
+    params = [SCALES]
+    param_names = ['n_cells']
+
+    def setup(self, n_cells):
+        """Make a 5-minute time index and the number of columns."""
+        require_memory(n_cells, cell_bytes=16)
+        n_times = min(n_cells, 10**6)
+        self.ti = pd.date_range('2000-01-01', periods=n_times, freq='5min')
+        self.n_cols = max(n_cells // n_times, 1)
+
+    def time_ti_to_radius(self, n_cells):  # noqa: ARG002
+        """Time ti_to_radius() with a warm cache."""
+        ti_to_radius(self.ti, n_cols=self.n_cols, broadcast=True)
+
+    def time_ti_to_radius_cold(self, n_cells):  # noqa: ARG002
+        """Time ti_to_radius() with an empty cache."""
+        utilities._RADIUS_CACHE.update(jme=np.empty(0), radius=np.empty(0))
+        ti_to_radius(self.ti, n_cols=self.n_cols, broadcast=True)
+
+    def time_ti_to_radius_csv(self, n_cells):  # noqa: ARG002
+        """Time the day-of-year climatology lookup."""
+        ti_to_radius_csv(self.ti, n_cols=self.n_cols, broadcast=True)
+
+    def peakmem_ti_to_radius(self, n_cells):  # noqa: ARG002
+        """Peak memory of ti_to_radius() with an empty cache."""
+        utilities._RADIUS_CACHE.update(jme=np.empty(0), radius=np.empty(0))
+        ti_to_radius(self.ti, n_cols=self.n_cols, broadcast=True)
@@ -0,0 +1,42 @@
+"""
+REST2 clear-sky transmittance benchmarks.
+
+rest2() evaluates the angle-independent gas and aerosol terms once per cell
+and integrates Tuuclr with a fixed-node quadrature. Scales are the number
+of (time, site) cells of an hourly year.
+"""
+
+import numpy as np
+
+from benchmarks.common import SCALES, domain_shape, require_memory
+from farms.rest2 import rest2
+
+
+class Rest2:
+    """rest2() over scales."""
+
+    params = [SCALES]
+    param_names = ['n_cells']
+
+    def setup(self, n_cells):
+        """Make random REST2 inputs."""
+        require_memory(n_cells, cell_bytes=640)
+        shape = domain_shape(n_cells)
+        rng = np.random.default_rng(0)
+        self.inputs = {
+            'solar_zenith_angle': rng.uniform(0, 89, shape),
+            'pressure': rng.uniform(700, 1013.25, shape),
+            'ozone': rng.uniform(0.2, 0.45, shape),
+            'w': rng.uniform(0.1, 5, shape),
+            'aod': rng.uniform(0.01, 0.8, shape),
+            'alpha': rng.uniform(0, 2.5, shape),
+            'ssa': rng.uniform(0.8, 0.99, shape),
+        }
+
+    def time_rest2(self, n_cells):  # noqa: ARG002
+        """Time the REST2 transmittances with the Tuuclr quadrature."""
+        rest2(**self.inputs)
+
+    def peakmem_rest2(self, n_cells):  # noqa: ARG002
+        """Peak memory of the REST2 transmittances."""
+        rest2(**self.inputs)
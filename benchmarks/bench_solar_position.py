@@ -0,0 +1,53 @@
+"""
+Solar position benchmarks.
+
+solar_zenith_angle() evaluates the time-only SPA terms once per timestep
+and the hour angle, parallax, and refraction terms per (time, site) cell.
+mean_solar_zenith_angle() integrates cos(sza) analytically over each period.
+Scales are the number of (time, site) cells of an hourly year.
+"""
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import SCALES, domain_shape, require_memory
+from farms.solar_position import (
+    mean_solar_zenith_angle,
+    solar_time_terms,
+    solar_zenith_angle,
+)
+
+
+class SolarZenithAngle:
+    """solar_zenith_angle() over scales."""
+
+    params = [SCALES]
+    param_names = ['n_cells']
+
+    def setup(self, n_cells):
+        """Make an hourly time index and random sites."""
+        require_memory(n_cells, cell_bytes=96)
+        n_times, n_sites = domain_shape(n_cells)
+        rng = np.random.default_rng(0)
+        self.ti = pd.date_range('2019-01-01', periods=n_times, freq='h')
+        self.lat = rng.uniform(-60, 60, n_sites)
+        self.lon = rng.uniform(-180, 180, n_sites)
+        self.elevation = rng.uniform(0, 3000, n_sites)
+        self.terms = solar_time_terms(self.ti)
+
+    def time_solar_zenith_angle(self, n_cells):  # noqa: ARG002
+        """Time the full SPA zenith angle."""
+        solar_zenith_angle(self.ti, self.lat, self.lon, self.elevation)
+
+    def time_solar_zenith_angle_cached(self, n_cells):  # noqa: ARG002
+        """Time the per-cell terms with precomputed time terms."""
+        solar_zenith_angle(self.ti, self.lat, self.lon, self.elevation,
+                           time_terms=self.terms)
+
+    def time_mean_solar_zenith_angle(self, n_cells):  # noqa: ARG002
+        """Time the hourly-averaged zenith angle."""
+        mean_solar_zenith_angle(self.ti, self.lat, self.lon, period='1h')
+
+    def peakmem_solar_zenith_angle(self, n_cells):  # noqa: ARG002
+        """Peak memory of the full SPA zenith angle."""
+        solar_zenith_angle(self.ti, self.lat, self.lon, self.elevation)
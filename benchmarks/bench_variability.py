@@ -0,0 +1,36 @@
+"""
+Synthetic cloud variability benchmarks.
+"""
+
+import numpy as np
+
+from benchmarks.common import CLOUD_FRACTIONS, SCALES, farms_inputs
+from farms.utilities import cloud_variability
+
+
+class CloudVariability:
+    """cloud_variability() over scales, cloud fractions, and generators."""
+
+    params = [SCALES, CLOUD_FRACTIONS, ['legacy', 'philox']]
+    param_names = ['n_cells', 'cloud_fraction', 'generator']
+    timeout = 600
+
+    def setup(self, n_cells, cloud_fraction, generator):  # noqa: ARG002
+        """Make synthetic clear-sky and all-sky irradiance."""
+        inputs = farms_inputs(n_cells, cloud_fraction)
+        cosz = np.cos(np.radians(inputs['solar_zenith_angle']))
+        self.cs_irrad = 1000 * cosz
+        self.irrad = self.cs_irrad * inputs['Tddclr']
+        self.cloud_type = inputs['cloud_type']
+        self.generator = generator
+
+    def time_cloud_variability(self, *params):  # noqa: ARG002
+        """Time cloud_variability() with the uniform distribution."""
+        cloud_variability(self.irrad.copy(), self.cs_irrad, self.cloud_type,
+                          generator=self.generator)
+
+    def peakmem_cloud_variability(self, *params):  # noqa: ARG002
+        """Peak memory of cloud_variability() with the uniform
+        distribution."""
+        cloud_variability(self.irrad.copy(), self.cs_irrad, self.cloud_type,
+                          generator=self.generator)
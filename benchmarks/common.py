@@ -0,0 +1,49 @@
+"""
+Shared benchmark scales and input generators.
+"""
+
+import os
+
+import numpy as np
+
+from farms.precision import sample_inputs
+
+# Approximate number of (time, site) cells of the benchmark domains
+SCALES = [10**3, 10**4, 10**5, 10**6, 10**7, 10**8]
+
+# Fractions of cloudy cells
+CLOUD_FRACTIONS = [0.2, 0.6, 1.0]
+
+# Approximate peak bytes per cell of farms() including its float64 inputs
+CELL_BYTES = 320
+
+
+def domain_shape(n_cells, n_times=8760):
+    """Get a (time, sites) shape with about n_cells cells and up to one year
+    of hourly timesteps."""
+    n_times = min(n_cells, n_times)
+    return (n_times, max(n_cells // n_times, 1))
+
+
+def require_memory(n_cells, cell_bytes=CELL_BYTES):
+    """Skip a benchmark (asv skips on NotImplementedError in setup) if its
+    working set does not fit in the available physical memory."""
+    try:
+        available = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return
+
+    if n_cells * cell_bytes > available:
+        msg = 'Not enough memory for {} cells'.format(n_cells)
+        raise NotImplementedError(msg)
+
+
+def farms_inputs(n_cells, cloud_fraction=0.6, seed=0):
+    """Make synthetic farms() inputs with about n_cells cells."""
+    require_memory(n_cells)
+    inputs = sample_inputs(shape=domain_shape(n_cells), seed=seed,
+                           cloud_fraction=cloud_fraction)
+    inputs['radius'] = np.broadcast_to(inputs['radius'],
+                                       inputs['tau'].shape)
+
+    return inputs
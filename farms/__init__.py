@@ -23,25 +23,48 @@ cloud_types:
 
 import os
 
-import pandas as pd
-
 from .version import __version__
 
 FARMSDIR = os.path.dirname(os.path.realpath(__file__))
 
-RADIUS = pd.read_csv(
-    os.path.join(FARMSDIR, "sun_earth_radius_vector.csv")
-).set_index("doy")
-
 # Constant clear/cloudy integer labels for use of AllSky
 CLEAR_TYPES = (0, 1, 11, 12)
 WATER_TYPES = (2, 3, 4, 5, 10)
 ICE_TYPES = (6, 7, 8, 9)
 CLOUD_TYPES = WATER_TYPES + ICE_TYPES
 
+# Cloud type categories (see farms.utilities.classify_cloud_type). The water
+# and ice categories match the cloud phase codes used by FARMS-DNI.
+CATEGORY_OTHER = 0
+CATEGORY_WATER = 1
+CATEGORY_ICE = 2
+CATEGORY_CLEAR = 3
+
 # Solar constant global variable. Flux density value measuring mean solar
 # electromagnetic radiation per unit area, default is 1361.2 (W/m2).
 SOLAR_CONSTANT = 1361.2
 
 # Truncate irrad data when sza > this SZA limit
 SZA_LIM = 89.0
+
+
+def __getattr__(name):
+    """Lazily load package resources that require pandas.
+
+    ``RADIUS`` (the sun-earth radius vector by day of year as a pandas
+    DataFrame) is only read on first access so that importing farms does not
+    import pandas. The compute modules use the binary NumPy copies of the
+    packaged tables instead, see :func:`farms.utilities.radius_by_doy`.
+    """
+    if name == "RADIUS":
+        import pandas as pd
+
+        radius = pd.read_csv(
+            os.path.join(FARMSDIR, "sun_earth_radius_vector.csv")
+        ).set_index("doy")
+        globals()["RADIUS"] = radius
+
+        return radius
+
+    msg = "module {!r} has no attribute {!r}".format(__name__, name)
+    raise AttributeError(msg)
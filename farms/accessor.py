@@ -0,0 +1,143 @@
+"""
+xarray Dataset accessor for lazy (dask) FARMS execution.
+
+Importing this module registers a ``farms`` accessor on xarray Datasets::
+
+    import farms.accessor  # noqa: F401
+
+    ds = xr.open_mfdataset(files, chunks={'time': 24, 'lat': 100})
+    out = ds.farms.run(lut=True)
+    out.to_zarr('farms.zarr')
+
+:meth:`FarmsAccessor.run` maps :func:`farms.farms.farms` over the dask
+chunks of the Dataset with :func:`xarray.map_blocks` so the outputs stay
+lazy until they are computed or written. Requires the optional ``xarray``
+and ``dask`` dependencies (``pip install NREL-farms[xarray]``).
+"""
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from farms.farms import FARMS_INPUTS, FARMS_OUTPUTS, farms
+from farms.utilities import ti_to_radius
+
+# Default Dataset variable names (NSRDB conventions) of the FARMS inputs
+VAR_NAMES = {
+    'tau': 'cld_opd_dcomp',
+    'cloud_type': 'cloud_type',
+    'cloud_effective_radius': 'cld_reff_dcomp',
+    'solar_zenith_angle': 'solar_zenith_angle',
+    'radius': 'radius',
+    'Tuuclr': 'Tuuclr',
+    'Ruuclr': 'Ruuclr',
+    'Tddclr': 'Tddclr',
+    'Tduclr': 'Tduclr',
+    'albedo': 'surface_albedo',
+}
+
+
+@xr.register_dataset_accessor('farms')
+class FarmsAccessor:
+    """FARMS accessor for xarray Datasets (``ds.farms``)."""
+
+    def __init__(self, ds):
+        """
+        Parameters
+        ----------
+        ds : xr.Dataset
+            Dataset with the FARMS input variables, e.g. with
+            (time, lat, lon) dimensions.
+        """
+        self._ds = ds
+
+    def inputs(self, names=None, time_dim='time'):
+        """Get a Dataset with only the FARMS inputs, keyed by the
+        :func:`farms.farms.farms` argument names.
+
+        Parameters
+        ----------
+        names : dict | None
+            Optional {farms argument name: Dataset variable name} overrides
+            of VAR_NAMES.
+        time_dim : str
+            Name of the time dimension. If the Dataset has no radius
+            variable, the sun-earth radius vector is computed from this
+            coordinate with :func:`farms.utilities.ti_to_radius`.
+
+        Returns
+        -------
+        inputs : xr.Dataset
+            Dataset with one variable per FARMS input (see FARMS_INPUTS).
+        """
+        names = {**VAR_NAMES, **(names or {})}
+        variables = {}
+        for arg in FARMS_INPUTS:
+            name = names[arg]
+            if name in self._ds:
+                variables[arg] = self._ds[name]
+            elif arg == 'radius':
+                time_index = pd.DatetimeIndex(self._ds[time_dim].values)
+                radius = ti_to_radius(time_index).ravel()
+                variables[arg] = xr.DataArray(
+                    radius, dims=(time_dim,),
+                    coords={time_dim: self._ds[time_dim]})
+            else:
+                msg = 'Dataset is missing FARMS input "{}" ({})'.format(
+                    name, arg)
+                raise KeyError(msg)
+
+        return xr.Dataset(variables)
+
+    def run(self, names=None, time_dim='time', **kwargs):
+        """Run FARMS lazily over the chunks of the Dataset.
+
+        Parameters
+        ----------
+        names : dict | None
+            Optional {farms argument name: Dataset variable name} overrides
+            of VAR_NAMES.
+        time_dim : str
+            Name of the time dimension, used to compute the sun-earth radius
+            vector if the Dataset has no radius variable.
+        kwargs : dict
+            Additional keyword arguments for :func:`farms.farms.farms`, e.g.
+            backend, lut, or dtype. debug=True is not supported.
+
+        Returns
+        -------
+        out : xr.Dataset
+            Dataset with ghi, dni_farmsdni, and dni0 (see FARMS_OUTPUTS) on
+            the broadcast dimensions and coordinates of the inputs. Backed
+            by dask arrays (lazy) if the inputs are chunked.
+        """
+        if kwargs.get('debug', False):
+            msg = 'ds.farms.run() does not support debug=True'
+            raise ValueError(msg)
+
+        inputs = self.inputs(names=names, time_dim=time_dim)
+        ref = xr.broadcast(*inputs.data_vars.values())[0]
+
+        dtype = kwargs.get('dtype')
+        if dtype is None:
+            floats = [arr.dtype for arr in inputs.data_vars.values()
+                      if arr.dtype.kind == 'f']
+            dtype = np.result_type(*floats, np.float32)
+
+        template = xr.Dataset({name: xr.zeros_like(ref, dtype=dtype)
+                               for name in FARMS_OUTPUTS})
+
+        return xr.map_blocks(_run_block, inputs, args=(ref.dims,),
+                             kwargs=kwargs, template=template)
+
+
+def _run_block(inputs, dims, **kwargs):
+    """Run FARMS on one in-memory block of the inputs Dataset."""
+    arrays = xr.broadcast(*(inputs[name] for name in FARMS_INPUTS))
+    arrays = [arr.transpose(*dims) for arr in arrays]
+    out = farms(*(arr.values for arr in arrays), **kwargs)
+    coords = arrays[0].coords
+
+    return xr.Dataset({name: (dims, data)
+                       for name, data in zip(FARMS_OUTPUTS, out)},
+                      coords=coords)
@@ -0,0 +1,170 @@
+"""
+Fused all-sky irradiance pipeline.
+
+The all-sky irradiance is computed by screening the cloud properties and
+solar zenith angle, running FARMS for the cloudy cells, merging FARMS with
+the REST2 clear-sky irradiance, computing DHI, and zeroing the irradiance at
+night. Calling the corresponding functions in :mod:`farms.utilities` one
+after another traverses (and mostly copies) the full (time, sites) arrays at
+every stage. :func:`all_sky` instead runs all stages on one cache-sized
+block of the domain at a time, computes the cloud-type classification and
+the screened solar zenith angle once per block, and writes the final
+irradiance directly into (optionally caller-provided) output arrays.
+"""
+
+import numpy as np
+
+from farms import CATEGORY_CLEAR, SZA_LIM
+from farms.chunking import estimate_cell_bytes, iter_chunks, plan_chunks
+from farms.farms import farms
+from farms.utilities import classify_cloud_type
+
+# Names of the arrays returned by all_sky()
+ALL_SKY_OUTPUTS = ('ghi', 'dni', 'dhi')
+
+# Default working-set memory budget (bytes) of a single all-sky block
+BLOCK_MEMORY = 8 * 1024**2
+
+
+def all_sky(
+    tau,
+    cloud_type,
+    cloud_effective_radius,
+    solar_zenith_angle,
+    radius,
+    Tuuclr,
+    Ruuclr,
+    Tddclr,
+    Tduclr,
+    albedo,
+    clearsky_ghi,
+    clearsky_dni,
+    out=None,
+    sza_lim=SZA_LIM,
+    cld_range=(0, 160),
+    chunks=None,
+    **kwargs,
+):
+    """Compute all-sky ghi, dni, and dhi from cloud properties and REST2
+    clear-sky outputs in a single blocked pass.
+
+    Equivalent to running :func:`farms.utilities.screen_sza`,
+    :func:`farms.utilities.screen_cld` (on tau and the effective radius),
+    :func:`farms.farms.farms`, :func:`farms.utilities.merge_rest_farms`,
+    :func:`farms.utilities.calc_dhi`, and :func:`farms.utilities.dark_night`
+    in sequence, except that none of the inputs are modified.
+
+    See :func:`farms.farms.farms` for a description of the FARMS array
+    parameters. All arrays must be broadcastable to a common
+    (n_times, n_sites) shape, e.g. radius can be (n_times, 1).
+
+    Parameters
+    ----------
+    clearsky_ghi : np.ndarray
+        REST2 clear-sky global horizontal irradiance (W/m2).
+    clearsky_dni : np.ndarray
+        REST2 clear-sky direct normal irradiance (W/m2).
+    out : tuple | None
+        Optional preallocated (ghi, dni, dhi) output arrays with the full
+        domain shape. Allocated if not given.
+    sza_lim : float
+        Solar zenith angle limit (degrees). The solar zenith angle is
+        truncated at this value for FARMS and all irradiance is set to zero
+        where the solar zenith angle is >= this value.
+    cld_range : tuple
+        Inclusive range that tau and the cloud effective radius are
+        screened to. NaN cloud properties are set to zero.
+    chunks : tuple | None
+        (time, sites) block shape. Defaults to blocks of full rows that fit
+        the FARMS working set in BLOCK_MEMORY bytes.
+    kwargs : dict
+        Additional keyword arguments for :func:`farms.farms.farms`, e.g.
+        backend, lut, or dtype. debug=True is not supported.
+
+    Returns
+    -------
+    ghi : np.ndarray
+        All-sky global horizontal irradiance (W/m2).
+    dni : np.ndarray
+        All-sky direct normal irradiance (W/m2).
+    dhi : np.ndarray
+        All-sky diffuse horizontal irradiance (W/m2).
+    """
+    if kwargs.get('debug', False):
+        msg = 'all_sky does not support debug=True'
+        raise ValueError(msg)
+
+    arrays = (tau, cloud_type, cloud_effective_radius, solar_zenith_angle,
+              radius, Tuuclr, Ruuclr, Tddclr, Tduclr, albedo, clearsky_ghi,
+              clearsky_dni)
+    arrays = [np.asarray(arr) for arr in arrays]
+    shape = np.broadcast(*arrays).shape
+    arrays = [np.broadcast_to(arr, shape) for arr in arrays]
+
+    dtype = kwargs.get('dtype')
+    if dtype is None:
+        floats = [arr for arr in arrays if arr.dtype.kind == 'f']
+        dtype = np.result_type(*floats, np.float32)
+
+    if out is None:
+        out = tuple(np.empty(shape, dtype=dtype) for _ in ALL_SKY_OUTPUTS)
+
+    if chunks is None:
+        backend = kwargs.get('backend', 'numpy')
+        cell_bytes = estimate_cell_bytes(dtype, backend=backend)
+        chunks = plan_chunks(shape, BLOCK_MEMORY, cell_bytes)
+
+    for block in iter_chunks(shape, chunks):
+        _all_sky_block([arr[block] for arr in arrays],
+                       [arr[block] for arr in out],
+                       sza_lim, cld_range, kwargs)
+
+    return out
+
+
+def _screen_cld(cld_data, rng):
+    """Copy of cloud property data with NaN set to zero and then clipped to
+    rng (see :func:`farms.utilities.screen_cld`)."""
+    cld_data = np.nan_to_num(cld_data, nan=0)
+    return np.clip(cld_data, *rng, out=cld_data)
+
+
+def _all_sky_block(arrays, out, sza_lim, cld_range, kwargs):
+    """Run the all-sky pipeline on one block and write into the outputs."""
+    (tau, cloud_type, reff, sza, radius, Tuuclr, Ruuclr, Tddclr, Tduclr,
+     albedo, clearsky_ghi, clearsky_dni) = arrays
+    ghi, dni, dhi = out
+
+    # shared sza conditioning and cloud-type classification
+    sza = np.minimum(sza, sza_lim)
+    night = sza >= sza_lim
+    category = classify_cloud_type(cloud_type)
+    clear = category == CATEGORY_CLEAR
+
+    cloudy_ghi, cloudy_dni, _ = farms(
+        _screen_cld(tau, cld_range),
+        cloud_type,
+        _screen_cld(reff, cld_range),
+        sza,
+        radius,
+        Tuuclr,
+        Ruuclr,
+        Tddclr,
+        Tduclr,
+        albedo,
+        category=category,
+        **kwargs,
+    )
+
+    # merge REST2 and FARMS
+    np.copyto(ghi, cloudy_ghi)
+    np.copyto(ghi, clearsky_ghi, where=clear, casting='same_kind')
+    np.copyto(dni, cloudy_dni)
+    np.copyto(dni, clearsky_dni, where=clear, casting='same_kind')
+
+    # dhi (non-negative) and dark night
+    np.multiply(dni, np.cos(np.radians(sza)), out=dhi, casting='same_kind')
+    np.subtract(ghi, dhi, out=dhi)
+    np.maximum(dhi, 0, out=dhi)
+    for arr in out:
+        arr[night] = 0
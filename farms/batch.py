@@ -0,0 +1,361 @@
+"""
+HDF5 file-to-file FARMS batch runner.
+
+Reads NSRDB-style (time, sites) HDF5 datasets (cloud properties, solar
+zenith angle, and REST2 clear-sky outputs) in blocks of whole storage
+chunks, un-scales integer data with the dataset scale factor attributes,
+runs the fused all-sky pipeline (:func:`farms.all_sky.all_sky`), and writes
+compressed ghi, dni, and dhi datasets. Both the NSRDB convention (stored
+values are the data multiplied by ``psm_scale_factor``) and the CF
+convention (data is the stored values times ``scale_factor`` plus
+``add_offset``) are supported. Blocks can be processed on a thread
+pool. Requires the optional ``h5py`` dependency
+(``pip install NREL-farms[h5]``). See also the ``farms`` command line
+interface in :mod:`farms.cli`.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import h5py
+import numpy as np
+import pandas as pd
+
+from farms.all_sky import ALL_SKY_OUTPUTS, all_sky
+from farms.chunking import iter_chunks, plan_chunks
+from farms.utilities import ti_to_radius
+
+# Default HDF5 dataset names (NSRDB conventions) of the all_sky() inputs
+DSET_NAMES = {
+    'tau': 'cld_opd_dcomp',
+    'cloud_type': 'cloud_type',
+    'cloud_effective_radius': 'cld_reff_dcomp',
+    'solar_zenith_angle': 'solar_zenith_angle',
+    'Tuuclr': 'Tuuclr',
+    'Ruuclr': 'Ruuclr',
+    'Tddclr': 'Tddclr',
+    'Tduclr': 'Tduclr',
+    'albedo': 'surface_albedo',
+    'clearsky_ghi': 'clearsky_ghi',
+    'clearsky_dni': 'clearsky_dni',
+}
+
+# Dataset attributes holding the factor that stored values are divided by
+# (NSRDB convention)
+SCALE_ATTRS = ('psm_scale_factor',)
+
+# Dataset attributes holding the factor that stored values are multiplied by
+# and the offset added afterwards (CF convention)
+CF_SCALE_ATTRS = ('scale_factor', 'add_offset')
+
+# Meta datasets copied from the inputs to the output file if present
+META_DSETS = ('time_index', 'meta', 'coordinates')
+
+# Default memory budget (bytes) for the inputs and outputs of all
+# concurrently processed blocks
+MAX_MEMORY = 1024**3
+
+# Bytes per (time, site) cell of a block: 11 float64 inputs, the cloud type,
+# and 3 outputs
+CELL_BYTES = 128
+
+# Serializes the HDF5 dataset reads and writes of the worker threads. h5py
+# holds a global lock for every HDF5 call anyway, so reading (including
+# decompression) and writing are never parallel. Only the scaling and FARMS
+# computations of the blocks run outside the lock.
+_H5_LOCK = threading.Lock()
+
+
+def get_scale_factor(dset):
+    """Get the factor that the stored values of a dataset are divided by.
+
+    Parameters
+    ----------
+    dset : h5py.Dataset
+        HDF5 dataset.
+
+    Returns
+    -------
+    scale_factor : float
+        Scale factor (1 if the dataset has none of SCALE_ATTRS).
+    """
+    for attr in SCALE_ATTRS:
+        if attr in dset.attrs:
+            return float(dset.attrs[attr])
+
+    return 1.0
+
+
+def get_cf_scaling(dset):
+    """Get the CF convention packing attributes of a dataset.
+
+    Parameters
+    ----------
+    dset : h5py.Dataset
+        HDF5 dataset.
+
+    Returns
+    -------
+    scale_factor : float
+        Factor the stored values are multiplied by (1 if not set).
+    add_offset : float
+        Offset added to the scaled values (0 if not set).
+    """
+    attr_scale, attr_offset = CF_SCALE_ATTRS
+    return (float(dset.attrs.get(attr_scale, 1.0)),
+            float(dset.attrs.get(attr_offset, 0.0)))
+
+
+def read_scaled(dset, block, dtype=np.float64):
+    """Read a block of a dataset and apply its scale factor.
+
+    Parameters
+    ----------
+    dset : h5py.Dataset
+        HDF5 dataset.
+    block : tuple
+        Slices selecting the block.
+    dtype : np.dtype | str
+        Floating point dtype of scaled data.
+
+    Returns
+    -------
+    data : np.ndarray
+        Block data divided by the NSRDB scale factor of the dataset, or
+        multiplied by the CF scale factor plus the CF offset. Integer data
+        without scaling attributes is returned as is (e.g. cloud_type).
+    """
+    return _unscale(dset[block], get_scale_factor(dset),
+                    *get_cf_scaling(dset), dtype=dtype)
+
+
+def _unscale(data, scale_factor, cf_scale, cf_offset, dtype=np.float64):
+    """Apply the NSRDB and CF scaling to stored data (see
+    :func:`read_scaled`)."""
+    scaled = scale_factor != 1 or cf_scale != 1 or cf_offset != 0
+    if scaled or data.dtype.kind == 'f':
+        data = data.astype(dtype, copy=False)
+        if scale_factor != 1:
+            data /= scale_factor
+        if cf_scale != 1:
+            data *= cf_scale
+        if cf_offset != 0:
+            data += cf_offset
+
+    return data
+
+
+def read_time_index(f):
+    """Read the NSRDB-style time_index dataset of an HDF5 file.
+
+    Parameters
+    ----------
+    f : h5py.File
+        Open HDF5 file.
+
+    Returns
+    -------
+    time_index : pd.DatetimeIndex
+        Time index of the file.
+    """
+    time_index = f['time_index'][...]
+
+    if time_index.dtype.kind in 'SO':
+        time_index = [t.decode() if isinstance(t, bytes) else t
+                      for t in time_index]
+
+    return pd.DatetimeIndex(pd.to_datetime(time_index))
+
+
+def aligned_chunks(shape, storage_chunks, max_memory, cell_bytes=CELL_BYTES):
+    """Choose a (time, sites) block shape of whole storage chunks that fits
+    within a memory budget.
+
+    Blocks span the full time axis whenever possible (FARMS outputs are
+    typically stored as full site time series) and then as many storage
+    chunk columns of sites as fit in the budget. Blocks of contiguous
+    (unchunked) datasets are sized from the budget alone, see
+    :func:`farms.chunking.plan_chunks`.
+
+    Parameters
+    ----------
+    shape : tuple
+        (n_times, n_sites) shape of the datasets.
+    storage_chunks : tuple | None
+        HDF5 storage chunk shape, None for contiguous datasets.
+    max_memory : int | float
+        Memory budget in bytes for a single block.
+    cell_bytes : int | float
+        Memory per cell of a block.
+
+    Returns
+    -------
+    chunks : tuple
+        (time, sites) block shape.
+    """
+    if storage_chunks is None:
+        return plan_chunks(shape, max(max_memory, cell_bytes), cell_bytes)
+
+    n_cells = max(int(max_memory // cell_bytes), 1)
+    n_chunk_cells = storage_chunks[0] * storage_chunks[1]
+    n_fit = max(n_cells // n_chunk_cells, 1)
+
+    n_time_chunks = -(-shape[0] // storage_chunks[0])
+    if n_fit >= n_time_chunks:
+        n_site_chunks = n_fit // n_time_chunks
+    else:
+        n_time_chunks, n_site_chunks = n_fit, 1
+
+    return (min(shape[0], n_time_chunks * storage_chunks[0]),
+            min(shape[1], n_site_chunks * storage_chunks[1]))
+
+
+def run_file(
+    in_fpaths,
+    out_fpath,
+    names=None,
+    max_memory=MAX_MEMORY,
+    n_workers=1,
+    out_dtype='float32',
+    scale_factor=None,
+    compression='gzip',
+    compression_opts=4,
+    **kwargs,
+):
+    """Run the all-sky pipeline from HDF5 inputs to an HDF5 output file.
+
+    Parameters
+    ----------
+    in_fpaths : str | list
+        One or more HDF5 files with the input datasets (see DSET_NAMES),
+        e.g. a cloud file and a REST2 file. Each dataset is read from the
+        first file that has it. The time_index dataset is used to compute
+        the sun-earth radius vector.
+    out_fpath : str
+        Output HDF5 file path (overwritten).
+    names : dict | None
+        Optional {all_sky argument name: dataset name} overrides of
+        DSET_NAMES.
+    max_memory : int | float
+        Memory budget in bytes for the inputs and outputs of all
+        concurrently processed blocks.
+    n_workers : int
+        Number of threads processing blocks. Reading, decompressing, and
+        writing the HDF5 datasets is serialized, only the computations of
+        the blocks run in parallel.
+    out_dtype : np.dtype | str
+        Dtype of the output datasets. Integer dtypes require scale_factor.
+    scale_factor : float | None
+        Factor the outputs are multiplied by before they are stored
+        (rounded for integer out_dtype). Stored as the "psm_scale_factor"
+        attribute.
+    compression : str | None
+        HDF5 compression filter of the output datasets.
+    compression_opts : int | None
+        Compression filter options (e.g. gzip level).
+    kwargs : dict
+        Additional keyword arguments for :func:`farms.all_sky.all_sky`,
+        e.g. lut or dtype.
+
+    Returns
+    -------
+    out_fpath : str
+        Output HDF5 file path.
+    """
+    if isinstance(in_fpaths, str):
+        in_fpaths = [in_fpaths]
+
+    out_dtype = np.dtype(out_dtype)
+    if out_dtype.kind in 'iu' and scale_factor is None:
+        msg = 'Integer output dtype {} requires a scale_factor'.format(
+            out_dtype)
+        raise ValueError(msg)
+
+    names = {**DSET_NAMES, **(names or {})}
+    handles = [h5py.File(fpath, 'r') for fpath in in_fpaths]
+    try:
+        dsets = {arg: _find_dset(handles, name) for arg, name in names.items()}
+        time_index = read_time_index(_find_dset(handles, 'time_index').file)
+        radius = ti_to_radius(time_index)
+
+        ref = dsets['cloud_type']
+        shape = ref.shape
+        chunks = aligned_chunks(shape, ref.chunks, max_memory / n_workers)
+
+        with h5py.File(out_fpath, 'w') as out:
+            _copy_meta(handles, out)
+            out_dsets = [
+                out.create_dataset(name, shape=shape, dtype=out_dtype,
+                                   chunks=ref.chunks or chunks,
+                                   compression=compression,
+                                   compression_opts=compression_opts)
+                for name in ALL_SKY_OUTPUTS
+            ]
+            for dset in out_dsets:
+                dset.attrs['units'] = 'W/m2'
+                if scale_factor is not None:
+                    dset.attrs['psm_scale_factor'] = scale_factor
+
+            inputs = {arg: (dset, get_scale_factor(dset),
+                            *get_cf_scaling(dset))
+                      for arg, dset in dsets.items()}
+            outputs = [(dset, scale_factor) for dset in out_dsets]
+            blocks = iter_chunks(shape, chunks)
+            args = (inputs, radius, outputs, kwargs)
+            if n_workers == 1:
+                for block in blocks:
+                    _run_block(block, *args)
+            else:
+                with ThreadPoolExecutor(max_workers=n_workers) as exe:
+                    futures = [exe.submit(_run_block, block, *args)
+                               for block in blocks]
+                    for future in futures:
+                        future.result()
+    finally:
+        for f in handles:
+            f.close()
+
+    return out_fpath
+
+
+def _find_dset(handles, name):
+    """Get a dataset from the first open file that has it."""
+    for f in handles:
+        if name in f:
+            return f[name]
+
+    msg = 'Could not find dataset "{}" in the input files'.format(name)
+    raise KeyError(msg)
+
+
+def _copy_meta(handles, out):
+    """Copy the META_DSETS of the inputs to the output file."""
+    for name in META_DSETS:
+        for f in handles:
+            if name in f:
+                f.copy(f[name], out, name=name)
+                break
+
+
+def _run_block(block, inputs, radius, outputs, kwargs):
+    """Read, run, and write one block of the domain. Only the HDF5 reads and
+    writes hold _H5_LOCK."""
+    with _H5_LOCK:
+        raw = {arg: dset[block] for arg, (dset, *_) in inputs.items()}
+
+    arrays = {arg: _unscale(raw[arg], *scaling)
+              for arg, (_, *scaling) in inputs.items()}
+    out = all_sky(radius=radius[block[0]], **arrays, **kwargs)
+
+    packed = []
+    for (dset, scale_factor), data in zip(outputs, out):
+        if scale_factor is not None:
+            data = data * scale_factor
+        if dset.dtype.kind in 'iu':
+            info = np.iinfo(dset.dtype)
+            data = np.clip(np.round(np.nan_to_num(data)), info.min, info.max)
+        packed.append(data)
+
+    with _H5_LOCK:
+        for (dset, _), data in zip(outputs, packed):
+            dset[block] = data
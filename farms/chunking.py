@@ -0,0 +1,307 @@
+"""
+Memory-bounded chunked execution of FARMS.
+
+:func:`farms.farms.farms` needs all of its inputs in memory and allocates a
+few dozen full-size intermediate arrays, so its peak memory is many times the
+size of the inputs. The utilities in this module tile the (time, sites) domain
+into blocks sized to fit a caller-given memory budget and run FARMS on one
+block at a time, writing into preallocated output arrays. Blocks can be
+distributed across a thread pool since the numpy ufuncs (and the numba
+kernel) used by FARMS release the GIL.
+
+Out-of-core execution
+---------------------
+Inputs and outputs can be memory-mapped arrays (e.g. np.memmap or the .npy
+files created by :func:`open_memmap_outputs`). Blocks span complete rows of
+the C-ordered (time, sites) arrays so each block reads and writes one
+contiguous slab of the files, which the OS page cache streams through
+sequentially. If any array is memory-mapped and no block shape or memory
+budget is given, blocks are planned for MEMMAP_MEMORY bytes.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from farms.farms import FARMS_INPUTS, FARMS_OUTPUTS, INPUT_RANGES, farms
+from farms.utilities import is_memmap, validate_inputs
+
+# Default working-set memory budget (bytes) of all concurrently running
+# blocks if inputs or outputs are memory-mapped
+MEMMAP_MEMORY = 256 * 1024**2
+
+
+def estimate_cell_bytes(dtype=np.float64, backend='numpy'):
+    """Estimate the peak working-set memory of FARMS per (time, site) cell.
+
+    The estimate covers the intermediate arrays allocated inside
+    :func:`farms.farms.farms` (including the FARMS-DNI piecewise
+    transmittance masks) plus the returned outputs. It does not include the
+    inputs which are passed to each block as views. Estimates were calibrated
+    with tracemalloc on a random mix of clear, water and ice cloud types.
+
+    Parameters
+    ----------
+    dtype : np.dtype
+        Floating point dtype of the FARMS inputs.
+    backend : str
+        FARMS compute backend ("numpy" or "numba").
+
+    Returns
+    -------
+    cell_bytes : int
+        Estimated peak bytes per cell.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    if backend == 'numba':
+        return len(FARMS_OUTPUTS) * itemsize
+
+    # ~26 full-size float temporaries plus integer phase/index arrays
+    return 26 * itemsize + 32
+
+
+def plan_chunks(shape, max_memory, cell_bytes):
+    """Choose a (time, sites) block shape that fits within a memory budget.
+
+    Blocks span all trailing dimensions (complete rows of C-ordered arrays)
+    whenever at least one full row fits in the budget so that every block
+    is a contiguous slab of memory. Otherwise the leading dimensions are
+    set to 1 and the first dimension whose trailing rows fit is split.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the full domain, e.g. (n_times,), (n_times, n_sites), or
+        (n_times, n_lat, n_lon).
+    max_memory : int | float
+        Memory budget in bytes for the working set of a single block.
+    cell_bytes : int | float
+        Working-set bytes per cell, see :func:`estimate_cell_bytes`.
+
+    Returns
+    -------
+    chunks : tuple
+        Block shape with the same number of dimensions as shape.
+    """
+    n_cells = int(max_memory // cell_bytes)
+    if n_cells < 1:
+        msg = ('Memory budget of {} bytes is smaller than the working set of '
+               'a single cell ({} bytes)'.format(max_memory, cell_bytes))
+        raise ValueError(msg)
+
+    shape = tuple(shape)
+    for i, n in enumerate(shape):
+        row = max(int(np.prod(shape[i + 1:])), 1)
+        if n_cells >= row:
+            return (1,) * i + (min(n, n_cells // row),) + shape[i + 1:]
+
+    return shape
+
+
+def open_memmap_outputs(out_dir, shape, dtype=np.float32,
+                        names=FARMS_OUTPUTS, mode='w+'):
+    """Open memory-mapped .npy output files, e.g. for the out argument of
+    :func:`farms_chunked`.
+
+    Parameters
+    ----------
+    out_dir : str
+        Directory of the output files ("{name}.npy").
+    shape : tuple
+        Shape of the outputs.
+    dtype : np.dtype | str
+        Dtype of the outputs.
+    names : tuple
+        Output names.
+    mode : str
+        File mode, "w+" to create (or overwrite) the files or "r+" to open
+        existing files.
+
+    Returns
+    -------
+    out : tuple
+        Memory-mapped arrays, one per name.
+    """
+    kwargs = {'dtype': dtype, 'shape': shape} if mode == 'w+' else {}
+    return tuple(
+        np.lib.format.open_memmap(os.path.join(out_dir, name + '.npy'),
+                                  mode=mode, **kwargs)
+        for name in names
+    )
+
+
+def iter_chunks(shape, chunks):
+    """Iterate over the blocks of a (time, sites) domain.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the full domain.
+    chunks : tuple
+        Block shape, see :func:`plan_chunks`. Only the leading len(chunks)
+        dimensions of shape are split.
+
+    Yields
+    ------
+    slices : tuple
+        Tuple of slice objects selecting one block of the domain.
+    """
+    starts = [range(0, n, max(c, 1)) for n, c in zip(shape, chunks)]
+    for idx in np.ndindex(*[len(s) for s in starts]):
+        yield tuple(
+            slice(s[i], s[i] + c) for s, i, c in zip(starts, idx, chunks)
+        )
+
+
+def farms_chunked(
+    tau,
+    cloud_type,
+    cloud_effective_radius,
+    solar_zenith_angle,
+    radius,
+    Tuuclr,
+    Ruuclr,
+    Tddclr,
+    Tduclr,
+    albedo,
+    max_memory=None,
+    chunks=None,
+    out=None,
+    n_workers=1,
+    executor=None,
+    **kwargs,
+):
+    """Run FARMS block-by-block over the (time, sites) domain.
+
+    See :func:`farms.farms.farms` for a description of the array parameters.
+    All arrays must be broadcastable to a common (n_times, n_sites) or
+    (n_times,) shape, e.g. radius can be a (n_times, 1) array.
+
+    Parameters
+    ----------
+    max_memory : int | float | None
+        Memory budget in bytes for the FARMS working set of all concurrently
+        running blocks. Used to plan the block shape if chunks is not given.
+        If both are None the full domain is run as a single block (or one
+        block per worker), unless inputs or outputs are memory-mapped in
+        which case MEMMAP_MEMORY is used.
+    chunks : tuple | None
+        Explicit (time, sites) block shape. Overrides max_memory.
+    out : tuple | None
+        Optional preallocated (ghi, dni_farmsdni, dni0) output arrays with
+        the full domain shape, e.g. memory-mapped arrays from
+        :func:`open_memmap_outputs`. Allocated if not given.
+    n_workers : int
+        Number of threads to run blocks on. If greater than 1, the site axis
+        (or the time axis for 1D inputs) is split so that every worker gets
+        at least one block and each worker writes into its own slice of the
+        shared output arrays.
+    executor : concurrent.futures.Executor | None
+        Optional executor to submit blocks to instead of creating a
+        ThreadPoolExecutor with n_workers. The executor must share memory
+        with the caller (i.e. a thread pool) since blocks are written
+        in-place into the output arrays.
+    kwargs : dict
+        Additional keyword arguments for :func:`farms.farms.farms`, e.g.
+        backend. debug=True and category are not supported. The inputs
+        are validated once over the full domain before any block is run.
+
+    Returns
+    -------
+    ghi: np.ndarray
+        Global horizontal irradiance (W/m2)
+    dni_farmsdni: np.ndarray
+        DNI computed by FARMS-DNI (W/m2).
+    dni0: np.ndarray
+        DNI computed by the Lambert law (W/m2).
+    """
+    _check_kwargs(kwargs)
+
+    arrays = (tau, cloud_type, cloud_effective_radius, solar_zenith_angle,
+              radius, Tuuclr, Ruuclr, Tddclr, Tduclr, albedo)
+    kwargs = _validate_domain(arrays, kwargs)
+    if chunks is None and max_memory is None and is_memmap(*arrays,
+                                                           *(out or ())):
+        max_memory = MEMMAP_MEMORY
+
+    shape = np.broadcast(*arrays).shape
+    arrays = [np.broadcast_to(arr, shape) for arr in arrays]
+    floats = [arr for arr in arrays if arr.dtype.kind == 'f']
+    dtype = kwargs.get('dtype')
+    if dtype is None:
+        dtype = np.result_type(*floats, np.float32)
+
+    if out is None:
+        out = tuple(np.empty(shape, dtype=dtype) for _ in FARMS_OUTPUTS)
+
+    if chunks is None:
+        chunks = _worker_shape(shape, n_workers)
+        if max_memory is not None:
+            backend = kwargs.get('backend', 'numpy')
+            cell_bytes = estimate_cell_bytes(dtype, backend=backend)
+            chunks = plan_chunks(chunks, max_memory / n_workers, cell_bytes)
+
+    blocks = iter_chunks(shape, chunks)
+    if n_workers == 1 and executor is None:
+        for block in blocks:
+            _run_block(arrays, block, out, kwargs)
+
+    elif executor is not None:
+        _run_blocks(executor, arrays, blocks, out, kwargs)
+
+    else:
+        with ThreadPoolExecutor(max_workers=n_workers) as exe:
+            _run_blocks(exe, arrays, blocks, out, kwargs)
+
+    return out
+
+
+def _check_kwargs(kwargs):
+    """Raise for farms() keyword arguments that cannot be split into
+    blocks."""
+    if kwargs.get('debug', False):
+        msg = 'Chunked FARMS does not support debug=True'
+        raise ValueError(msg)
+
+    if kwargs.get('category') is not None:
+        msg = ('Chunked FARMS does not support a precomputed category, it is '
+               'computed per block from cloud_type')
+        raise ValueError(msg)
+
+
+def _validate_domain(arrays, kwargs):
+    """Validate the FARMS inputs of the full domain once before any block is
+    run and get the block kwargs with the validation turned off."""
+    data = dict(zip(FARMS_INPUTS, arrays))
+    validate_inputs(
+        {name: (data[name], rang) for name, rang in INPUT_RANGES.items()},
+        mode=kwargs.get('validation', 'strict'),
+    )
+
+    return {**kwargs, 'validation': 'off'}
+
+
+def _worker_shape(shape, n_workers):
+    """Get the domain shape handled by each of n_workers (sites are split
+    first, the time axis is only split for 1D inputs)."""
+    split = min(len(shape), 2) - 1
+    n = -(-shape[split] // n_workers)
+    return shape[:split] + (n,) + shape[split + 1:]
+
+
+def _run_block(arrays, block, out, kwargs):
+    """Run FARMS on one block and write the results into the outputs."""
+    result = farms(*(arr[block] for arr in arrays), **kwargs)
+    for arr, res in zip(out, result):
+        arr[block] = res
+
+
+def _run_blocks(executor, arrays, blocks, out, kwargs):
+    """Submit FARMS blocks to an executor and wait for all of them."""
+    futures = [
+        executor.submit(_run_block, arrays, block, out, kwargs)
+        for block in blocks
+    ]
+    for future in futures:
+        future.result()
@@ -0,0 +1,123 @@
+"""
+FARMS command line interface.
+
+Runs the HDF5 file-to-file batch runner (:func:`farms.batch.run_file`)::
+
+    farms cloud_2020.h5 rest2_2020.h5 -o farms_2020.h5 --workers 4 --lut
+"""
+
+import argparse
+
+# Default memory budget (MiB), see farms.batch.MAX_MEMORY
+MAX_MEMORY_MIB = 1024
+
+
+def _parse_names(names, valid):
+    """Parse ARG=DSET dataset name overrides into a dict, checking ARG
+    against the valid argument names."""
+    out = {}
+    for name in names or []:
+        arg, _, dset = name.partition('=')
+        if not dset:
+            msg = 'Dataset name override must be ARG=DSET, got: {}'.format(
+                name)
+            raise ValueError(msg)
+        if arg not in valid:
+            msg = 'Unknown dataset name override "{}", must be one of: {}'
+            msg = msg.format(arg, ', '.join(valid))
+            raise ValueError(msg)
+        out[arg] = dset
+
+    return out
+
+
+def get_parser():
+    """Get the FARMS command line argument parser.
+
+    Returns
+    -------
+    parser : argparse.ArgumentParser
+        Argument parser for :func:`main`.
+    """
+    parser = argparse.ArgumentParser(
+        prog='farms',
+        description='Run FARMS all-sky irradiance (ghi, dni, dhi) from '
+                    'NSRDB-style HDF5 cloud and REST2 clear-sky inputs.')
+    parser.add_argument('in_fpaths', nargs='+',
+                        help='Input HDF5 file(s). Each dataset is read from '
+                             'the first file that has it.')
+    parser.add_argument('-o', '--out', required=True, dest='out_fpath',
+                        help='Output HDF5 file (overwritten).')
+    parser.add_argument('--name', action='append', metavar='ARG=DSET',
+                        help='Input dataset name override, e.g. '
+                             'albedo=surface_albedo. Can be repeated.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of threads processing blocks.')
+    parser.add_argument('--max-memory', type=float,
+                        default=MAX_MEMORY_MIB,
+                        help='Memory budget for all blocks in MiB.')
+    parser.add_argument('--out-dtype', default='float32',
+                        help='Output dataset dtype, e.g. float32 or uint16.')
+    parser.add_argument('--scale-factor', type=float, default=None,
+                        help='Factor outputs are multiplied by before they '
+                             'are stored (required for integer dtypes).')
+    parser.add_argument('--compression', default='gzip',
+                        help='HDF5 compression filter ("none" to disable).')
+    parser.add_argument('--compression-level', type=int, default=4,
+                        help='Compression level (gzip only).')
+    parser.add_argument('--lut', action='store_true',
+                        help='Interpolate the cloud optics from the lookup '
+                             'tables.')
+    parser.add_argument('--dtype', default=None,
+                        help='Floating point dtype of the computation, e.g. '
+                             'float32.')
+    parser.add_argument('--backend', default='numpy',
+                        help='FARMS compute backend ("numpy" or "numba").')
+
+    return parser
+
+
+def main(argv=None):
+    """Run the FARMS command line interface.
+
+    Parameters
+    ----------
+    argv : list | None
+        Command line arguments. Defaults to sys.argv[1:].
+
+    Returns
+    -------
+    status : int
+        Exit status.
+    """
+    from farms.batch import DSET_NAMES, run_file
+
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    try:
+        names = _parse_names(args.name, DSET_NAMES)
+    except ValueError as e:
+        parser.error(str(e))
+
+    compression = None if args.compression == 'none' else args.compression
+    run_file(
+        args.in_fpaths,
+        args.out_fpath,
+        names=names,
+        max_memory=args.max_memory * 1024**2,
+        n_workers=args.workers,
+        out_dtype=args.out_dtype,
+        scale_factor=args.scale_factor,
+        compression=compression,
+        compression_opts=(args.compression_level if compression == 'gzip'
+                          else None),
+        lut=args.lut,
+        dtype=args.dtype,
+        backend=args.backend,
+    )
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
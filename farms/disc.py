@@ -14,9 +14,26 @@ There were four main changes from the original code
 import numpy as np
 
 from farms import SOLAR_CONSTANT
+from farms.utilities import is_memmap
 
+# Polynomial coefficients (c0, c1, c2, c3) in Kt of the DISC A, B, and C
+# terms for the Kt > 0.6 and Kt <= 0.6 regimes
+DISC_COEFFS_HIGH = ((-5.743, 21.77, -27.49, 11.56),
+                    (41.4, -118.5, 66.05, 31.9),
+                    (-47.01, 184.2, -222., 73.81))
+DISC_COEFFS_LOW = ((0.512, -1.56, 2.286, -2.222),
+                   (0.37, 0.962, 0., 0.),
+                   (-0.28, 0.932, -2.048, 0.))
 
-def disc(ghi, sza, doy, pressure=1013.25, sza_lim=87):
+# Polynomial coefficients in air mass of the clear-sky beam index Knc
+KNC_COEFFS = (0.866, -0.122, 0.0121, -0.000653, 0.000014)
+
+# Approximate peak working-set bytes per cell of disc() (float64)
+DISC_CELL_BYTES = 96
+
+
+def disc(ghi, sza, doy, pressure=1013.25, sza_lim=87, dtype=None, out=None,
+         max_memory=None):
     """Estimate DNI from GHI using the DISC model.
 
     *Warning: should only be used for cloudy FARMS data.
@@ -32,71 +49,139 @@ def disc(ghi, sza, doy, pressure=1013.25, sza_lim=87):
     sza : np.ndarray
         Solar zenith angle in degrees.
     doy : np.ndarray
-        Day of year (array of integers).
+        Day of year (array of integers). Either broadcastable against sza or
+        a 1D (time,) array for 2D (time, sites) sza, in which case it is
+        broadcast along the sites axis.
     pressure : np.ndarray
         Pressure in mbar (same as hPa).
     sza_lim : float | int
         Upper limit for solar zenith angle in degrees. SZA values greater than
         this will be truncated at this value. 87 deg chosen to simulate the
         FORTRAN code in use by SRRL (from Perez).
+    dtype : np.dtype | str | None
+        Floating point dtype for the computation (e.g. "float32"). ghi, sza,
+        pressure, and the day-of-year earth-sun distance correction are cast
+        to this dtype. If None, the computation follows the input dtypes.
+    out : np.ndarray | None
+        Optional output array with the shape of sza to write DNI into, e.g.
+        a np.memmap.
+    max_memory : int | float | None
+        Memory budget in bytes for the working set. If given, DISC runs on
+        blocks of complete rows (timesteps) so memory-mapped inputs and
+        outputs are streamed sequentially through the page cache. Defaults
+        to farms.chunking.MEMMAP_MEMORY if any input or out is a np.memmap,
+        otherwise the full domain is computed at once.
 
     Returns
     -------
     DNI : np.ndarray
         Estimated direct normal irradiance in W/m2.
     """
-
-    A = np.zeros_like(ghi)
-    B = np.zeros_like(ghi)
-    C = np.zeros_like(ghi)
-
+    if max_memory is None and is_memmap(ghi, sza, pressure, out):
+        from farms.chunking import MEMMAP_MEMORY
+
+        max_memory = MEMMAP_MEMORY
+
+    if max_memory is None:
+        return _disc(ghi, sza, doy, pressure, sza_lim, dtype, out)
+
+    sza = np.asarray(sza)
+    doy = np.asarray(doy)
+    shape = sza.shape
+    if out is None:
+        out_dtype = dtype
+        if out_dtype is None:
+            out_dtype = np.result_type(ghi, sza, pressure, np.float64)
+        out = np.empty(shape, dtype=out_dtype)
+
+    n_rows = int(max_memory // (DISC_CELL_BYTES * np.prod(shape[1:])))
+    n_rows = max(n_rows, 1)
+    for start in range(0, shape[0], n_rows):
+        rows = slice(start, start + n_rows)
+        doy_rows = (doy[rows] if doy.ndim == 1 and sza.ndim > 1
+                    else np.broadcast_to(doy, shape)[rows])
+        _disc(np.broadcast_to(ghi, shape)[rows], sza[rows], doy_rows,
+              np.broadcast_to(pressure, shape)[rows], sza_lim, dtype,
+              out[rows])
+
+    return out
+
+
+def _disc(ghi, sza, doy, pressure, sza_lim, dtype, out):
+    """Run DISC on in-memory (or one block of memory-mapped) arrays."""
+    ghi = np.asarray(ghi, dtype=dtype)
+    sza = np.asarray(sza, dtype=dtype)
+    pressure = np.asarray(pressure, dtype=dtype)
+    doy = np.asarray(doy)
+
+    # doy-only terms are computed once per timestep and broadcast
     day_angle = 2. * np.pi * (doy - 1) / 365
-
     re_var = (1.00011 + 0.034221 * np.cos(day_angle)
               + 0.00128 * np.sin(day_angle)
               + 0.000719 * np.cos(2. * day_angle)
               + 7.7E-5 * np.sin(2. * day_angle))
 
-    if len(re_var.shape) < len(sza.shape):
-        re_var = np.tile(re_var.reshape((len(re_var), 1)), sza.shape[1])
+    if dtype is not None:
+        re_var = re_var.astype(dtype)
 
-    I0 = re_var * SOLAR_CONSTANT
-    I0h = I0 * np.cos(np.radians(sza))
-    Ztemp = np.copy(sza)
-    Ztemp[Ztemp > sza_lim] = sza_lim
+    if 0 < re_var.ndim < sza.ndim:
+        re_var = re_var.reshape(re_var.shape + (1,) * (sza.ndim - re_var.ndim))
 
-    AM = (1. / (np.cos(np.radians(Ztemp))
-                + 0.15 * (np.power((93.885 - Ztemp), -1.253)))
-          * 100 * pressure / 101325)
+    I0 = re_var * SOLAR_CONSTANT
 
-    Kt = ghi / I0h
-    Kt[Kt < 0] = 0
+    # cells with sza >= sza_lim are set to zero below so the truncated
+    # zenith angle can also be used for the horizontal extraterrestrial flux
+    Ztemp = np.minimum(sza, sza_lim)
+    cosz = np.cos(np.radians(Ztemp))
+    AM = np.power(93.885 - Ztemp, -1.253)
+    AM *= 0.15
+    AM += cosz
+    np.divide(100 * pressure / 101325, AM, out=AM)
+
+    Kt = ghi / (I0 * cosz)
+    np.maximum(Kt, 0, out=Kt)
+
+    # evaluate the A, B, and C polynomials with the regime coefficients
+    high = Kt > 0.6
+    A, B, C = (_regime_polyval(Kt, high, c_high, c_low) for c_high, c_low
+               in zip(DISC_COEFFS_HIGH, DISC_COEFFS_LOW))
+
+    # delKn = A + B * exp(C * AM), zero for NaN Kt
+    C *= AM
+    np.exp(C, out=C)
+    C *= B
+    C += A
+    np.copyto(C, 0, where=np.isnan(Kt))
+
+    Knc = _polyval(AM, KNC_COEFFS)
+    Knc -= C
+
+    DNI = np.multiply(Knc, I0, out=out)
+    night = (sza >= sza_lim) | (ghi < 1) | (DNI < 0)
+    np.copyto(DNI, 0, where=night)
 
-    A[Kt > 0.6] = (-5.743 + 21.77 * Kt[Kt > 0.6]
-                   - 27.49 * np.power(Kt[Kt > 0.6], 2)
-                   + 11.56 * np.power(Kt[Kt > 0.6], 3))
-    B[Kt > 0.6] = (41.4 - 118.5 * Kt[Kt > 0.6]
-                   + 66.05 * np.power(Kt[Kt > 0.6], 2)
-                   + 31.9 * np.power(Kt[Kt > 0.6], 3))
-    C[Kt > 0.6] = (-47.01 + 184.2 * Kt[Kt > 0.6]
-                   - 222. * np.power(Kt[Kt > 0.6], 2)
-                   + 73.81 * np.power(Kt[Kt > 0.6], 3))
+    return DNI
 
-    A[Kt <= 0.6] = (0.512 - 1.56 * Kt[Kt <= 0.6]
-                    + 2.286 * np.power(Kt[Kt <= 0.6], 2)
-                    - 2.222 * np.power(Kt[Kt <= 0.6], 3))
-    B[Kt <= 0.6] = 0.37 + 0.962 * Kt[Kt <= 0.6]
-    C[Kt <= 0.6] = (-0.28 + 0.932 * Kt[Kt <= 0.6]
-                    - 2.048 * np.power(Kt[Kt <= 0.6], 2))
 
-    delKn = A + B * np.exp(C * AM)
+def _polyval(x, coeffs):
+    """Evaluate a polynomial with ascending coefficients (Horner)."""
+    y = np.full_like(x, coeffs[-1])
+    for c in coeffs[-2::-1]:
+        y *= x
+        y += c
 
-    Knc = (0.866 - 0.122 * AM + 0.0121 * np.power(AM, 2)
-           - 0.000653 * np.power(AM, 3) + 0.000014 * np.power(AM, 4))
+    return y
 
-    Kn = Knc - delKn
-    DNI = (Kn) * I0
 
-    DNI[np.logical_or.reduce((sza >= sza_lim, ghi < 1, DNI < 0))] = 0
+def _regime_polyval(x, high, coeffs_high, coeffs_low):
+    """Evaluate the polynomial with coeffs_high where high is True and
+    coeffs_low elsewhere (Horner with selected coefficients)."""
+    dtype = x.dtype.type
+    coeffs = [np.where(high, dtype(c_high), dtype(c_low))
+              for c_high, c_low in zip(coeffs_high, coeffs_low)]
+    y = coeffs[-1]
+    for c in coeffs[-2::-1]:
+        y *= x
+        y += c
 
-    return DNI
+    return y
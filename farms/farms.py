@@ -22,12 +22,38 @@ import numpy as np
 
 import farms.utilities as ut
 from farms import (
-    CLEAR_TYPES,
-    ICE_TYPES,
+    CATEGORY_CLEAR,
     SOLAR_CONSTANT,
-    WATER_TYPES,
+    SZA_LIM,
     farms_dni,
 )
+from farms.profiling import stage
+
+# Order of the positional array arguments to farms()
+FARMS_INPUTS = (
+    'tau',
+    'cloud_type',
+    'cloud_effective_radius',
+    'solar_zenith_angle',
+    'radius',
+    'Tuuclr',
+    'Ruuclr',
+    'Tddclr',
+    'Tduclr',
+    'albedo',
+)
+
+# Names of the arrays returned by farms() (debug=False)
+FARMS_OUTPUTS = ('ghi', 'dni_farmsdni', 'dni0')
+
+# Valid (inclusive) ranges of the FARMS inputs checked by farms()
+INPUT_RANGES = {
+    'Tddclr': (0, 1),
+    'Tduclr': (0, 1),
+    'Ruuclr': (0, 1),
+    'Tuuclr': (0, 1),
+    'tau': (0, 160),
+}
 
 
 def water_phase(tau, De, solar_zenith_angle):
@@ -134,6 +160,15 @@ def farms(
     Tduclr,
     albedo,
     debug=False,
+    backend="numpy",
+    n_workers=1,
+    lut=False,
+    dtype=None,
+    category=None,
+    compact=False,
+    validation="strict",
+    out=None,
+    max_memory=None,
 ):
     """Fast All-sky Radiation Model for Solar applications (FARMS).
 
@@ -190,6 +225,66 @@ def farms(
         Ground albedo.
     debug : bool
         Flag to output additional transmission/reflectance variables.
+    backend : str
+        Compute backend. "numpy" (default) evaluates FARMS and FARMS-DNI with
+        vectorized numpy operations. "numba" runs a fused JIT-compiled loop
+        that computes ghi, dni_farmsdni, and dni0 per element without any
+        full-size intermediate arrays (requires numba, does not support
+        debug=True). Outputs of the numba backend match the numpy backend
+        within the tolerances documented in :mod:`farms.farms_numba`.
+    n_workers : int
+        Number of threads. If greater than 1, the site axis is split across
+        a thread pool with each worker writing into a slice of shared output
+        arrays (see :func:`farms.chunking.farms_chunked`). Does not support
+        debug=True.
+    lut : bool
+        Flag to interpolate the cloudy transmittances and reflectance
+        (Tducld, Ruucld, and the FARMS-DNI Tddcld) from the precomputed
+        lookup tables in :mod:`farms.lut` instead of evaluating the analytic
+        parameterizations. Faster at the cost of the small interpolation
+        errors documented in :mod:`farms.lut`. Only supported by the "numpy"
+        backend.
+    dtype : np.dtype | str | None
+        Floating point dtype for the computation, e.g. "float32" to halve the
+        memory footprint and bandwidth of all intermediate arrays. The float
+        inputs are cast to this dtype and all outputs have this dtype. If
+        None, the computation follows the dtype of the inputs. The deviation
+        of float32 from float64 outputs is documented in
+        :mod:`farms.precision`.
+    category : np.ndarray | None
+        Optional cloud type categories from
+        :func:`farms.utilities.classify_cloud_type` with the shape of
+        cloud_type, e.g. to share one classification of a chunk between
+        farms() and the functions in :mod:`farms.utilities`. Computed from
+        cloud_type if None. Ignored by the "numba" backend. Not supported
+        together with n_workers > 1, max_memory, or out.
+    compact : bool
+        Flag to only compute the daylight (solar zenith angle < SZA_LIM)
+        cloudy cells: these cells are gathered into dense vectors, FARMS is
+        run on the vectors, and the results are scattered back into NaN
+        filled outputs (see :func:`farms_compact`). Unlike the default dense
+        mode, night cells and cells with a cloud type that is neither clear
+        nor cloudy are NaN. The results are scattered into out if given and
+        max_memory limits the working set of FARMS on the gathered vectors.
+        Does not support debug=True or n_workers > 1.
+    validation : str
+        Input range validation mode for the inputs in INPUT_RANGES:
+        "strict" (default) raises a ValueError listing all range violations,
+        "warn" warns instead, "sampled" only checks a sample of each input,
+        and "off" skips the validation (e.g. for trusted production reruns).
+        See :func:`farms.utilities.validate_inputs`.
+    out : tuple | None
+        Optional preallocated (ghi, dni_farmsdni, dni0) output arrays, e.g.
+        memory-mapped files from
+        :func:`farms.chunking.open_memmap_outputs`. If given, or if
+        max_memory is given, or if any input is a np.memmap, FARMS runs
+        block-by-block over complete rows of the domain (see
+        :func:`farms.chunking.farms_chunked`) so that memory-mapped data is
+        streamed through the page cache instead of loaded at once. Does not
+        support debug=True.
+    max_memory : int | float | None
+        Memory budget in bytes for the FARMS working set of the blocks (see
+        :func:`farms.chunking.farms_chunked`).
 
     Returns
     -------
@@ -220,74 +315,372 @@ def farms(
             DNI computed by the Lambert law (W/m2). It only includes the narrow
             beam in the circumsolar region.
     """
+    if compact:
+        return farms_compact(
+            tau,
+            cloud_type,
+            cloud_effective_radius,
+            solar_zenith_angle,
+            radius,
+            Tuuclr,
+            Ruuclr,
+            Tddclr,
+            Tduclr,
+            albedo,
+            category=category,
+            out=out,
+            max_memory=max_memory,
+            debug=debug,
+            backend=backend,
+            n_workers=n_workers,
+            lut=lut,
+            dtype=dtype,
+            validation=validation,
+        )
+
+    chunked = out is not None or max_memory is not None
+    if n_workers > 1 or chunked or ut.is_memmap(
+        tau, cloud_type, cloud_effective_radius, solar_zenith_angle, radius,
+        Tuuclr, Ruuclr, Tddclr, Tduclr, albedo,
+    ):
+        from farms.chunking import farms_chunked
+
+        return farms_chunked(
+            tau,
+            cloud_type,
+            cloud_effective_radius,
+            solar_zenith_angle,
+            radius,
+            Tuuclr,
+            Ruuclr,
+            Tddclr,
+            Tduclr,
+            albedo,
+            max_memory=max_memory,
+            out=out,
+            n_workers=n_workers,
+            category=category,
+            debug=debug,
+            backend=backend,
+            lut=lut,
+            dtype=dtype,
+            validation=validation,
+        )
+
+    if dtype is not None:
+        (tau, cloud_effective_radius, solar_zenith_angle, radius, Tuuclr,
+         Ruuclr, Tddclr, Tduclr, albedo) = (
+            np.asarray(arr, dtype=dtype) for arr in (
+                tau, cloud_effective_radius, solar_zenith_angle, radius,
+                Tuuclr, Ruuclr, Tddclr, Tduclr, albedo)
+        )
+
     # disable divide by zero warnings
     np.seterr(divide="ignore")
 
-    ut.check_range(Tddclr, "Tddclr")
-    ut.check_range(Tduclr, "Tduclr")
-    ut.check_range(Ruuclr, "Ruuclr")
-    ut.check_range(Tuuclr, "Tuuclr")
-    ut.check_range(tau, "tau (cld_opd_dcomp)", rang=(0, 160))
+    data = {"Tddclr": Tddclr, "Tduclr": Tduclr, "Ruuclr": Ruuclr,
+            "Tuuclr": Tuuclr, "tau": tau}
+    with stage("validation", tau):
+        ut.validate_inputs(
+            {name: (data[name], rang) for name, rang in INPUT_RANGES.items()},
+            mode=validation,
+        )
+
+    if backend == "numba":
+        if lut or debug:
+            msg = 'FARMS backend "numba" does not support {}=True'.format(
+                'lut' if lut else 'debug')
+            raise ValueError(msg)
+
+        from farms.farms_numba import farms_numba
+
+        with stage("farms_numba", tau):
+            return farms_numba(
+                tau,
+                cloud_type,
+                cloud_effective_radius,
+                solar_zenith_angle,
+                radius,
+                Tuuclr,
+                Ruuclr,
+                Tddclr,
+                Tduclr,
+                albedo,
+            )
+
+    if backend != "numpy":
+        msg = 'Did not recognize FARMS backend: {}'.format(backend)
+        raise ValueError(msg)
 
     F0 = SOLAR_CONSTANT / (radius * radius)
     solar_zenith_angle = np.cos(np.radians(solar_zenith_angle))
 
-    phase = np.zeros_like(cloud_type)
-    phase[np.isin(cloud_type, WATER_TYPES).reshape(cloud_type.shape)] = 1
-    phase[np.isin(cloud_type, ICE_TYPES).reshape(cloud_type.shape)] = 2
-
-    phase1 = np.where(phase == 1)
-    phase2 = np.where(phase == 2)
+    # the water and ice categories are the FARMS-DNI cloud phase codes
+    if category is None:
+        with stage("classify", cloud_type):
+            category = ut.classify_cloud_type(cloud_type)
+    phase = category
 
     De = 2.0 * cloud_effective_radius
 
-    Tducld = np.zeros_like(tau)
-    Ruucld = np.zeros_like(tau)
-
-    Tducld[phase1], Ruucld[phase1] = water_phase(
-        tau[phase1], De[phase1], solar_zenith_angle[phase1]
-    )
-
-    Tducld[phase2], Ruucld[phase2] = ice_phase(
-        tau[phase2], De[phase2], solar_zenith_angle[phase2]
-    )
-
-    # eq 8 from [1]
-    Tddcld = np.exp(-tau / solar_zenith_angle)
+    Tddcld1 = None
+    if lut:
+        from farms.lut import cloud_optics
 
-    Fd = solar_zenith_angle * F0 * Tddcld * Tddclr  # eq 2a from [1]
-    F1 = (
-        solar_zenith_angle
-        * F0
-        * (Tddcld * (Tddclr + Tduclr) + Tducld * Tuuclr)
-    )  # eq 3 from [1]
-
-    # ghi eqn 6 from [1]
-    ghi = F1 / (1.0 - albedo * (Ruuclr + Ruucld * Tuuclr * Tuuclr))
-    dni = Fd / solar_zenith_angle  # eq 2b from [1]
-    dhi = ghi - Fd  # eq 7 from [1]
-
-    Fd, dni_farmsdni, dni0 = farms_dni.farms_dni(
-        F0, tau, solar_zenith_angle, De, phase, Tddclr, ghi, F1
-    )
+        with stage("cloud_optics_lut", tau):
+            Tducld, Ruucld, Tddcld1 = cloud_optics(
+                tau, De, solar_zenith_angle, phase
+            )
+    else:
+        phase1 = np.where(phase == 1)
+        phase2 = np.where(phase == 2)
+
+        Tducld = np.zeros_like(tau)
+        Ruucld = np.zeros_like(tau)
+
+        with stage("water_phase", phase1[0]):
+            Tducld[phase1], Ruucld[phase1] = water_phase(
+                tau[phase1], De[phase1], solar_zenith_angle[phase1]
+            )
+
+        with stage("ice_phase", phase2[0]):
+            Tducld[phase2], Ruucld[phase2] = ice_phase(
+                tau[phase2], De[phase2], solar_zenith_angle[phase2]
+            )
+
+    with stage("irradiance", tau):
+        # eq 8 from [1]
+        Tddcld = np.exp(-tau / solar_zenith_angle)
+
+        Fd = solar_zenith_angle * F0 * Tddcld * Tddclr  # eq 2a from [1]
+        F1 = (
+            solar_zenith_angle
+            * F0
+            * (Tddcld * (Tddclr + Tduclr) + Tducld * Tuuclr)
+        )  # eq 3 from [1]
+
+        # ghi eqn 6 from [1]
+        ghi = F1 / (1.0 - albedo * (Ruuclr + Ruucld * Tuuclr * Tuuclr))
+        dni = Fd / solar_zenith_angle  # eq 2b from [1]
+        dhi = ghi - Fd  # eq 7 from [1]
+
+    with stage("farms_dni", tau):
+        Fd, dni_farmsdni, dni0 = farms_dni.farms_dni(
+            F0, tau, solar_zenith_angle, De, phase, Tddclr, ghi, F1,
+            Tddcld1=Tddcld1,
+        )
 
-    clear_mask = np.isin(cloud_type, CLEAR_TYPES).reshape(cloud_type.shape)
+    clear_mask = category == CATEGORY_CLEAR
+    nan = ghi.dtype.type(np.nan)
     if debug:
         # Return NaN if clear-sky, else return cloudy sky data
         fast_data = collections.namedtuple(
             "fast_data", ["ghi", "dni", "dhi", "Tddcld", "Tducld", "Ruucld"]
         )
-        fast_data.Tddcld = np.where(clear_mask, np.nan, Tddcld)
-        fast_data.Tducld = np.where(clear_mask, np.nan, Tducld)
-        fast_data.Ruucld = np.where(clear_mask, np.nan, Ruucld)
-        fast_data.ghi = np.where(clear_mask, np.nan, ghi)
-        fast_data.dni = np.where(clear_mask, np.nan, dni)
-        fast_data.dhi = np.where(clear_mask, np.nan, dhi)
+        fast_data.Tddcld = np.where(clear_mask, nan, Tddcld)
+        fast_data.Tducld = np.where(clear_mask, nan, Tducld)
+        fast_data.Ruucld = np.where(clear_mask, nan, Ruucld)
+        fast_data.ghi = np.where(clear_mask, nan, ghi)
+        fast_data.dni = np.where(clear_mask, nan, dni)
+        fast_data.dhi = np.where(clear_mask, nan, dhi)
 
         return fast_data
-    out = (
-        np.where(clear_mask, np.nan, ghi),
-        np.where(clear_mask, np.nan, dni_farmsdni),
-        np.where(clear_mask, np.nan, dni0),
-    )
+    with stage("nan_mask", clear_mask):
+        out = (
+            np.where(clear_mask, nan, ghi),
+            np.where(clear_mask, nan, dni_farmsdni),
+            np.where(clear_mask, nan, dni0),
+        )
+    return out
+
+
+def farms_compact(
+    tau,
+    cloud_type,
+    cloud_effective_radius,
+    solar_zenith_angle,
+    radius,
+    Tuuclr,
+    Ruuclr,
+    Tddclr,
+    Tduclr,
+    albedo,
+    return_index=False,
+    sza_lim=SZA_LIM,
+    category=None,
+    out=None,
+    **kwargs,
+):
+    """Run FARMS only for the daylight cloudy cells (gather-compute-scatter).
+
+    Typically about half of all cells are night and a large share of the
+    daylight cells are clear, for which the FARMS outputs are discarded.
+    This gathers the inputs of the daylight cells with a cloudy cloud type
+    (CLOUD_TYPES) into dense vectors, runs :func:`farms` (and FARMS-DNI) on
+    the vectors, and either scatters the results back into NaN filled arrays
+    or returns the compact results with their flat index for storage.
+
+    See :func:`farms` for a description of the array parameters. All arrays
+    must be broadcastable to a common shape, e.g. radius can be
+    (n_times, 1).
+
+    Parameters
+    ----------
+    return_index : bool
+        Flag to return the compact outputs and their index instead of dense
+        arrays.
+    sza_lim : float
+        Cells with a solar zenith angle >= sza_lim (degrees) are not
+        computed.
+    category : np.ndarray | None
+        Optional cloud type categories from
+        :func:`farms.utilities.classify_cloud_type`. Computed from
+        cloud_type if None.
+    out : tuple | None
+        Optional preallocated (ghi, dni_farmsdni, dni0) output arrays with
+        the broadcast input shape, e.g. memory-mapped files from
+        :func:`farms.chunking.open_memmap_outputs`. The results are
+        scattered into these arrays and all other cells are set to NaN.
+        Not supported with return_index=True.
+    kwargs : dict
+        Additional keyword arguments for :func:`farms`, e.g. backend, lut,
+        dtype, or max_memory (memory budget of the FARMS working set of the
+        gathered vectors, which are processed in blocks). debug=True and
+        n_workers > 1 are not supported.
+
+    Returns
+    -------
+    out : tuple
+        (ghi, dni_farmsdni, dni0) arrays with the broadcast input shape that
+        are NaN for all cells that were not computed. If return_index is
+        True, ((ghi, dni_farmsdni, dni0), index) is returned instead, where
+        each output is a 1D array of the computed cells and index is the
+        flat (C-order) index of these cells in the broadcast input shape
+        (see :func:`scatter_compact`).
+    """
+    if kwargs.get('debug', False):
+        msg = 'FARMS compact mode does not support debug=True'
+        raise ValueError(msg)
+
+    if kwargs.get('n_workers', 1) > 1:
+        msg = 'FARMS compact mode does not support n_workers > 1'
+        raise ValueError(msg)
+
+    if return_index and out is not None:
+        msg = 'FARMS compact mode does not support out with return_index=True'
+        raise ValueError(msg)
+
+    arrays = (tau, cloud_type, cloud_effective_radius, solar_zenith_angle,
+              radius, Tuuclr, Ruuclr, Tddclr, Tduclr, albedo)
+    arrays = [np.asarray(arr) for arr in arrays]
+    shape = np.broadcast(*arrays).shape
+    arrays = [np.broadcast_to(arr, shape) for arr in arrays]
+
+    if category is None:
+        category = ut.classify_cloud_type(arrays[1])
+
+    mask = ut.is_cloudy(np.broadcast_to(category, shape))
+    mask &= arrays[3] < sza_lim
+    index = np.flatnonzero(mask)
+
+    dtype = kwargs.get('dtype')
+    if dtype is None:
+        floats = [arr for arr in arrays if arr.dtype.kind == 'f']
+        dtype = np.result_type(*floats, np.float32)
+
+    if index.size:
+        # chunked FARMS (max_memory) reclassifies the cloud type per block
+        if kwargs.get('max_memory') is None:
+            kwargs['category'] = np.broadcast_to(category, shape)[mask]
+        values = farms(*(arr[mask] for arr in arrays), **kwargs)
+    else:
+        values = tuple(np.empty(0, dtype=dtype) for _ in FARMS_OUTPUTS)
+
+    if return_index:
+        return values, index
+
+    out = out or (None,) * len(values)
+    return tuple(scatter_compact(arr, index, shape, out=res)
+                 for arr, res in zip(values, out))
+
+
+def scatter_compact(values, index, shape, fill=np.nan, out=None):
+    """Scatter compact values (e.g. from :func:`farms_compact`) into a dense
+    array.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        1D array of values.
+    index : np.ndarray
+        Flat (C-order) index of the values in the dense array.
+    shape : tuple
+        Shape of the dense array.
+    fill : float
+        Fill value for the cells that are not in index.
+    out : np.ndarray | None
+        Optional preallocated dense array with the given shape to scatter
+        into (e.g. a np.memmap).
+
+    Returns
+    -------
+    out : np.ndarray
+        Dense array with the dtype of values (or out if given).
+    """
+    if out is None:
+        out = np.empty(shape, dtype=values.dtype)
+    elif out.shape != tuple(shape):
+        msg = 'Output shape {} does not match the domain shape {}'.format(
+            out.shape, tuple(shape))
+        raise ValueError(msg)
+
+    out[...] = fill
+    np.put(out, index, values)
+
     return out
+
+
+def farms_stream(blocks, static=None, **kwargs):
+    """Run FARMS on a stream of input blocks (e.g. time slices).
+
+    This generator runs :func:`farms` on one block at a time as blocks
+    arrive so that memory use is independent of the record length, e.g.
+    for near-real-time processing of satellite scans one timestep at a time.
+    Blocks are pulled from the input iterator lazily, one at a time.
+
+    Parameters
+    ----------
+    blocks : iterable
+        Iterable of input blocks. Each block is either a dict of arrays keyed
+        by the :func:`farms` argument names (see FARMS_INPUTS) or a sequence
+        of arrays in the positional argument order of :func:`farms`.
+    static : dict | None
+        Optional input arrays that are the same for every block (e.g. a
+        (1, n_sites) albedo or cloud-free transmittances), keyed by the
+        :func:`farms` argument names. Arrays must be broadcastable against
+        the block arrays. Inputs in a block take precedence.
+    kwargs : dict
+        Additional keyword arguments for :func:`farms`, e.g. backend, lut,
+        or dtype.
+
+    Yields
+    ------
+    out : tuple | collections.namedtuple
+        The output of :func:`farms` for each block: (ghi, dni_farmsdni,
+        dni0) or the fast_data namedtuple if debug=True.
+    """
+    static = static or {}
+    for block in blocks:
+        if not isinstance(block, dict):
+            block = dict(zip(FARMS_INPUTS, block))
+
+        inputs = {**static, **block}
+        missing = [name for name in FARMS_INPUTS if name not in inputs]
+        if missing:
+            msg = 'FARMS input block is missing: {}'.format(missing)
+            raise ValueError(msg)
+
+        arrays = [np.asarray(inputs[name]) for name in FARMS_INPUTS]
+        shape = np.broadcast(*arrays).shape
+        yield farms(*(np.broadcast_to(arr, shape) for arr in arrays),
+                    **kwargs)
@@ -19,6 +19,8 @@ J. Renewable Sustainable Energy 14, 063703.
 
 import numpy as np
 
+from farms.profiling import stage
+
 
 def TDD2(Z, Ftotal, F1):
     """
@@ -81,12 +83,193 @@ def TDDP(Z, tau, De, phase):
     Tddcld = np.zeros_like(tau)
     phase1 = np.where(phase == 1)
     phase2 = np.where(phase == 2)
-    Tddcld[phase1] = Pwater(Z[phase1], tau[phase1], De[phase1])
-    Tddcld[phase2] = Pice(Z[phase2], tau[phase2], De[phase2])
+    with stage("Pwater", phase1[0]):
+        Tddcld[phase1] = Pwater(Z[phase1], tau[phase1], De[phase1])
+    with stage("Pice", phase2[0]):
+        Tddcld[phase2] = Pice(Z[phase2], tau[phase2], De[phase2])
 
     return Tddcld
 
 
+# Piecewise parameterization tables of Yang et al. (2022). Band edges are
+# values of the cosine of the solar zenith angle (umu0). Bands "closed" on the
+# left are lo <= umu0 < hi, bands closed on the right are lo < umu0 <= hi.
+# Polynomial coefficients (c0, c1, c2) are evaluated as
+# c0 * x^2 + c1 * x + c2 (see _polyval2).
+
+# Eq.(3) taup for water clouds with De < 10 (row 0) and De >= 10 (row 1),
+# bands closed on the left.
+PWATER_TAUP_EDGES = np.array(
+    [
+        [0.1391, 0.2419, 0.3090, 0.4067, 0.6156],
+        [0.1391, 0.2079, 0.3090, 0.3746, 0.6156],
+    ]
+)
+PWATER_TAUP = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 1.0])
+
+# Eq.(4) Tddp / h polynomial in umu0 for water clouds, bands closed on the
+# left (umu0 < 0 has Tddp = 0).
+PWATER_TDDP_EDGES = np.array(
+    [0.0, 0.342, 0.4694, 0.7193, 0.8829, 0.9396, 0.9945, 0.999]
+)
+PWATER_TDDP = np.array(
+    [
+        [0.0, 0.0, 0.0],
+        [-0.1787, 0.2207, 0.977],
+        [0.0, 0.0, 1.0],
+        [2.6399, -3.2111, 1.9434],
+        [-0.224, 0.0835, 1.056],
+        [-94.381, 170.32, -75.843],
+        [-12.794, 22.686, -8.9392],
+        [11248.61, -22441.07, 11193.59],
+        [0.0, 0.0, 0.76],
+    ]
+)
+
+# Eq.(3) taup for ice clouds with 5 <= De < 14, bands closed on the left.
+PICE_TAUP_EDGES = np.array([0.1391, 0.2079, 0.3090, 0.3746, 0.6156, 0.9994])
+PICE_TAUP = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 1.0, 1.5])
+
+# Eq.(3) taup for ice clouds with 14 <= De < 50 (row 0) and De >= 50 (row 1).
+# Band edges are linear in De: edge = slope * De + intercept. Bands are closed
+# on the left and later bands take precedence where edges are not monotonic.
+PICE_TAUP_SLOPES = np.array(
+    [
+        [0.0, -0.0011, -0.0022, -0.0020, -0.0033, -0.0049],
+        [-0.0006, -0.0005, -0.0010, -0.0008, -0.0017, -0.0006],
+    ]
+)
+PICE_TAUP_INTERCEPTS = np.array(
+    [
+        [0.139173, 0.2307, 0.3340, 0.4096, 0.6461, 1.0713],
+        [0.2109, 0.2581, 0.3907, 0.4900, 0.8708, 1.0367],
+    ]
+)
+PICE_TAUP_LINEAR = np.array(
+    [
+        [0.1, 0.2, 0.3, 0.4, 0.5, 1.0, 1.5],
+        [0.2, 0.3, 0.4, 0.5, 1.0, 1.5, 2.0],
+    ]
+)
+
+# Eq.(4) Tddp polynomial in umu0 for ice clouds with De <= 10 and
+# umu0 < 0.9994, bands closed on the left.
+PICE_TDDP_SMALL_EDGES = np.array([0.9396, 0.9945])
+PICE_TDDP_SMALL = np.array(
+    [
+        [0.0, 0.0, 0.14991],
+        [-4.5171, 8.3056, -3.6476],
+        [298.45, -601.33, 303.04],
+    ]
+)
+
+# Eq.(4) Tddp polynomial in umu0 for ice clouds with umu0 < 0.999 and
+# 10 < De <= 30 (row 0) or De > 30 (row 1), bands closed on the right. The
+# polynomial is scaled by a second polynomial in De (PICE_TDDP_SCALE).
+PICE_TDDP_EDGES = np.array(
+    [
+        0.2419,
+        0.3746,
+        0.4694,
+        0.5877,
+        0.6691,
+        0.7660,
+        0.8480,
+        0.8987,
+        0.9396,
+        0.9702,
+        0.9945,
+    ]
+)
+PICE_TDDP = np.array(
+    [
+        [
+            [-8.454, 2.4095, 0.8425],
+            [-13.528, 7.8403, -0.1221],
+            [19.524, -16.5, 4.4612],
+            [16.737, -17.419, 5.4881],
+            [-39.493, 48.963, -14.175],
+            [0.4017, -0.243, 0.9609],
+            [-11.183, 18.126, -6.3417],
+            [-163.36, 283.35, -121.91],
+            [-202.72, 368.75, -166.75],
+            [-181.72, 343.59, -161.3],
+            [127.66, -255.73, 129.03],
+            [908.66, -1869.3, 961.63],
+        ],
+        [
+            [-4.362, -0.0878, 1.1218],
+            [-49.566, 28.767, -3.1299],
+            [58.572, -49.5, 11.363],
+            [62.118, -63.037, 16.875],
+            [-237.68, 293.21, -89.328],
+            [1.2051, -0.7291, 0.8826],
+            [-55.6, 90.698, -35.905],
+            [-422.36, 733.97, -317.89],
+            [-457.09, 831.11, -376.85],
+            [-344.91, 655.67, -310.5],
+            [622.85, -1227.6, 605.97],
+            [6309.63, -12654.78, 6346.15],
+        ],
+    ]
+)
+PICE_TDDP_SCALE = np.array(
+    [
+        [-0.000232338, 0.012748726, 0.046745083],
+        [0.0000166112, -0.00410998, 0.352026619],
+    ]
+)
+
+
+def _band_index(x, edges, closed="left"):
+    """Get the index of the piecewise band containing each value of x.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Values to classify.
+    edges : np.ndarray
+        Sorted 1D array of n band edges defining n + 1 bands.
+    closed : str
+        "left" for bands lo <= x < hi or "right" for bands lo < x <= hi.
+
+    Returns
+    -------
+    index : np.ndarray
+        Integer band index in [0, n] for each value of x.
+    """
+    side = "right" if closed == "left" else "left"
+    return np.searchsorted(edges, x, side=side)
+
+
+def _linear_band_index(x, De, slopes, intercepts):
+    """Get the index of the band containing each value of x where band edges
+    are linear functions of De (bands closed on the left). Later bands take
+    precedence where edges are not monotonic. Values outside of all bands
+    (e.g. NaN) get an index of -1.
+    """
+    index = np.full(x.shape, -1)
+    lower = np.full(x.shape, -np.inf)
+    for i in range(len(slopes) + 1):
+        if i < len(slopes):
+            upper = slopes[i] * De + intercepts[i]
+        else:
+            upper = np.full(x.shape, np.inf)
+        index[(x >= lower) & (x < upper)] = i
+        lower = upper
+
+    return index
+
+
+def _polyval2(coeffs, x):
+    """Evaluate c0 * x^2 + c1 * x + c2 for an (..., 3) coefficient array.
+    Coefficients are cast to the dtype of x (e.g. float32)."""
+    coeffs = np.asarray(coeffs, dtype=x.dtype)
+    return (
+        coeffs[..., 0] * np.power(x, 2.0) + coeffs[..., 1] * x + coeffs[..., 2]
+    )
+
+
 def Pwater(Z, tau, De):
     """
     Compute cloud transmittance for water clouds
@@ -114,52 +297,14 @@ def Pwater(Z, tau, De):
     umu0 = np.cos(Z * np.pi / 180.0)
     # taup  Eq.(3) in Yang et al. (2022)
     taup = np.zeros_like(Z)
-    taup[(De < 10.0) & (umu0 < 0.1391)] = 0.1
-    taup[(De < 10.0) & (umu0 >= 0.1391) & (umu0 < 0.2419)] = 0.2
-    taup[(De < 10.0) & (umu0 >= 0.2419) & (umu0 < 0.3090)] = 0.3
-    taup[(De < 10.0) & (umu0 >= 0.3090) & (umu0 < 0.4067)] = 0.4
-    taup[(De < 10.0) & (umu0 >= 0.4067) & (umu0 < 0.6156)] = 0.5
-    taup[(De < 10.0) & (umu0 >= 0.6156)] = 1.0
-
-    taup[(De >= 10.0) & (umu0 < 0.1391)] = 0.1
-    taup[(De >= 10.0) & (umu0 >= 0.1391) & (umu0 < 0.2079)] = 0.2
-    taup[(De >= 10.0) & (umu0 >= 0.2079) & (umu0 < 0.3090)] = 0.3
-    taup[(De >= 10.0) & (umu0 >= 0.3090) & (umu0 < 0.3746)] = 0.4
-    taup[(De >= 10.0) & (umu0 >= 0.3746) & (umu0 < 0.6156)] = 0.5
-    taup[(De >= 10.0) & (umu0 >= 0.6156)] = 1.0
+    for edges, mask in zip(PWATER_TAUP_EDGES, (De < 10.0, De >= 10.0)):
+        taup[mask] = PWATER_TAUP[_band_index(umu0[mask], edges)]
 
     # Tddp  Eq(4) in Yang et al. (2022)
     h = 0.005553 * np.log(De) + 0.002503
     h[De == 0] = 0.0
-    Tddp = np.zeros_like(Z)
-    a1 = (umu0 >= 0.0) & (umu0 < 0.342)
-    Tddp[a1] = h[a1] * (
-        -0.1787 * umu0[a1] * umu0[a1] + 0.2207 * umu0[a1] + 0.977
-    )
-    a2 = (umu0 >= 0.342) & (umu0 < 0.4694)
-    Tddp[a2] = h[a2]
-    a3 = (umu0 >= 0.4694) & (umu0 < 0.7193)
-    Tddp[a3] = h[a3] * (
-        2.6399 * umu0[a3] * umu0[a3] - 3.2111 * umu0[a3] + 1.9434
-    )
-    a4 = (umu0 >= 0.7193) & (umu0 < 0.8829)
-    Tddp[a4] = h[a4] * (
-        -0.224 * umu0[a4] * umu0[a4] + 0.0835 * umu0[a4] + 1.056
-    )
-    a5 = (umu0 >= 0.8829) & (umu0 < 0.9396)
-    Tddp[a5] = h[a5] * (
-        -94.381 * umu0[a5] * umu0[a5] + 170.32 * umu0[a5] - 75.843
-    )
-    a6 = (umu0 >= 0.9396) & (umu0 < 0.9945)
-    Tddp[a6] = h[a6] * (
-        -12.794 * umu0[a6] * umu0[a6] + 22.686 * umu0[a6] - 8.9392
-    )
-    a7 = (umu0 >= 0.9945) & (umu0 < 0.999)
-    Tddp[a7] = h[a7] * (
-        11248.61 * umu0[a7] * umu0[a7] - 22441.07 * umu0[a7] + 11193.59
-    )
-    a8 = umu0 >= 0.999
-    Tddp[a8] = 0.76 * h[a8]
+    coeffs = PWATER_TDDP[_band_index(umu0, PWATER_TDDP_EDGES)]
+    Tddp = h * _polyval2(coeffs, umu0)
 
     # Eq.(6) in Yang et al. (2022)
     a = 2.0339 * np.power(umu0, -0.927)
@@ -209,270 +354,46 @@ def Pice(Z, tau, De):
     umu0 = np.cos(Z * np.pi / 180.0)
     # taup Eq.(3) in Yang et al. (2022)
     taup = np.zeros_like(Z)
-    a1 = (De >= 5.0) & (De < 14.0) & (umu0 < 0.1391)
-    taup[a1] = 0.1
-    a2 = (De >= 5.0) & (De < 14.0) & (umu0 >= 0.1391) & (umu0 < 0.2079)
-    taup[a2] = 0.2
-    a3 = (De >= 5.0) & (De < 14.0) & (umu0 >= 0.2079) & (umu0 < 0.3090)
-    taup[a3] = 0.3
-    a4 = (De >= 5.0) & (De < 14.0) & (umu0 >= 0.3090) & (umu0 < 0.3746)
-    taup[a4] = 0.4
-    a5 = (De >= 5.0) & (De < 14.0) & (umu0 >= 0.3746) & (umu0 < 0.6156)
-    taup[a5] = 0.5
-    a6 = (De >= 5.0) & (De < 14.0) & (umu0 >= 0.6156) & (umu0 < 0.9994)
-    taup[a6] = 1.0
-    a7 = (De >= 5.0) & (De < 14.0) & (umu0 >= 0.9994)
-    taup[a7] = 1.5
-
-    a8 = (De >= 14.0) & (De < 50.0) & (umu0 < 0.139173)
-    taup[a8] = 0.1
-    a9 = (
-        (De >= 14.0)
-        & (De < 50.0)
-        & (umu0 >= 0.139173)
-        & (umu0 < -0.0011 * De + 0.2307)
-    )
-    taup[a9] = 0.2
-    a10 = (
-        (De >= 14.0)
-        & (De < 50.0)
-        & (umu0 >= -0.0011 * De + 0.2307)
-        & (umu0 < -0.0022 * De + 0.3340)
-    )
-    taup[a10] = 0.3
-    a11 = (
-        (De >= 14.0)
-        & (De < 50.0)
-        & (umu0 >= -0.0022 * De + 0.3340)
-        & (umu0 < -0.0020 * De + 0.4096)
-    )
-    taup[a11] = 0.4
-    a12 = (
-        (De >= 14.0)
-        & (De < 50.0)
-        & (umu0 >= -0.0020 * De + 0.4096)
-        & (umu0 < -0.0033 * De + 0.6461)
-    )
-    taup[a12] = 0.5
-    a13 = (
-        (De >= 14.0)
-        & (De < 50.0)
-        & (umu0 >= -0.0033 * De + 0.6461)
-        & (umu0 < -0.0049 * De + 1.0713)
-    )
-    taup[a13] = 1.0
-    a14 = (De >= 14.0) & (De < 50.0) & (umu0 >= -0.0049 * De + 1.0713)
-    taup[a14] = 1.5
-    a15 = (De >= 50.0) & (umu0 < -0.0006 * De + 0.2109)
-    taup[a15] = 0.2
-    a16 = (
-        (De >= 50.0)
-        & (umu0 >= -0.0006 * De + 0.2109)
-        & (umu0 < -0.0005 * De + 0.2581)
-    )
-    taup[a16] = 0.3
-    a17 = (
-        (De >= 50.0)
-        & (umu0 >= -0.0005 * De + 0.2581)
-        & (umu0 < -0.0010 * De + 0.3907)
-    )
-    taup[a17] = 0.4
-    a18 = (
-        (De >= 50.0)
-        & (umu0 >= -0.0010 * De + 0.3907)
-        & (umu0 < -0.0008 * De + 0.4900)
-    )
-    taup[a18] = 0.5
-    a19 = (
-        (De >= 50.0)
-        & (umu0 >= -0.0008 * De + 0.4900)
-        & (umu0 < -0.0017 * De + 0.8708)
-    )
-    taup[a19] = 1.0
-    a20 = (
-        (De >= 50.0)
-        & (umu0 >= -0.0017 * De + 0.8708)
-        & (umu0 < -0.0006 * De + 1.0367)
-    )
-    taup[a20] = 1.5
-    a21 = (De >= 50.0) & (umu0 >= -0.0006 * De + 1.0367)
-    taup[a21] = 2.0
+    mask = (De >= 5.0) & (De < 14.0)
+    taup[mask] = PICE_TAUP[_band_index(umu0[mask], PICE_TAUP_EDGES)]
+    masks = ((De >= 14.0) & (De < 50.0), De >= 50.0)
+    for i, mask in enumerate(masks):
+        index = _linear_band_index(
+            umu0[mask],
+            De[mask],
+            PICE_TAUP_SLOPES[i],
+            PICE_TAUP_INTERCEPTS[i],
+        )
+        taup[mask] = np.where(index >= 0, PICE_TAUP_LINEAR[i][index], 0.0)
 
     # Tddp   Eq(4) in Yang et al. (2022)
     Tddp = np.zeros_like(Z)
-    b1 = (umu0 >= 0.9994) & (De <= 10.0)
-    Tddp[b1] = 0.12269
-    b2 = (umu0 >= 0.9994) & (De > 10.0) & (De <= 16.0)
-    Tddp[b2] = 0.0015 * De[b2] + 0.1078
-    b3 = (umu0 >= 0.9994) & (De > 16.0)
-    Tddp[b3] = 0.1621 * np.exp(-0.016 * De[b3])
-
-    b4 = (umu0 < 0.9396) & (De <= 10.0)
-    Tddp[b4] = 0.14991
-    b5 = (umu0 < 0.9945) & (umu0 >= 0.9396) & (De <= 10.0)
-    Tddp[b5] = -4.5171 * np.power(umu0[b5], 2.0) + 8.3056 * umu0[b5] - 3.6476
-    b6 = (umu0 >= 0.9945) & (umu0 < 0.9994) & (De <= 10.0)
-    Tddp[b6] = 298.45 * np.power(umu0[b6], 2.0) - 601.33 * umu0[b6] + 303.04
-
-    ade = -0.000232338 * np.power(De, 2.0) + 0.012748726 * De + 0.046745083
-    b7 = (umu0 < 0.999) & (De > 10.0) & (De <= 30.0) & (umu0 <= 0.2419)
-    Tddp[b7] = (
-        -8.454 * np.power(umu0[b7], 2.0) + 2.4095 * umu0[b7] + 0.8425
-    ) * ade[b7]
-    b8 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.2419)
-        & (umu0 <= 0.3746)
-    )
-    Tddp[b8] = (
-        -13.528 * np.power(umu0[b8], 2.0) + 7.8403 * umu0[b8] - 0.1221
-    ) * ade[b8]
-    b9 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.3746)
-        & (umu0 <= 0.4694)
-    )
-    Tddp[b9] = (
-        19.524 * np.power(umu0[b9], 2.0) - 16.5 * umu0[b9] + 4.4612
-    ) * ade[b9]
-    b10 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.4694)
-        & (umu0 <= 0.5877)
-    )
-    Tddp[b10] = (
-        16.737 * np.power(umu0[b10], 2.0) - 17.419 * umu0[b10] + 5.4881
-    ) * ade[b10]
-    b11 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.5877)
-        & (umu0 <= 0.6691)
-    )
-    Tddp[b11] = (
-        -39.493 * np.power(umu0[b11], 2.0) + 48.963 * umu0[b11] - 14.175
-    ) * ade[b11]
-    b12 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.6691)
-        & (umu0 <= 0.7660)
-    )
-    Tddp[b12] = (
-        0.4017 * np.power(umu0[b12], 2.0) - 0.243 * umu0[b12] + 0.9609
-    ) * ade[b12]
-    b13 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.7660)
-        & (umu0 <= 0.8480)
+    mask = umu0 >= 0.9994
+    De_mask = De[mask]
+    Tddp[mask] = np.select(
+        [De_mask <= 10.0, De_mask <= 16.0, De_mask > 16.0],
+        [
+            0.12269,
+            0.0015 * De_mask + 0.1078,
+            0.1621 * np.exp(-0.016 * De_mask),
+        ],
     )
-    Tddp[b13] = (
-        -11.183 * np.power(umu0[b13], 2.0) + 18.126 * umu0[b13] - 6.3417
-    ) * ade[b13]
-    b14 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.8480)
-        & (umu0 <= 0.8987)
-    )
-    Tddp[b14] = (
-        -163.36 * np.power(umu0[b14], 2.0) + 283.35 * umu0[b14] - 121.91
-    ) * ade[b14]
-    b15 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.8987)
-        & (umu0 <= 0.9396)
-    )
-    Tddp[b15] = (
-        -202.72 * np.power(umu0[b15], 2.0) + 368.75 * umu0[b15] - 166.75
-    ) * ade[b15]
-    b16 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.9396)
-        & (umu0 <= 0.9702)
-    )
-    Tddp[b16] = (
-        -181.72 * np.power(umu0[b16], 2.0) + 343.59 * umu0[b16] - 161.3
-    ) * ade[b16]
-    b17 = (
-        (umu0 < 0.999)
-        & (De > 10.0)
-        & (De <= 30.0)
-        & (umu0 > 0.9702)
-        & (umu0 <= 0.9945)
+
+    mask = (umu0 < 0.9994) & (De <= 10.0)
+    coeffs = PICE_TDDP_SMALL[
+        _band_index(umu0[mask], PICE_TDDP_SMALL_EDGES)
+    ]
+    Tddp[mask] = _polyval2(coeffs, umu0[mask])
+
+    masks = (
+        (umu0 < 0.999) & (De > 10.0) & (De <= 30.0),
+        (umu0 < 0.999) & (De > 30.0),
     )
-    Tddp[b17] = (
-        127.66 * np.power(umu0[b17], 2.0) - 255.73 * umu0[b17] + 129.03
-    ) * ade[b17]
-    b18 = (umu0 < 0.999) & (De > 10.0) & (De <= 30.0) & (umu0 > 0.9945)
-    Tddp[b18] = (
-        908.66 * np.power(umu0[b18], 2.0) - 1869.3 * umu0[b18] + 961.63
-    ) * ade[b18]
-
-    bde = 0.0000166112 * np.power(De, 2.0) - 0.00410998 * De + 0.352026619
-    b19 = (umu0 < 0.999) & (De > 30.0) & (umu0 <= 0.2419)
-    Tddp[b19] = (
-        -4.362 * np.power(umu0[b19], 2.0) - 0.0878 * umu0[b19] + 1.1218
-    ) * bde[b19]
-    b20 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.2419) & (umu0 <= 0.3746)
-    Tddp[b20] = (
-        -49.566 * np.power(umu0[b20], 2.0) + 28.767 * umu0[b20] - 3.1299
-    ) * bde[b20]
-    b21 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.3746) & (umu0 <= 0.4694)
-    Tddp[b21] = (
-        58.572 * np.power(umu0[b21], 2.0) - 49.5 * umu0[b21] + 11.363
-    ) * bde[b21]
-    b22 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.4694) & (umu0 <= 0.5877)
-    Tddp[b22] = (
-        62.118 * np.power(umu0[b22], 2.0) - 63.037 * umu0[b22] + 16.875
-    ) * bde[b22]
-    b23 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.5877) & (umu0 <= 0.6691)
-    Tddp[b23] = (
-        -237.68 * np.power(umu0[b23], 2.0) + 293.21 * umu0[b23] - 89.328
-    ) * bde[b23]
-    b24 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.6691) & (umu0 <= 0.7660)
-    Tddp[b24] = (
-        1.2051 * np.power(umu0[b24], 2.0) - 0.7291 * umu0[b24] + 0.8826
-    ) * bde[b24]
-    b25 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.7660) & (umu0 <= 0.8480)
-    Tddp[b25] = (
-        -55.6 * np.power(umu0[b25], 2.0) + 90.698 * umu0[b25] - 35.905
-    ) * bde[b25]
-    b26 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.8480) & (umu0 <= 0.8987)
-    Tddp[b26] = (
-        -422.36 * np.power(umu0[b26], 2.0) + 733.97 * umu0[b26] - 317.89
-    ) * bde[b26]
-    b27 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.8987) & (umu0 <= 0.9396)
-    Tddp[b27] = (
-        -457.09 * np.power(umu0[b27], 2.0) + 831.11 * umu0[b27] - 376.85
-    ) * bde[b27]
-    b28 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.9396) & (umu0 <= 0.9702)
-    Tddp[b28] = (
-        -344.91 * np.power(umu0[b28], 2.0) + 655.67 * umu0[b28] - 310.5
-    ) * bde[b28]
-    b29 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.9702) & (umu0 <= 0.9945)
-    Tddp[b29] = (
-        622.85 * np.power(umu0[b29], 2.0) - 1227.6 * umu0[b29] + 605.97
-    ) * bde[b29]
-    b30 = (umu0 < 0.999) & (De > 30.0) & (umu0 > 0.9945)
-    Tddp[b30] = (
-        6309.63 * np.power(umu0[b30], 2.0) - 12654.78 * umu0[b30] + 6346.15
-    ) * bde[b30]
+    for i, mask in enumerate(masks):
+        index = _band_index(umu0[mask], PICE_TDDP_EDGES, closed="right")
+        Tddp[mask] = _polyval2(PICE_TDDP[i][index], umu0[mask]) * _polyval2(
+            PICE_TDDP_SCALE[i], De[mask]
+        )
 
     # compute Tddcld using Eq.(5) in Yang et al. (2022)
     a = 1.7686 * np.power(umu0, -0.95)
@@ -491,7 +412,57 @@ def Pice(Z, tau, De):
     return Tddcld
 
 
-def farms_dni(F0, tau, solar_zenith_angle, De, phase, Tddclr, Ftotal, F1):
+def scale_tau(tau, phase):
+    """
+    Scale the cloud optical thickness for the computation of DNI. See Eqs.
+    (3a and 3b) in Xie et al. (2020), iScience.
+
+    Parameters
+    ----------
+    tau : np.ndarray
+        Cloud optical thickness (cld_opd_dcomp) (unitless).
+    phase: np.ndarray
+        Cloud thermodynamic phase (water:1, ice:2)
+
+    Returns
+    -------
+    taudni : np.ndarray
+        Scaled cloud optical thickness (zero for non-cloudy phases).
+    """
+    taudni = np.zeros_like(tau)
+    a1 = np.where((phase == 1) & (tau < 8.0))
+    a2 = np.where((phase == 1) & (tau >= 8.0))
+    temp1 = (
+        0.254825 * tau[a1]
+        - 0.00232717 * tau[a1] ** 2.0
+        + 5.19320e-06 * tau[a1] ** 3.0
+    )
+    taudni[a1] = temp1 * (1.0 + (8.0 - tau[a1]) * 0.07)
+    taudni[a2] = 0.2 * np.power(tau[a2] - 8.0, 1.5) + 2.10871
+
+    b1 = np.where((phase == 2) & (tau < 8.0))
+    b2 = np.where((phase == 2) & (tau >= 8.0))
+    taudni[b1] = (
+        0.345353 * tau[b1]
+        - 0.00244671 * np.power(tau[b1], 2.0)
+        + (4.74263e-06) * np.power(tau[b1], 3.0)
+    )
+    taudni[b2] = 0.2 * np.power(tau[b2] - 8.0, 1.5) + 2.91345
+
+    return taudni
+
+
+def farms_dni(
+    F0,
+    tau,
+    solar_zenith_angle,
+    De,
+    phase,
+    Tddclr,
+    Ftotal,
+    F1,
+    Tddcld1=None,
+):
     """
     Fast All-sky Radiation Model for solar applications with direct normal
     irradiance (FARMS-DNI)
@@ -533,6 +504,9 @@ def farms_dni(F0, tau, solar_zenith_angle, De, phase, Tddclr, Ftotal, F1):
     F1: np.ndarray
         First order solar radiation given in FARMS (Wm-2).
         See Xie et al. (2016) for more details.
+    Tddcld1: np.ndarray | None
+        Optional precomputed cloud transmittance of DNI in the circumsolar
+        region (e.g. from :mod:`farms.lut`). Computed with TDDP if None.
 
     Returns
     -------
@@ -548,38 +522,25 @@ def farms_dni(F0, tau, solar_zenith_angle, De, phase, Tddclr, Ftotal, F1):
 
     # scale tau for the computation of DNI. See Eqs. (3a and 3b) in
     # Xie et al. (2020), iScience.
-    taudni = np.zeros_like(tau)
-    a1 = np.where((phase == 1) & (tau < 8.0))
-    a2 = np.where((phase == 1) & (tau >= 8.0))
-    temp1 = (
-        0.254825 * tau[a1]
-        - 0.00232717 * tau[a1] ** 2.0
-        + 5.19320e-06 * tau[a1] ** 3.0
-    )
-    taudni[a1] = temp1 * (1.0 + (8.0 - tau[a1]) * 0.07)
-    taudni[a2] = 0.2 * np.power(tau[a2] - 8.0, 1.5) + 2.10871
-
-    b1 = np.where((phase == 2) & (tau < 8.0))
-    b2 = np.where((phase == 2) & (tau >= 8.0))
-    taudni[b1] = (
-        0.345353 * tau[b1]
-        - 0.00244671 * np.power(tau[b1], 2.0)
-        + (4.74263e-06) * np.power(tau[b1], 3.0)
-    )
-    taudni[b2] = 0.2 * np.power(tau[b2] - 8.0, 1.5) + 2.91345
+    with stage("scale_tau", tau):
+        taudni = scale_tau(tau, phase)
 
     # compute DNI in the narrow beam. Eq.(S2) in Xie et al. (2020), iScience.
-    Z = np.arccos(solar_zenith_angle) * 180.0 / np.pi
-    dni0 = F0 * Tddclr * np.exp(-tau / solar_zenith_angle)
+    with stage("narrow_beam", tau):
+        Z = np.arccos(solar_zenith_angle) * 180.0 / np.pi
+        dni0 = F0 * Tddclr * np.exp(-tau / solar_zenith_angle)
 
-    Tddcld0 = np.exp(-taudni / solar_zenith_angle)
-    Fd0 = solar_zenith_angle * F0 * Tddcld0 * Tddclr
+        Tddcld0 = np.exp(-taudni / solar_zenith_angle)
+        Fd0 = solar_zenith_angle * F0 * Tddcld0 * Tddclr
 
     # compute scattered radiation in the circumsolar region. Eq.(S3 and S4)
     # in Xie et al. (2020), iScience.
-    Tddcld1 = TDDP(Z, taudni, De, phase)
+    if Tddcld1 is None:
+        with stage("TDDP", tau):
+            Tddcld1 = TDDP(Z, taudni, De, phase)
     Fd1 = solar_zenith_angle * F0 * Tddclr * Tddcld1
-    Fd2 = TDD2(Z, Ftotal, F1)
+    with stage("TDD2", tau):
+        Fd2 = TDD2(Z, Ftotal, F1)
 
     # compute DNI using the three components. Eq.(S1) in
     # Xie et al. (2020), iScience.
@@ -0,0 +1,399 @@
+"""
+Numba JIT-compiled FARMS + FARMS-DNI kernel.
+
+This module fuses :func:`farms.farms.farms` and
+:func:`farms.farms_dni.farms_dni` into a single loop over every (time, site)
+element so that no full-size intermediate arrays (phase masks, ``Tducld``,
+``Ruucld``, ``taudni``, the piecewise ``Pwater``/``Pice`` band masks, etc...)
+are allocated. Only the three outputs (``ghi``, ``dni_farmsdni``, ``dni0``)
+are written.
+
+The kernel is selected with ``farms(..., backend='numba')`` and requires the
+optional ``numba`` dependency (``pip install NREL-farms[numba]``).
+
+Accuracy
+--------
+The scalar kernel evaluates the exact same equations and piecewise branch
+conditions as the vectorized numpy implementation, but libm transcendental
+functions and floating point operation ordering can differ in the last few
+ulps. Outputs are guaranteed to match the numpy backend to within
+``RTOL`` relative and ``ATOL`` absolute (W/m2) tolerance, i.e.
+``np.allclose(numba_out, numpy_out, rtol=RTOL, atol=ATOL, equal_nan=True)``.
+"""
+
+import math
+
+import numpy as np
+
+from farms import CLEAR_TYPES, ICE_TYPES, SOLAR_CONSTANT, WATER_TYPES
+from farms.farms_dni import (
+    PICE_TAUP,
+    PICE_TAUP_EDGES,
+    PICE_TAUP_INTERCEPTS,
+    PICE_TAUP_LINEAR,
+    PICE_TAUP_SLOPES,
+    PICE_TDDP,
+    PICE_TDDP_EDGES,
+    PICE_TDDP_SCALE,
+    PICE_TDDP_SMALL,
+    PICE_TDDP_SMALL_EDGES,
+    PWATER_TAUP,
+    PWATER_TAUP_EDGES,
+    PWATER_TDDP,
+    PWATER_TDDP_EDGES,
+)
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Documented numba vs. numpy backend agreement (relative and W/m2 absolute)
+RTOL = 1e-9
+ATOL = 1e-6
+
+
+def _jit(func):
+    """Compile a function with numba if available (lazy compilation). The GIL
+    is released so the kernel can run on multiple threads."""
+    if njit is None:
+        return func
+    return njit(cache=True, nogil=True, error_model='numpy')(func)
+
+
+@_jit
+def _in(value, codes):
+    """Check if a scalar cloud type is in an array of cloud type codes."""
+    for code in codes:  # noqa: SIM110
+        if value == code:
+            return True
+    return False
+
+
+@_jit
+def _water_phase(tau, De, cosz):
+    """Scalar version of farms.farms.water_phase()"""
+    # explicit comparisons (not min/max) to propagate NaN like np.maximum
+    if De < 5.0:  # noqa: PLR1730
+        De = 5.0
+    if De > 120.0:  # noqa: PLR1730
+        De = 120.0
+
+    Ptau = (2.8850 + 0.002 * (De - 60.0)) * cosz - 0.007347
+    PDHI = 0.7846 * (1.0 + 0.0002 * (De - 60.0)) * cosz**0.1605
+    delta = (
+        -0.644531 * cosz
+        + 1.20117
+        + 0.129807 / cosz
+        - 0.00121096 / (cosz * cosz)
+        + 1.52587e-07 / (cosz * cosz * cosz)
+    )
+    y = 0.012 * (tau - Ptau) * cosz
+    Tducld = (
+        (1.0 + math.sinh(y))
+        * PDHI
+        * math.exp(-((math.log10(tau) - math.log10(Ptau)) ** 2.0) / delta)
+    )
+
+    if tau < 1.0:
+        Ruucld = 0.107359 * tau
+    else:
+        Ruucld = 1.03 - math.exp(
+            -(0.5 + math.log10(tau)) * (0.5 + math.log10(tau)) / 3.105
+        )
+
+    return Tducld, Ruucld
+
+
+@_jit
+def _ice_phase(tau, De, cosz):
+    """Scalar version of farms.farms.ice_phase()"""
+    # explicit comparisons (not min/max) to propagate NaN like np.maximum
+    if De < 5.0:  # noqa: PLR1730
+        De = 5.0
+    if De > 140.0:  # noqa: PLR1730
+        De = 140.0
+
+    if De <= 26.0:
+        Ptau = 2.8487 * cosz - 0.0029
+    else:
+        Ptau = (2.8355 + (100.0 - De) * 0.006) * cosz - 0.00612
+
+    PDHI = 0.756 * cosz**0.0883
+    delta = (
+        -0.0549531 * cosz
+        + 0.617632
+        + (0.17876 / cosz)
+        - (0.002174 / cosz**2)
+    )
+    y = 0.01 * (tau - Ptau) * cosz
+    Tducld = (
+        (1.0 + math.sinh(y))
+        * PDHI
+        * math.exp(-((math.log10(tau) - math.log10(Ptau)) ** 2.0) / delta)
+    )
+
+    if tau < 1.0:
+        Ruucld = 0.094039 * tau
+    else:
+        Ruucld = 1.02 - math.exp(
+            -(0.5 + math.log10(tau)) * (0.5 + math.log10(tau)) / 3.25
+        )
+
+    return Tducld, Ruucld
+
+
+@_jit
+def _tddcld(tau, taup, Tddp, a, b):
+    """Scalar version of Eq.(5) in Yang et al. (2022)"""
+    Tddcld = 0.0
+    if tau <= 0.9 * taup:
+        Tddcld = Tddp * math.tanh(a * tau)
+    if tau > 0.9 * taup and tau < taup:
+        temp = math.tanh(b / taup**2.0) - math.tanh(0.9 * a * taup)
+        Tddcld = Tddp * math.tanh(0.9 * a * taup) + Tddp * temp * (
+            tau - 0.9 * taup
+        ) / (0.1 * taup)
+    if tau >= taup:
+        Tddcld = Tddp * math.tanh(b / tau**2.0)
+
+    return Tddcld
+
+
+@_jit
+def _band(x, edges, closed_left):
+    """Scalar version of farms.farms_dni._band_index() (NaN is placed in the
+    last band like np.searchsorted)."""
+    index = 0
+    for edge in edges:
+        inside = x < edge if closed_left else x <= edge
+        if not inside:
+            index += 1
+    return index
+
+
+@_jit
+def _linear_band(x, De, slopes, intercepts):
+    """Scalar version of farms.farms_dni._linear_band_index()"""
+    index = -1
+    lower = -np.inf
+    for i in range(len(slopes) + 1):
+        upper = np.inf
+        if i < len(slopes):
+            upper = slopes[i] * De + intercepts[i]
+        if x >= lower and x < upper:
+            index = i
+        lower = upper
+    return index
+
+
+@_jit
+def _polyval2(coeffs, x):
+    """Scalar version of farms.farms_dni._polyval2()"""
+    return coeffs[0] * x**2.0 + coeffs[1] * x + coeffs[2]
+
+
+@_jit
+def _pwater(Z, tau, De):
+    """Scalar version of farms.farms_dni.Pwater()"""
+    umu0 = math.cos(Z * math.pi / 180.0)
+
+    taup = 0.0
+    if De < 10.0:
+        taup = PWATER_TAUP[_band(umu0, PWATER_TAUP_EDGES[0], True)]
+    elif De >= 10.0:
+        taup = PWATER_TAUP[_band(umu0, PWATER_TAUP_EDGES[1], True)]
+
+    h = 0.0 if De == 0 else 0.005553 * math.log(De) + 0.002503
+    coeffs = PWATER_TDDP[_band(umu0, PWATER_TDDP_EDGES, True)]
+    Tddp = h * _polyval2(coeffs, umu0)
+
+    a = 2.0339 * umu0**-0.927
+    b = 6.6421 * umu0**2.0672
+
+    return _tddcld(tau, taup, Tddp, a, b)
+
+
+@_jit
+def _pice(Z, tau, De):
+    """Scalar version of farms.farms_dni.Pice()"""
+    umu0 = math.cos(Z * math.pi / 180.0)
+
+    taup = 0.0
+    if De >= 5.0 and De < 14.0:
+        taup = PICE_TAUP[_band(umu0, PICE_TAUP_EDGES, True)]
+    elif De >= 14.0:
+        i = 0 if De < 50.0 else 1
+        index = _linear_band(umu0, De, PICE_TAUP_SLOPES[i],
+                             PICE_TAUP_INTERCEPTS[i])
+        if index >= 0:
+            taup = PICE_TAUP_LINEAR[i, index]
+
+    Tddp = 0.0
+    if umu0 >= 0.9994:
+        if De <= 10.0:
+            Tddp = 0.12269
+        elif De <= 16.0:
+            Tddp = 0.0015 * De + 0.1078
+        elif De > 16.0:
+            Tddp = 0.1621 * math.exp(-0.016 * De)
+    elif umu0 < 0.9994 and De <= 10.0:
+        coeffs = PICE_TDDP_SMALL[_band(umu0, PICE_TDDP_SMALL_EDGES, True)]
+        Tddp = _polyval2(coeffs, umu0)
+    elif umu0 < 0.999 and De > 10.0:
+        i = 0 if De <= 30.0 else 1
+        index = _band(umu0, PICE_TDDP_EDGES, False)
+        Tddp = (_polyval2(PICE_TDDP[i, index], umu0)
+                * _polyval2(PICE_TDDP_SCALE[i], De))
+
+    a = 1.7686 * umu0**-0.95
+    b = 7.117 * umu0**1.9658
+
+    return _tddcld(tau, taup, Tddp, a, b)
+
+
+@_jit
+def _taudni(tau, phase):
+    """Scalar version of the scaled tau in farms.farms_dni.farms_dni()"""
+    taudni = 0.0
+    if phase == 1 and tau < 8.0:
+        temp1 = (
+            0.254825 * tau
+            - 0.00232717 * tau**2.0
+            + 5.19320e-06 * tau**3.0
+        )
+        taudni = temp1 * (1.0 + (8.0 - tau) * 0.07)
+    elif phase == 1 and tau >= 8.0:
+        taudni = 0.2 * (tau - 8.0) ** 1.5 + 2.10871
+    elif phase == 2 and tau < 8.0:
+        taudni = (
+            0.345353 * tau
+            - 0.00244671 * tau**2.0
+            + (4.74263e-06) * tau**3.0
+        )
+    elif phase == 2 and tau >= 8.0:
+        taudni = 0.2 * (tau - 8.0) ** 1.5 + 2.91345
+
+    return taudni
+
+
+@_jit
+def _tdd2(Z, Ftotal, F1):
+    """Scalar version of farms.farms_dni.TDD2()"""
+    a = 5.94991536e-03
+    b = 5.42116600e-01
+    c = 331280.9859904468
+    muomega = a * math.exp(-((Z - b) ** 3.0) / c)
+
+    return math.cos(Z * math.pi / 180.0) * (Ftotal - F1) * muomega / math.pi
+
+
+@_jit
+def _farms_element(tau, ct, reff, sza, radius, Tuuclr, Ruuclr, Tddclr,
+                   Tduclr, albedo, water_types, ice_types):
+    """Compute (ghi, dni_farmsdni, dni0) for a single cloudy element."""
+    F0 = SOLAR_CONSTANT / (radius * radius)
+    cosz = math.cos(math.radians(sza))
+    De = 2.0 * reff
+
+    phase = 0
+    Tducld = 0.0
+    Ruucld = 0.0
+    if _in(ct, water_types):
+        phase = 1
+        Tducld, Ruucld = _water_phase(tau, De, cosz)
+    elif _in(ct, ice_types):
+        phase = 2
+        Tducld, Ruucld = _ice_phase(tau, De, cosz)
+
+    # eq 8, 3, and 6 from Xie et al. (2016)
+    Tddcld = math.exp(-tau / cosz)
+    F1 = cosz * F0 * (Tddcld * (Tddclr + Tduclr) + Tducld * Tuuclr)
+    ghi = F1 / (1.0 - albedo * (Ruuclr + Ruucld * Tuuclr * Tuuclr))
+
+    # FARMS-DNI, see farms.farms_dni.farms_dni()
+    taudni = _taudni(tau, phase)
+    Z = math.acos(cosz) * 180.0 / math.pi
+    dni0 = F0 * Tddclr * math.exp(-tau / cosz)
+    Fd0 = cosz * F0 * math.exp(-taudni / cosz) * Tddclr
+
+    Tddcld1 = 0.0
+    if phase == 1:
+        Tddcld1 = _pwater(Z, taudni, De)
+    elif phase == 2:
+        Tddcld1 = _pice(Z, taudni, De)
+
+    Fd1 = cosz * F0 * Tddclr * Tddcld1
+    Fd2 = _tdd2(Z, ghi, F1)
+    dni = (Fd0 + Fd1 + Fd2) / cosz
+
+    return ghi, dni, dni0
+
+
+@_jit
+def _farms_kernel(tau, cloud_type, reff, sza, radius, Tuuclr, Ruuclr, Tddclr,
+                  Tduclr, albedo, water_types, ice_types, clear_types,
+                  ghi, dni, dni0):
+    """Fused FARMS + FARMS-DNI loop over 2D (time, sites) arrays."""
+    for i in range(tau.shape[0]):
+        for j in range(tau.shape[1]):
+            ct = cloud_type[i, j]
+            if _in(ct, clear_types):
+                ghi[i, j] = np.nan
+                dni[i, j] = np.nan
+                dni0[i, j] = np.nan
+            else:
+                ghi[i, j], dni[i, j], dni0[i, j] = _farms_element(
+                    tau[i, j], ct, reff[i, j], sza[i, j], radius[i, j],
+                    Tuuclr[i, j], Ruuclr[i, j], Tddclr[i, j], Tduclr[i, j],
+                    albedo[i, j], water_types, ice_types)
+
+
+def _as_2d(arr):
+    """Get a 2D (time, sites) view of an array for the numba kernel."""
+    if arr.ndim == 0:
+        return arr.reshape((1, 1))
+    if arr.ndim == 1:
+        return arr[:, np.newaxis]
+    return arr.reshape((arr.shape[0], -1))
+
+
+def farms_numba(tau, cloud_type, cloud_effective_radius, solar_zenith_angle,
+                radius, Tuuclr, Ruuclr, Tddclr, Tduclr, albedo):
+    """Run the fused FARMS + FARMS-DNI numba kernel.
+
+    See :func:`farms.farms.farms` for a description of the parameters. All
+    inputs must be broadcastable to a common shape (e.g. radius can be a
+    (n_times, 1) array).
+
+    Returns
+    -------
+    ghi: np.ndarray
+        Global horizontal irradiance (W/m2)
+    dni_farmsdni: np.ndarray
+        DNI computed by FARMS-DNI (W/m2).
+    dni0: np.ndarray
+        DNI computed by the Lambert law (W/m2).
+    """
+    if njit is None:
+        msg = ('The numba backend for FARMS requires numba. Install with '
+               '"pip install numba" or use backend="numpy".')
+        raise ImportError(msg)
+
+    floats = (tau, cloud_effective_radius, solar_zenith_angle, radius,
+              Tuuclr, Ruuclr, Tddclr, Tduclr, albedo)
+    dtype = np.result_type(*floats, np.float32)
+    shape = np.broadcast(cloud_type, *floats).shape
+    arrays = [np.broadcast_to(arr, shape) for arr in (cloud_type, *floats)]
+
+    ghi = np.empty(shape, dtype=dtype)
+    dni = np.empty(shape, dtype=dtype)
+    dni0 = np.empty(shape, dtype=dtype)
+
+    codes = [np.array(types, dtype=np.int64)
+             for types in (WATER_TYPES, ICE_TYPES, CLEAR_TYPES)]
+    ct, *floats = (_as_2d(arr) for arr in arrays)
+    _farms_kernel(floats[0], ct, *floats[1:], *codes,
+                  _as_2d(ghi), _as_2d(dni), _as_2d(dni0))
+
+    return ghi, dni, dni0
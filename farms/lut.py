@@ -0,0 +1,405 @@
+"""
+Precomputed lookup tables (LUT) for the FARMS cloud transmittance and
+reflectance.
+
+In FARMS, the cloudy-sky transmittance/reflectance ``Tducld`` and ``Ruucld``
+(:func:`farms.farms.water_phase` and :func:`farms.farms.ice_phase`) and the
+FARMS-DNI circumsolar cloud transmittance ``Tddcld`` (:func:`farms.farms_dni.
+TDDP`, evaluated at the scaled tau of :func:`farms.farms_dni.scale_tau`)
+depend only on the cloud optical thickness (tau), the effective particle size
+(De), the cosine of the solar zenith angle, and the cloud phase. This module
+tabulates ``Tducld`` and ``Tddcld`` on a 3D (tau, De, cos(sza)) grid per
+phase and ``Ruucld`` (a function of tau only) on a 1D tau grid per phase. The
+tables are stored in the package data file ``farms_lut.npz`` (regenerate with
+:func:`build_lut`) and evaluated with vectorized trilinear (linear for
+``Ruucld``) interpolation by ``farms(..., lut=True)``.
+
+Grid nodes bracket every cos(sza) and De band edge of the piecewise
+parameterization of Yang et al. (2022) so that the discontinuities of
+``Tddcld`` are resolved, except for the ice cloud taup bands whose cos(sza)
+edges vary linearly with De. Cells outside of the grid (tau < 0 or
+tau > 160, De < 2 or De > 160 micron, sza > 89 degrees) are evaluated with
+the analytic parameterizations instead (:func:`analytic_optics`), so they
+match ``farms(..., lut=False)`` exactly. Clamping them to the grid edges
+would not be neutral: ``Tddcld`` keeps changing with De beyond 160 micron
+(e.g. up to De = 320 micron for a cloud effective radius of 160 micron).
+
+Accuracy
+--------
+Maximum absolute error against the analytic parameterizations computed with
+:func:`lut_error` over 1e6 uniformly distributed samples of
+0 <= tau <= 160, 2 <= De <= 160, and 0 <= sza <= 89:
+
+    ======  ======  ======  ======
+    phase   Tducld  Ruucld  Tddcld
+    ======  ======  ======  ======
+    water   0.0047  0.0001  0.0032
+    ice     0.0134  0.0001  0.0366
+    ======  ======  ======  ======
+
+The largest ``Tddcld`` errors occur next to the De-dependent ice cloud taup
+band edges. Typical errors are an order of magnitude smaller (mean absolute
+error < 0.001 and 99.9th percentile < 0.01 for all variables).
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from farms import FARMSDIR
+
+LUT_FPATH = os.path.join(FARMSDIR, 'farms_lut.npz')
+
+# Variables tabulated on the 3D (tau, De, cos(sza)) grid
+LUT_VARS = ('Tducld', 'Tddcld')
+
+# Cloud phases in the order of the first table axis (water:1, ice:2)
+LUT_PHASES = (1, 2)
+
+# cos(sza) and De band edges of the piecewise Yang et al. (2022)
+# transmittance parameterizations (see farms.farms_dni)
+COSZ_EDGES = (0.1391, 0.139173, 0.2079, 0.2419, 0.309, 0.342, 0.3746,
+              0.4067, 0.4694, 0.5877, 0.6156, 0.6691, 0.7193, 0.766, 0.848,
+              0.8829, 0.8987, 0.9396, 0.9702, 0.9945, 0.999, 0.9994)
+DE_EDGES = (5.0, 10.0, 14.0, 16.0, 26.0, 30.0, 50.0)
+
+
+def lut_axes():
+    """Get the (tau, De, cos(sza)) grid axes of the 3D lookup tables.
+
+    Returns
+    -------
+    tau : np.ndarray
+        Cloud optical thickness axis (0 and log-spaced from 1e-4 to 160).
+    De : np.ndarray
+        Effective cloud particle size axis (micron).
+    cosz : np.ndarray
+        Cosine of the solar zenith angle axis (sza from 89 to 0 degrees).
+    """
+    tau = np.concatenate(([0], np.logspace(-4, np.log10(160), 55)))
+    De = _bracket(np.linspace(2, 160, 20), DE_EDGES, 1e-6)
+    sza = np.concatenate((np.linspace(0, 80, 20), np.linspace(80, 89, 20)))
+    cosz = _bracket(np.cos(np.radians(sza)), COSZ_EDGES, 1e-7)
+
+    return tau, De, cosz
+
+
+def _bracket(nodes, edges, eps):
+    """Add nodes on both sides of discontinuous band edges to an axis."""
+    edges = np.asarray(edges)
+    return np.unique(np.concatenate((nodes, edges - eps, edges + eps)))
+
+
+def analytic_optics(tau, De, cosz, phase):
+    """Compute Tducld, Ruucld, and Tddcld with the analytic FARMS and
+    FARMS-DNI parameterizations for a single cloud phase.
+
+    Parameters
+    ----------
+    tau : np.ndarray
+        Cloud optical thickness (unitless).
+    De : np.ndarray
+        Effective cloud particle size (diameter, micron).
+    cosz : np.ndarray
+        Cosine of the solar zenith angle.
+    phase : int
+        Cloud phase (water:1, ice:2).
+
+    Returns
+    -------
+    Tducld, Ruucld, Tddcld : np.ndarray
+        Cloudy transmittance (du), reflectance (uu), and circumsolar DNI
+        transmittance.
+    """
+    from farms.farms import ice_phase, water_phase
+    from farms.farms_dni import TDDP, scale_tau
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phase_func = water_phase if phase == 1 else ice_phase
+        Tducld, Ruucld = phase_func(tau, De, cosz)
+        phase = np.full(np.shape(tau), phase)
+        Z = np.arccos(cosz) * 180.0 / np.pi
+        Tddcld = TDDP(Z, scale_tau(tau, phase), De, phase)
+
+    return Tducld, Ruucld, Tddcld
+
+
+def build_lut(fpath=LUT_FPATH):
+    """Compute the lookup tables from the analytic parameterizations and
+    save them to a compressed .npz file.
+
+    Parameters
+    ----------
+    fpath : str
+        Output .npz filepath. Defaults to the packaged LUT file.
+    """
+    axes = lut_axes()
+    grid = [g.ravel() for g in np.meshgrid(*axes, indexing='ij')]
+    shape = tuple(len(ax) for ax in axes)
+    ruu_tau = np.concatenate(([0], np.logspace(-4, np.log10(160), 2047)))
+    ones = np.ones_like(ruu_tau)
+
+    tables = {name: [] for name in (*LUT_VARS, 'Ruucld')}
+    for phase in LUT_PHASES:
+        Tducld, _, Tddcld = analytic_optics(*grid, phase)
+        tables['Tducld'].append(Tducld.reshape(shape))
+        tables['Tddcld'].append(Tddcld.reshape(shape))
+        Ruucld = analytic_optics(ruu_tau, 20 * ones, ones, phase)[1]
+        tables['Ruucld'].append(Ruucld)
+
+    tables = {k: np.array(v, dtype=np.float32) for k, v in tables.items()}
+    np.savez_compressed(fpath, tau=axes[0], De=axes[1], cosz=axes[2],
+                        ruu_tau=ruu_tau, **tables)
+
+
+@lru_cache(maxsize=1)
+def load_lut(fpath=LUT_FPATH):
+    """Load the lookup tables and set up the axis bin lookups (cached).
+
+    Parameters
+    ----------
+    fpath : str
+        .npz filepath created by :func:`build_lut`.
+
+    Returns
+    -------
+    lut : dict
+        Dictionary of LUT axes and tables. The Tducld and Tddcld tables are
+        stacked into a single "optics" table with shape
+        (phase, tau, De, cos(sza), 2).
+    """
+    with np.load(fpath) as data:
+        lut = {k: data[k] for k in data.files}
+
+    lut['optics'] = np.stack([lut[var] for var in LUT_VARS], axis=-1)
+    lut['bins'] = {
+        'tau': AxisBins(lut['tau'], log=True),
+        'De': AxisBins(lut['De']),
+        'cosz': AxisBins(lut['cosz']),
+        'ruu_tau': AxisBins(lut['ruu_tau'], log=True),
+    }
+
+    return lut
+
+
+class AxisBins:
+    """Fast bin (grid cell) lookup for a sorted, non-uniform table axis.
+
+    ``np.searchsorted`` does a binary search per value which dominates the
+    cost of the table interpolation. Instead, the axis range is divided into
+    uniform helper cells that store the index of the axis bin at the start of
+    each cell. Values are mapped to a helper cell arithmetically and then
+    moved forward past any further axis nodes within the same helper cell
+    with a fixed number of vectorized comparisons. Log-spaced axes are
+    indexed in the coordinate log(1 + x / x[1]) where their nodes are
+    approximately uniform.
+    """
+
+    def __init__(self, axis, log=False, n_cells=4096):
+        """
+        Parameters
+        ----------
+        axis : np.ndarray
+            Sorted 1D table axis.
+        log : bool
+            Flag for axes that start at 0 and are log-spaced after that.
+        n_cells : int
+            Number of uniform helper cells.
+        """
+        self.axis = axis
+        self._scale = axis[1] if log else None
+        coord = self._coord(axis)
+        self._x0 = coord[0]
+        self._inv_dx = n_cells / (coord[-1] - coord[0])
+
+        grid = self._x0 + np.arange(n_cells + 1) / self._inv_dx
+        bins = np.searchsorted(coord, grid, side='right') - 1
+        bins = np.clip(bins, 0, len(axis) - 2)
+        self._n_steps = int(np.diff(bins).max())
+        self._bins = np.append(bins, bins[-1])
+        self._next = np.append(axis[1:], np.inf)
+        self._inv_width = 1.0 / np.diff(axis)
+
+    def _coord(self, x):
+        """Get the coordinate the helper cells are uniform in."""
+        return x if self._scale is None else np.log1p(x / self._scale)
+
+    def weights(self, x):
+        """Get the lower node index and linear interpolation weight of each
+        x along the axis (x is clamped to the axis range). NaN x gets node 0
+        and a NaN weight so that interpolated values are NaN.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Coordinate values.
+
+        Returns
+        -------
+        i : np.ndarray
+            Index of the axis node below each x.
+        w : np.ndarray
+            Linear interpolation weight of node i + 1.
+        """
+        axis = self.axis
+        x = np.clip(x, axis[0], axis[-1])
+        nan = np.isnan(x)
+        if nan.any():
+            x = np.where(nan, axis[0], x)
+        cell = (self._coord(x) - self._x0) * self._inv_dx
+        i = self._bins[cell.astype(np.intp)]
+        for _ in range(self._n_steps):
+            i += x >= self._next[i]
+
+        i = np.minimum(i, len(axis) - 2)
+        w = (x - axis[i]) * self._inv_width[i]
+        if nan.any():
+            w[nan] = np.nan
+
+        return i, w
+
+
+def interp_lut(table, weights):
+    """Vectorized (multi)linear interpolation on a rectilinear grid.
+
+    Parameters
+    ----------
+    table : np.ndarray
+        Table of values on the grid. Dimensions beyond the number of
+        weights are interpolated separately (e.g. several variables
+        tabulated on the same grid).
+    weights : list
+        (i, w) lower node indices and weights for each leading dimension of
+        table, see :meth:`AxisBins.weights`. If w is None, the node i is
+        selected without interpolation (e.g. the cloud phase dimension).
+
+    Returns
+    -------
+    out : list
+        Interpolated values for each of the trailing table entries (a single
+        array if table has no trailing dimensions).
+    """
+    ndim = len(weights)
+    n_vars = int(np.prod(table.shape[ndim:]))
+    flat = table.reshape(-1, n_vars)
+    strides = np.cumprod((1,) + table.shape[1:ndim][::-1])[::-1]
+    base = sum(i * s for (i, _), s in zip(weights, strides))
+
+    # (offset, weight) of the corners of the interpolation cell
+    corners = [(0, 1.0)]
+    for (_, w), s in zip(weights, strides):
+        if w is not None:
+            w0 = 1.0 - w
+            corners = ([(o, c * w0) for o, c in corners]
+                       + [(o + s, c * w) for o, c in corners])
+
+    out = []
+    for k in range(n_vars):
+        values = np.ascontiguousarray(flat[:, k])
+        interp = 0.0
+        for offset, w in corners:
+            interp = interp + w * values.take(base + offset)
+        out.append(interp)
+
+    return out if table.ndim > ndim else out[0]
+
+
+def cloud_optics(tau, De, cosz, phase, lut=None):
+    """Interpolate Tducld, Ruucld, and Tddcld from the lookup tables.
+
+    Parameters
+    ----------
+    tau : np.ndarray
+        Cloud optical thickness (unitless).
+    De : np.ndarray
+        Effective cloud particle size (diameter, micron).
+    cosz : np.ndarray
+        Cosine of the solar zenith angle.
+    phase : np.ndarray
+        Cloud thermodynamic phase (water:1, ice:2). Outputs are zero where
+        the phase is neither water or ice.
+    lut : dict | None
+        Lookup tables from :func:`load_lut`. The packaged tables are used if
+        None.
+
+    Returns
+    -------
+    Tducld, Ruucld, Tddcld : np.ndarray
+        Cloudy transmittance (du), reflectance (uu), and circumsolar DNI
+        transmittance (see :func:`farms.farms_dni.farms_dni`). Cells
+        outside of the table grid are computed with
+        :func:`analytic_optics`.
+    """
+    lut = lut or load_lut()
+    bins = lut['bins']
+    dtype = np.result_type(tau, cosz, np.float32)
+    out = [np.zeros(np.shape(tau), dtype=dtype) for _ in range(3)]
+
+    cloudy = (phase == 1) | (phase == 2)
+    tau = tau[cloudy]
+    p = (phase[cloudy] - 1, None)
+
+    Tducld, Tddcld = interp_lut(lut['optics'], [
+        p,
+        bins['tau'].weights(tau),
+        bins['De'].weights(De[cloudy]),
+        bins['cosz'].weights(cosz[cloudy]),
+    ])
+    Ruucld = interp_lut(lut['Ruucld'], [p, bins['ruu_tau'].weights(tau)])
+
+    # cells outside of the table grid use the analytic parameterizations
+    De = De[cloudy]
+    cosz = cosz[cloudy]
+    outside = ((tau < lut['tau'][0]) | (tau > lut['tau'][-1])
+               | (De < lut['De'][0]) | (De > lut['De'][-1])
+               | (cosz < lut['cosz'][0]))
+    if outside.any():
+        for k, phase in enumerate(LUT_PHASES):
+            idx = outside & (p[0] == k)
+            if idx.any():
+                exact = analytic_optics(tau[idx], De[idx], cosz[idx], phase)
+                for arr, values in zip((Tducld, Ruucld, Tddcld), exact):
+                    arr[idx] = values
+
+    out[0][cloudy] = Tducld
+    out[1][cloudy] = Ruucld
+    out[2][cloudy] = Tddcld
+
+    return tuple(out)
+
+
+def lut_error(n=1000000, seed=0, lut=None):
+    """Compute the maximum absolute error of the lookup tables against the
+    analytic parameterizations on uniformly distributed random samples.
+
+    Parameters
+    ----------
+    n : int
+        Number of random samples per phase.
+    seed : int
+        Random seed.
+    lut : dict | None
+        Lookup tables from :func:`load_lut`. The packaged tables are used if
+        None.
+
+    Returns
+    -------
+    errors : dict
+        Nested dictionary of max absolute error {phase: {variable: error}}.
+    """
+    rng = np.random.default_rng(seed)
+    tau = rng.uniform(0, 160, n)
+    De = rng.uniform(2, 160, n)
+    cosz = np.cos(np.radians(rng.uniform(0, 89, n)))
+
+    errors = {}
+    for phase, name in zip(LUT_PHASES, ('water', 'ice')):
+        truth = analytic_optics(tau, De, cosz, phase)
+        test = cloud_optics(tau, De, cosz, np.full(n, phase), lut=lut)
+        errors[name] = {
+            var: float(np.nanmax(np.abs(x - y)))
+            for var, x, y in zip(('Tducld', 'Ruucld', 'Tddcld'), truth, test)
+        }
+
+    return errors
@@ -0,0 +1,165 @@
+"""
+Opt-in per-stage timing instrumentation.
+
+:func:`farms.farms.farms` and :func:`farms.farms_dni.farms_dni` wrap their
+stages (input validation, cloud type classification, water/ice cloud optics,
+TDDP with Pwater/Pice, TDD2, NaN masking, ...) in :func:`stage` blocks.
+Timings are only recorded while a :class:`StageTimer` is active::
+
+    with StageTimer() as timer:
+        farms(**inputs)
+
+    timer.to_dict()  # {stage: {'calls': int, 'seconds': float, 'cells': int}}
+    timer.to_json('farms_timing.json')
+
+When no timer is active, :func:`stage` returns a shared no-op context
+manager, so the instrumentation costs one global lookup per stage. Stages
+can be nested (e.g. Pwater inside TDDP inside farms_dni) in which case the
+time of the inner stage is also included in the outer stage. Timings of
+stages run on several threads (e.g. with ``n_workers > 1``) are summed.
+"""
+
+import contextlib
+import json
+import threading
+import time
+
+import numpy as np
+
+# Active StageTimer (None if timing is disabled)
+_TIMER = None
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class StageTimer:
+    """Collect the wall time and cell counts of named FARMS stages."""
+
+    def __init__(self, callback=None):
+        """
+        Parameters
+        ----------
+        callback : callable | None
+            Optional function called as callback(name, seconds, cells) after
+            every stage, e.g. to forward timings to a metrics system.
+        """
+        self.callback = callback
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._previous = None
+
+    def __enter__(self):
+        global _TIMER  # noqa: PLW0603
+        self._previous = _TIMER
+        _TIMER = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _TIMER  # noqa: PLW0603
+        _TIMER = self._previous
+        self._previous = None
+
+    def record(self, name, seconds, cells=0):
+        """Record one call of a stage.
+
+        Parameters
+        ----------
+        name : str
+            Stage name.
+        seconds : float
+            Wall time of the stage call.
+        cells : int
+            Number of cells processed by the stage call.
+        """
+        with self._lock:
+            stats = self._stages.setdefault(
+                name, {'calls': 0, 'seconds': 0.0, 'cells': 0})
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['cells'] += cells
+
+        if self.callback is not None:
+            self.callback(name, seconds, cells)
+
+    def to_dict(self):
+        """Get the collected timings.
+
+        Returns
+        -------
+        stages : dict
+            {stage name: {"calls": int, "seconds": float, "cells": int}} in
+            the order the stages were first run.
+        """
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stages.items()}
+
+    def to_json(self, fpath=None, **kwargs):
+        """Export the collected timings as JSON.
+
+        Parameters
+        ----------
+        fpath : str | None
+            Optional file path to write the JSON to.
+        kwargs : dict
+            Additional keyword arguments for json.dumps, e.g. indent.
+
+        Returns
+        -------
+        out : str
+            JSON string of :meth:`to_dict`.
+        """
+        out = json.dumps(self.to_dict(), **kwargs)
+        if fpath is not None:
+            with open(fpath, 'w') as f:
+                f.write(out)
+
+        return out
+
+
+class _Stage:
+    """Context manager timing one call of a stage."""
+
+    __slots__ = ('_cells', '_name', '_start', '_timer')
+
+    def __init__(self, timer, name, cells):
+        self._timer = timer
+        self._name = name
+        self._cells = cells
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self._start
+        cells = self._cells
+        if cells is None:
+            cells = 0
+        elif not isinstance(cells, (int, np.integer)):
+            cells = np.size(cells)
+
+        self._timer.record(self._name, seconds, int(cells))
+
+
+def stage(name, cells=None):
+    """Time a named stage if a :class:`StageTimer` is active.
+
+    Parameters
+    ----------
+    name : str
+        Stage name.
+    cells : np.ndarray | int | None
+        Array processed by the stage (its size is recorded as the cell
+        count, only if timing is enabled) or the number of cells.
+
+    Returns
+    -------
+    context : contextlib.AbstractContextManager
+        Context manager timing the stage, or a shared no-op context manager
+        if no timer is active.
+    """
+    if _TIMER is None:
+        return _NULL_STAGE
+
+    return _Stage(_TIMER, name, cells)
@@ -0,0 +1,412 @@
+"""
+Vectorized REST2 clear-sky transmittances for FARMS.
+
+:func:`rest2` computes the four clear-sky transmittance/reflectance inputs
+of :func:`farms.farms.farms` from the REST2 two-band parameterizations::
+
+    clear = rest2(solar_zenith_angle, pressure, ozone, w, aod, alpha, ssa)
+    ghi, dni_farmsdni, dni0 = farms(tau, cloud_type, cloud_effective_radius,
+                                    solar_zenith_angle, radius, *clear,
+                                    albedo)
+
+All gas and aerosol coefficients that do not depend on the solar angle are
+evaluated once per cell. Tuuclr (the direct transmittance averaged over
+isotropic diffuse incidence) is then integrated with a fixed-node
+Gauss-Legendre quadrature in cos(sza). The air masses of the fixed nodes are
+scalars, so every node only costs a few array operations instead of a full
+REST2 run per solar angle.
+
+Reference
+---------
+Gueymard, C. A., 2008. REST2: High-performance solar radiation model for
+cloudless-sky irradiance, illuminance, and photosynthetically active
+radiation - Validation with a benchmark dataset. Solar Energy 82, 272-285.
+https://doi.org/10.1016/j.solener.2007.04.008
+"""
+
+import numpy as np
+
+from farms import SOLAR_CONSTANT
+from farms.utilities import calc_beta
+
+# Fractions of the extraterrestrial irradiance in REST2 band 1 (0.29-0.70 um)
+# and band 2 (0.70-4.0 um)
+BAND_FRACTIONS = (0.46512, 0.51951)
+
+# Air mass coefficients (a1, a2, a3, a4) of m = 1 / (cos(z) + a1 z^a2
+# (a3 - z)^-a4) for Rayleigh scattering, ozone, water vapor, and aerosols
+AIR_MASS_COEFFS = {
+    'rayleigh': (0.48353, 0.095846, 96.741, 1.754),
+    'ozone': (1.0651, 0.6379, 101.8, 2.2694),
+    'water': (0.10648, 0.11423, 93.781, 1.9203),
+    'aerosol': (0.16851, 0.18198, 95.318, 1.9542),
+}
+
+# Wavelength limits (um) of the aerosol effective wavelengths of band 1 and
+# band 2
+BAND_LIMITS = ((0.29, 0.70), (0.70, 4.0))
+
+# Effective air mass of diffuse radiation
+DIFFUSE_AIR_MASS = 1.66
+
+# Default reduced nitrogen dioxide path length (atm-cm)
+NO2 = 0.0002
+
+# Standard surface pressure (mbar)
+STANDARD_PRESSURE = 1013.25
+
+# Default number of Gauss-Legendre nodes of the Tuuclr quadrature
+TUUCLR_NODES = 8
+
+# Names of the arrays returned by rest2() (in farms() argument order)
+REST2_OUTPUTS = ('Tuuclr', 'Ruuclr', 'Tddclr', 'Tduclr')
+
+
+def air_mass(solar_zenith_angle, species):
+    """Calculate the optical air mass of an atmospheric constituent.
+
+    Parameters
+    ----------
+    solar_zenith_angle : np.ndarray | float
+        Solar zenith angle (degrees), limited to [0, 90].
+    species : str
+        Constituent, one of AIR_MASS_COEFFS.
+
+    Returns
+    -------
+    m : np.ndarray | float
+        Optical air mass.
+    """
+    a1, a2, a3, a4 = AIR_MASS_COEFFS[species]
+    z = np.clip(solar_zenith_angle, 0, 90)
+
+    return 1 / (np.cos(np.radians(z)) + a1 * z**a2 * (a3 - z)**-a4)
+
+
+def _angle_terms(ozone, w, no2, alpha, beta):
+    """Get the per-cell gas and aerosol coefficients of REST2 that do not
+    depend on the solar angle."""
+    terms = {'beta': beta, 'alpha': alpha}
+
+    # ozone (band 1)
+    terms['f1'] = ozone * (10.979 - 8.5421 * ozone) / (
+        1 + 2.0115 * ozone + 40.189 * ozone**2)
+    terms['f2'] = ozone * (-0.027589 - 0.005138 * ozone) / (
+        1 - 2.4857 * ozone + 13.942 * ozone**2)
+    terms['f3'] = ozone * (10.995 - 5.5001 * ozone) / (
+        1 + 1.6784 * ozone + 42.406 * ozone**2)
+
+    # nitrogen dioxide (band 1)
+    terms['g1'] = (0.17499 + 41.654 * no2 - 2146.4 * no2**2) / (
+        1 + 22295 * no2**2)
+    terms['g2'] = no2 * (-1.2134 + 59.324 * no2) / (1 + 8847.8 * no2**2)
+    terms['g3'] = (0.17499 + 61.658 * no2 + 9196.4 * no2**2) / (
+        1 + 74109 * no2**2)
+
+    # water vapor (bands 1 and 2)
+    terms['h1'] = w * (0.065445 + 0.00029901 * w) / (1 + 1.2728 * w)
+    terms['h2'] = w * (0.065687 + 0.0013218 * w) / (1 + 1.2008 * w)
+    terms['c1'] = w * (19.566 - 1.6506 * w + 1.0672 * w**2) / (
+        1 + 5.4248 * w + 1.6005 * w**2)
+    terms['c2'] = w * (0.50158 - 0.14732 * w + 0.047584 * w**2) / (
+        1 + 1.1811 * w + 1.0699 * w**2)
+    terms['c3'] = w * (21.286 - 0.39232 * w + 1.2692 * w**2) / (
+        1 + 4.8318 * w + 1.412 * w**2)
+    terms['c4'] = w * (0.70992 - 0.23155 * w + 0.096514 * w**2) / (
+        1 + 0.44907 * w + 0.75425 * w**2)
+
+    # aerosol effective wavelength (band 1 and 2)
+    terms['d0'] = 0.57664 - 0.024743 * alpha
+    terms['d1'] = (0.093942 - 0.2269 * alpha + 0.12848 * alpha**2) / (
+        1 + 0.6418 * alpha)
+    terms['d2'] = (-0.093819 + 0.36668 * alpha - 0.12775 * alpha**2) / (
+        1 - 0.11651 * alpha)
+    terms['d3'] = alpha * (0.15232 - 0.087214 * alpha
+                           + 0.012664 * alpha**2) / (
+        1 - 0.90454 * alpha + 0.26167 * alpha**2)
+    terms['e0'] = (1.183 - 0.022989 * alpha + 0.020829 * alpha**2) / (
+        1 + 0.11133 * alpha)
+    terms['e1'] = (-0.50003 - 0.18329 * alpha + 0.23835 * alpha**2) / (
+        1 + 1.6756 * alpha)
+    terms['e2'] = (-0.50001 + 1.1414 * alpha + 0.0083589 * alpha**2) / (
+        1 + 11.168 * alpha)
+    terms['e3'] = (-0.70003 - 0.73587 * alpha + 0.51509 * alpha**2) / (
+        1 + 4.7665 * alpha)
+
+    return terms
+
+
+def _gas_transmittance(terms, m_rayleigh, m_ozone, m_water):
+    """Get the band 1 and band 2 Rayleigh, uniformly mixed gas, ozone,
+    nitrogen dioxide, and water vapor transmittances."""
+    mr = m_rayleigh
+    tr1 = (1 + 1.8169 * mr - 0.033454 * mr**2) / (
+        1 + 2.063 * mr + 0.31978 * mr**2)
+    tr2 = (1 - 0.010394 * mr) / (1 - 0.00011042 * mr**2)
+    tg1 = (1 + 0.95885 * mr + 0.012871 * mr**2) / (
+        1 + 0.96321 * mr + 0.015455 * mr**2)
+    tg2 = (1 + 0.27284 * mr - 0.00063699 * mr**2) / (1 + 0.30306 * mr)
+
+    mo = m_ozone
+    to1 = (1 + terms['f1'] * mo + terms['f2'] * mo**2) / (
+        1 + terms['f3'] * mo)
+
+    mw = m_water
+    tn1 = np.minimum((1 + terms['g1'] * mw + terms['g2'] * mw**2)
+                     / (1 + terms['g3'] * mw), 1)
+    tw1 = (1 + terms['h1'] * mw) / (1 + terms['h2'] * mw)
+    tw2 = (1 + terms['c1'] * mw + terms['c2'] * mw**2) / (
+        1 + terms['c3'] * mw + terms['c4'] * mw**2)
+
+    return {'TR1': tr1, 'TR2': tr2, 'Tg1': tg1, 'Tg2': tg2, 'TO1': to1,
+            'TN1': tn1, 'TW1': tw1, 'TW2': tw2}
+
+
+def _aerosol_optical_depth(terms, m_aerosol):
+    """Get the band 1 and band 2 aerosol optical depths.
+
+    The effective wavelength fits break down at large aerosol air masses
+    for small alpha (the band 2 denominator changes sign), so the
+    effective wavelengths are limited to BAND_LIMITS. The optical depths
+    are insensitive to the effective wavelength when alpha is small.
+    """
+    alpha = terms['alpha']
+    ua = np.log(1 + m_aerosol * terms['beta'])
+    lam1 = (terms['d0'] + terms['d1'] * ua + terms['d2'] * ua**2) / (
+        1 + terms['d3'] * ua**2)
+    den2 = 1 + terms['e3'] * ua
+    lam2 = (terms['e0'] + terms['e1'] * ua + terms['e2'] * ua**2) / den2
+    lam1 = np.clip(lam1, *BAND_LIMITS[0])
+    lam2 = np.where(den2 > 0, np.clip(lam2, *BAND_LIMITS[1]),
+                    BAND_LIMITS[1][1])
+
+    return terms['beta'] * lam1**-alpha, terms['beta'] * lam2**-alpha
+
+
+def _beam_transmittance(terms, p_ratio, solar_zenith_angle):
+    """Get the broadband direct beam transmittance (Tddclr) and the band
+    transmittance terms at a solar zenith angle."""
+    m_rayleigh = air_mass(solar_zenith_angle, 'rayleigh')
+    m_aerosol = air_mass(solar_zenith_angle, 'aerosol')
+    gas = _gas_transmittance(terms, m_rayleigh * p_ratio,
+                             air_mass(solar_zenith_angle, 'ozone'),
+                             air_mass(solar_zenith_angle, 'water'))
+    taua1, taua2 = _aerosol_optical_depth(terms, m_aerosol)
+    gas['TA1'] = np.exp(-m_aerosol * taua1)
+    gas['TA2'] = np.exp(-m_aerosol * taua2)
+
+    tdd = (BAND_FRACTIONS[0] * gas['TR1'] * gas['Tg1'] * gas['TO1']
+           * gas['TN1'] * gas['TW1'] * gas['TA1']
+           + BAND_FRACTIONS[1] * gas['TR2'] * gas['Tg2'] * gas['TW2']
+           * gas['TA2'])
+
+    return tdd, gas, (m_rayleigh, m_aerosol, taua1, taua2)
+
+
+def tuuclr_quadrature(terms, p_ratio, n_nodes=TUUCLR_NODES, dtype=None):
+    """Integrate the direct transmittance over isotropic diffuse incidence.
+
+    Tuuclr = 2 * integral(Tddclr(mu) * mu, mu=0..1) is evaluated with an
+    n_nodes Gauss-Legendre rule in mu = cos(sza).
+
+    Parameters
+    ----------
+    terms : dict
+        Per-cell angle-independent gas and aerosol coefficients.
+    p_ratio : np.ndarray | float
+        Surface pressure divided by STANDARD_PRESSURE.
+    n_nodes : int
+        Number of quadrature nodes.
+    dtype : np.dtype | str | None
+        Floating point dtype of the quadrature nodes and weights. Defaults
+        to the dtype of p_ratio.
+
+    Returns
+    -------
+    Tuuclr : np.ndarray
+        Diffuse-incidence average of the direct transmittance.
+    """
+    if dtype is None:
+        dtype = np.result_type(p_ratio, np.float32)
+
+    nodes, weights = np.polynomial.legendre.leggauss(n_nodes)
+    mu = (nodes + 1) / 2
+    sza = np.degrees(np.arccos(mu)).astype(dtype)
+    mu = mu.astype(dtype)
+    weights = (weights / 2).astype(dtype)
+
+    tuu = 0
+    for z, mu_k, w_k in zip(sza, mu, weights):
+        tdd = _beam_transmittance(terms, p_ratio, z)[0]
+        tuu = tuu + 2 * w_k * mu_k * tdd
+
+    return tuu
+
+
+def rest2(
+    solar_zenith_angle,
+    pressure,
+    ozone,
+    w,
+    aod,
+    alpha,
+    ssa,
+    no2=NO2,
+    n_nodes=TUUCLR_NODES,
+    dtype=None,
+):
+    """Compute the REST2 clear-sky transmittances that FARMS needs.
+
+    All array inputs are broadcast against each other, e.g. (n_times,
+    n_sites) arrays.
+
+    Parameters
+    ----------
+    solar_zenith_angle : np.ndarray
+        Solar zenith angle (degrees). Limited to [0, 90].
+    pressure : np.ndarray
+        Surface pressure (mbar).
+    ozone : np.ndarray
+        Reduced ozone vertical pathlength (atm-cm).
+    w : np.ndarray
+        Total precipitable water vapor (cm).
+    aod : np.ndarray
+        Aerosol optical depth at 550 nm.
+    alpha : np.ndarray
+        Angstrom wavelength exponent (used for both REST2 bands). The
+        Angstrom turbidity coefficient is calculated from aod and alpha
+        with :func:`farms.utilities.calc_beta`.
+    ssa : np.ndarray
+        Aerosol single scattering albedo (used for both REST2 bands).
+    no2 : np.ndarray | float
+        Reduced nitrogen dioxide vertical pathlength (atm-cm).
+    n_nodes : int
+        Number of Gauss-Legendre nodes of the Tuuclr quadrature.
+    dtype : np.dtype | str | None
+        Floating point dtype of the computation and outputs. If None, the
+        computation follows the input dtypes (Python scalars and the
+        default no2 do not promote float32 arrays, float64 if no input is a
+        floating point array).
+
+    Returns
+    -------
+    Tuuclr : np.ndarray
+        Transmittance for diffuse incident and diffuse outgoing fluxes,
+        i.e. Tddclr averaged over isotropic diffuse incidence.
+    Ruuclr : np.ndarray
+        Sky (aerosol and Rayleigh) reflectance for diffuse fluxes from the
+        ground, averaged over the two bands.
+    Tddclr : np.ndarray
+        Transmittance for direct incident and direct outgoing fluxes
+        (dni / etdirn).
+    Tduclr : np.ndarray
+        Transmittance for direct incident and diffuse outgoing fluxes
+        (dhi / (etdirn * cosz) without the ground-sky backscatter, which
+        FARMS adds with the albedo and Ruuclr).
+    """
+    inputs = (solar_zenith_angle, pressure, ozone, w, aod, alpha, ssa)
+    if dtype is None:
+        dtype = np.result_type(*inputs)
+        if dtype.kind != 'f':
+            dtype = np.dtype(np.float64)
+
+    arrays = np.broadcast_arrays(
+        *(np.asarray(arr, dtype=dtype) for arr in (*inputs, no2)))
+    sza, pressure, ozone, w, aod, alpha, ssa, no2 = arrays
+
+    beta = calc_beta(aod, alpha)
+    terms = _angle_terms(ozone, w, no2, alpha, beta)
+    p_ratio = pressure / STANDARD_PRESSURE
+
+    sza = np.clip(sza, 0, 90)
+    tdd, trans, (m_rayleigh, m_aerosol, taua1, taua2) = _beam_transmittance(
+        terms, p_ratio, sza)
+
+    # diffuse (sky) transmittance of the direct beam
+    diffuse = _gas_transmittance(terms, DIFFUSE_AIR_MASS * p_ratio,
+                                 DIFFUSE_AIR_MASS, DIFFUSE_AIR_MASS)
+    cosz = np.cos(np.radians(sza))
+    br1 = 0.5 * (0.89013 - 0.0049558 * m_rayleigh
+                 + 0.000045721 * m_rayleigh**2)
+    br2 = 0.5
+    ba = 1 - np.exp(-0.6931 - 1.8326 * cosz)
+
+    ma = m_aerosol
+    g0 = (3.715 + 0.368 * ma + 0.036294 * ma**2) / (1 + 0.0009391 * ma**2)
+    g1 = (-0.164 - 0.72567 * ma + 0.20701 * ma**2) / (
+        1 + 0.0019012 * ma**2)
+    g2 = (-0.052288 + 0.31902 * ma + 0.17871 * ma**2) / (
+        1 + 0.0069592 * ma**2)
+    f1 = (g0 + g1 * taua1) / (1 + g2 * taua1)
+    h0 = (3.4352 + 0.65267 * ma + 0.00034328 * ma**2) / (
+        1 + 0.034388 * ma**1.5)
+    h1 = (1.231 - 1.63853 * ma + 0.20667 * ma**2) / (1 + 0.1451 * ma**1.5)
+    h2 = (0.8889 - 0.55063 * ma + 0.50152 * ma**2) / (
+        1 + 0.14865 * ma**1.5)
+    f2 = (h0 + h1 * taua2) / (1 + h2 * taua2)
+
+    tas1 = np.exp(-ma * ssa * taua1)
+    tas2 = np.exp(-ma * ssa * taua2)
+    tdu1 = (trans['TO1'] * trans['Tg1'] * diffuse['TN1'] * diffuse['TW1']
+            * (br1 * (1 - trans['TR1']) * trans['TA1']**0.25
+               + ba * f1 * trans['TR1'] * (1 - tas1**0.25)))
+    tdu2 = (trans['Tg2'] * diffuse['TW2']
+            * (br2 * (1 - trans['TR2']) * trans['TA2']**0.25
+               + ba * f2 * trans['TR2'] * (1 - tas2**0.25)))
+    tdu = BAND_FRACTIONS[0] * tdu1 + BAND_FRACTIONS[1] * tdu2
+
+    # sky albedo
+    rs1 = (0.13363 + 0.00077358 * alpha
+           + beta * (0.37567 + 0.22946 * alpha) / (1 - 0.10832 * alpha)) / (
+        1 + beta * (0.84057 + 0.68683 * alpha) / (1 - 0.08158 * alpha))
+    rs2 = (0.010191 + 0.00085547 * alpha
+           + beta * (0.14618 + 0.062758 * alpha) / (1 - 0.19402 * alpha)) / (
+        1 + beta * (0.58101 + 0.17426 * alpha) / (1 - 0.17586 * alpha))
+    ruu = ((BAND_FRACTIONS[0] * rs1 + BAND_FRACTIONS[1] * rs2)
+           / sum(BAND_FRACTIONS))
+
+    tuu = tuuclr_quadrature(terms, p_ratio, n_nodes=n_nodes, dtype=dtype)
+
+    return tuu, ruu, tdd, tdu
+
+
+def rest2_irradiance(solar_zenith_angle, radius, albedo, Ruuclr, Tddclr,
+                     Tduclr):
+    """Compute REST2 clear-sky irradiance from the :func:`rest2`
+    transmittances, e.g. for the clearsky_ghi and clearsky_dni inputs of
+    :func:`farms.all_sky.all_sky`.
+
+    Parameters
+    ----------
+    solar_zenith_angle : np.ndarray
+        Solar zenith angle (degrees).
+    radius : np.ndarray
+        Sun-earth radius vector.
+    albedo : np.ndarray
+        Ground albedo.
+    Ruuclr : np.ndarray
+        Sky reflectance for diffuse fluxes.
+    Tddclr : np.ndarray
+        Direct transmittance.
+    Tduclr : np.ndarray
+        Diffuse transmittance of the direct beam.
+
+    Returns
+    -------
+    ghi : np.ndarray
+        Clear-sky global horizontal irradiance (W/m2), including the
+        multiple ground-sky reflections.
+    dni : np.ndarray
+        Clear-sky direct normal irradiance (W/m2).
+    dhi : np.ndarray
+        Clear-sky diffuse horizontal irradiance (W/m2).
+    """
+    cosz = np.cos(np.radians(solar_zenith_angle))
+    cosz = np.maximum(cosz, 0)
+    etdirn = SOLAR_CONSTANT / (radius * radius)
+    dni = etdirn * Tddclr
+    dni = np.where(cosz > 0, dni, 0)
+    ghi = etdirn * cosz * (Tddclr + Tduclr) / (1 - albedo * Ruuclr)
+    dhi = ghi - dni * cosz
+
+    return ghi, dni, dhi
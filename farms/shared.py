@@ -0,0 +1,236 @@
+"""
+Process-pool execution of FARMS on shared memory.
+
+Threads do not scale for the parts of FARMS that hold the GIL. This module
+runs FARMS blocks on a ``ProcessPoolExecutor`` where all input and output
+arrays live in :mod:`multiprocessing.shared_memory` blocks. Workers attach to
+the shared blocks once (zero-copy) when they start, so only tiny block
+slice descriptions are pickled across the process boundary.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from farms.chunking import (
+    FARMS_OUTPUTS,
+    _check_kwargs,
+    _run_block,
+    _validate_domain,
+    _worker_shape,
+    estimate_cell_bytes,
+    iter_chunks,
+    plan_chunks,
+)
+
+# Shared arrays attached by each worker process (set by _init_worker)
+_WORKER_STATE = {}
+
+
+class SharedArray:
+    """A numpy array backed by a multiprocessing shared memory block.
+
+    Pass instances as inputs/outputs to :func:`farms_multiprocess` to avoid
+    any copies. The creating process is responsible for calling
+    :meth:`unlink` (or using the instance as a context manager) to free the
+    shared memory.
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        """
+        Parameters
+        ----------
+        shape : tuple
+            Array shape.
+        dtype : np.dtype | str
+            Array dtype.
+        name : str | None
+            Name of an existing shared memory block to attach to. A new block
+            is created if None.
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = _attach_shm(name)
+
+        self.array = np.ndarray(self.shape, dtype=self.dtype,
+                                buffer=self._shm.buf)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.unlink()
+
+    @classmethod
+    def from_array(cls, arr):
+        """Copy an array into a new shared memory block."""
+        arr = np.asarray(arr)
+        out = cls(arr.shape, arr.dtype)
+        try:
+            out.array[...] = arr
+        except BaseException:
+            out.unlink()
+            raise
+
+        return out
+
+    @property
+    def spec(self):
+        """tuple: (name, shape, dtype) required to attach to this array"""
+        return (self._shm.name, self.shape, self.dtype.str)
+
+    def close(self):
+        """Detach from the shared memory block."""
+        self.array = None
+        self._shm.close()
+
+    def unlink(self):
+        """Detach from and free the shared memory block."""
+        self.close()
+        self._shm.unlink()
+
+
+def _attach_shm(name):
+    """Attach to an existing shared memory block without registering it with
+    the resource tracker (only the creating process should unlink it)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(input_specs, output_specs, shape):
+    """Attach a worker process to the shared input and output arrays."""
+    inputs = [SharedArray(s[1], s[2], name=s[0]) for s in input_specs]
+    outputs = [SharedArray(s[1], s[2], name=s[0]) for s in output_specs]
+    _WORKER_STATE['shared'] = inputs + outputs
+    _WORKER_STATE['arrays'] = [
+        np.broadcast_to(arr.array, shape) for arr in inputs
+    ]
+    _WORKER_STATE['out'] = [arr.array for arr in outputs]
+
+
+def _run_worker_block(block, kwargs):
+    """Run FARMS on one block of the arrays attached to this worker."""
+    _run_block(_WORKER_STATE['arrays'], block, _WORKER_STATE['out'], kwargs)
+
+
+def farms_multiprocess(
+    tau,
+    cloud_type,
+    cloud_effective_radius,
+    solar_zenith_angle,
+    radius,
+    Tuuclr,
+    Ruuclr,
+    Tddclr,
+    Tduclr,
+    albedo,
+    n_workers=None,
+    max_memory=None,
+    chunks=None,
+    out=None,
+    **kwargs,
+):
+    """Run FARMS block-by-block on a process pool with shared memory.
+
+    See :func:`farms.farms.farms` for a description of the array parameters.
+    Each array can be a numpy array (copied once into shared memory) or a
+    :class:`SharedArray` (used in place). All arrays must be broadcastable to
+    a common (n_times, n_sites) shape, e.g. radius can be (n_times, 1).
+
+    Parameters
+    ----------
+    n_workers : int | None
+        Number of worker processes. Defaults to the number of CPUs.
+    max_memory : int | float | None
+        Memory budget in bytes for the FARMS working set of all concurrently
+        running blocks. See :func:`farms.chunking.farms_chunked`.
+    chunks : tuple | None
+        Explicit (time, sites) block shape. Overrides max_memory.
+    out : tuple | None
+        Optional (ghi, dni_farmsdni, dni0) :class:`SharedArray` outputs with
+        the full domain shape. If None, temporary shared outputs are created
+        and copied into regular numpy arrays after all blocks are complete.
+    kwargs : dict
+        Additional keyword arguments for :func:`farms.farms.farms`, e.g.
+        backend. debug=True and category are not supported. The inputs
+        are validated once over the full domain before any block is run.
+
+    Returns
+    -------
+    ghi: np.ndarray
+        Global horizontal irradiance (W/m2)
+    dni_farmsdni: np.ndarray
+        DNI computed by FARMS-DNI (W/m2).
+    dni0: np.ndarray
+        DNI computed by the Lambert law (W/m2).
+    """
+    _check_kwargs(kwargs)
+
+    arrays = (tau, cloud_type, cloud_effective_radius, solar_zenith_angle,
+              radius, Tuuclr, Ruuclr, Tddclr, Tduclr, albedo)
+    kwargs = _validate_domain([_as_array(arr) for arr in arrays], kwargs)
+    shape = np.broadcast(*(_as_array(arr) for arr in arrays)).shape
+    n_workers = n_workers or os.cpu_count()
+
+    # every shared memory block created here is unlinked on exit, also if
+    # a later allocation fails (e.g. /dev/shm is full)
+    temporary = []
+    try:
+        inputs = []
+        for arr in arrays:
+            if not isinstance(arr, SharedArray):
+                arr = SharedArray.from_array(arr)
+                temporary.append(arr)
+            inputs.append(arr)
+
+        floats = [arr.array for arr in inputs if arr.dtype.kind == 'f']
+        dtype = kwargs.get('dtype')
+        if dtype is None:
+            dtype = np.result_type(*floats, np.float32)
+        if out is None:
+            out = []
+            for _ in FARMS_OUTPUTS:
+                arr = SharedArray(shape, dtype)
+                temporary.append(arr)
+                out.append(arr)
+
+        if chunks is None:
+            chunks = _worker_shape(shape, n_workers)
+            if max_memory is not None:
+                backend = kwargs.get('backend', 'numpy')
+                cell_bytes = estimate_cell_bytes(dtype, backend=backend)
+                chunks = plan_chunks(chunks, max_memory / n_workers,
+                                     cell_bytes)
+
+        initargs = ([arr.spec for arr in inputs], [arr.spec for arr in out],
+                    shape)
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 initializer=_init_worker,
+                                 initargs=initargs) as exe:
+            futures = [exe.submit(_run_worker_block, block, kwargs)
+                       for block in iter_chunks(shape, chunks)]
+            for future in futures:
+                future.result()
+
+        result = tuple(
+            arr.array.copy() if arr in temporary else arr.array for arr in out
+        )
+    finally:
+        for arr in temporary:
+            arr.unlink()
+
+    return result
+
+
+def _as_array(arr):
+    """Get the numpy array from a SharedArray or array-like input."""
+    return arr.array if isinstance(arr, SharedArray) else np.asarray(arr)
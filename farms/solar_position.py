@@ -0,0 +1,409 @@
+"""
+Vectorized NREL Solar Position Algorithm (SPA).
+
+The SPA terms that only depend on time (heliocentric longitude, latitude
+and radius, nutation, obliquity, aberration, sidereal time, and the
+geocentric sun right ascension and declination) are evaluated once per
+timestamp by :func:`solar_time_terms` and broadcast across sites. Only the
+topocentric (parallax), hour angle, and refraction terms are computed per
+(time, site) cell, so the cost is O(T * terms + T * S) instead of
+O(T * S * terms)::
+
+    sza = solar_zenith_angle(time_index, meta['latitude'],
+                             meta['longitude'], meta['elevation'])
+
+For period-averaged FARMS inputs (e.g. hourly data),
+:func:`mean_solar_zenith_angle` integrates cos(sza) analytically over each
+period from the time terms at the period centre, at about the cost of an
+instantaneous zenith angle.
+
+Reference
+---------
+Reda, I., Andreas, A., 2008. Solar Position Algorithm for Solar Radiation
+Applications. NREL/TP-560-34302.
+http://www.nrel.gov/docs/fy08osti/34302.pdf
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from farms import FARMSDIR
+from farms.utilities import (
+    _cached_radius,
+    julian_ephemeris_millennium,
+    periodic_series,
+)
+
+# Default difference between terrestrial time and UT1 (seconds)
+DELTA_T = 64.797
+
+# Default atmospheric refraction at sunrise and sunset (degrees)
+ATMOS_REFRACT = 0.5667
+
+# Hour angle rate of the sun (radians per second)
+HOUR_ANGLE_RATE = 2 * np.pi / 86400
+
+# Equatorial radius of the earth (m)
+EARTH_RADIUS = 6378140.0
+
+# Polynomial coefficients (X0-X4, increasing order in jce) of the mean
+# elongation of the moon, mean anomalies of the sun and moon, argument of
+# latitude of the moon, and longitude of the ascending node of the moon
+NUTATION_COEFFS = (
+    (297.85036, 445267.111480, -0.0019142, 1 / 189474),
+    (357.52772, 35999.050340, -0.0001603, -1 / 300000),
+    (134.96298, 477198.867398, 0.0086972, 1 / 56250),
+    (93.27191, 483202.017538, -0.0036825, 1 / 327270),
+    (125.04452, -1934.136261, 0.0020708, 1 / 450000),
+)
+
+# Polynomial coefficients (increasing order in jme / 10) of the mean
+# obliquity of the ecliptic (arc seconds)
+OBLIQUITY_COEFFS = (84381.448, -4680.93, -1.55, 1999.25, -51.38, -249.67,
+                    -39.05, 7.12, 27.87, 5.79, 2.45)
+
+
+@lru_cache(maxsize=1)
+def spa_periodic_terms():
+    """Load the SPA earth heliocentric longitude and latitude periodic terms
+    and the nutation terms (cached).
+
+    Returns
+    -------
+    terms : dict
+        "L" and "B": lists of (a, b, c) coefficient arrays for the terms
+        L0 through L5 and B0 through B1. "nutation_y": (63, 5) multipliers
+        of X0-X4. "nutation_abcd": (63, 4) nutation coefficients.
+    """
+    fpath = os.path.join(FARMSDIR, 'spa_periodic_terms.npz')
+    with np.load(fpath) as data:
+        return {
+            'L': [tuple(data['L{}'.format(i)].T) for i in range(6)],
+            'B': [tuple(data['B{}'.format(i)].T) for i in range(2)],
+            'nutation_y': data['nutation_y'],
+            'nutation_abcd': data['nutation_abcd'],
+        }
+
+
+def solar_time_terms(time_index, delta_t=DELTA_T):
+    """Calculate the SPA terms that only depend on time.
+
+    Parameters
+    ----------
+    time_index : pandas.core.indexes.datetimes.DatetimeIndex
+        Time series (UTC if timezone naive).
+    delta_t : float
+        Difference between the earth rotation time and terrestrial time
+        (seconds).
+
+    Returns
+    -------
+    terms : dict
+        1D float64 arrays (one value per timestamp) of the apparent sidereal
+        time at Greenwich "nu", the geocentric sun right ascension "alpha"
+        and declination "delta", the equatorial horizontal parallax of the
+        sun "xi" (all in degrees), and the earth-sun radius vector "radius"
+        (AU).
+    """
+    if time_index.tz is not None:
+        time_index = time_index.tz_convert('UTC')
+
+    terms = spa_periodic_terms()
+
+    # 3.1 Julian day, century, and millennium
+    jd = np.array(time_index.to_julian_date(), dtype=np.float64)
+    jc = (jd - 2451545) / 36525
+    jme = julian_ephemeris_millennium(time_index, delta_t=delta_t)
+    jce = jme * 10
+
+    # 3.2 Earth heliocentric longitude, latitude, and radius vector
+    lon_helio = np.degrees(periodic_series(jme, terms['L']) / 1e8) % 360
+    lat_helio = np.degrees(periodic_series(jme, terms['B']) / 1e8)
+    radius = _cached_radius(jme)
+
+    # 3.3 Geocentric longitude and latitude
+    theta = (lon_helio + 180) % 360
+    beta = np.radians(-lat_helio)
+
+    # 3.4 Nutation in longitude and obliquity
+    x = np.stack([np.polynomial.polynomial.polyval(jce, c)
+                  for c in NUTATION_COEFFS], axis=-1)
+    arg = np.radians(x @ terms['nutation_y'].T)
+    a, b, c, d = terms['nutation_abcd'].T
+    jce_col = jce[:, None]
+    delta_psi = ((a + b * jce_col) * np.sin(arg)).sum(axis=1) / 36e6
+    delta_eps = ((c + d * jce_col) * np.cos(arg)).sum(axis=1) / 36e6
+
+    # 3.5 True obliquity of the ecliptic
+    eps0 = np.polynomial.polynomial.polyval(jme / 10, OBLIQUITY_COEFFS)
+    eps = np.radians(eps0 / 3600 + delta_eps)
+
+    # 3.6-3.7 Aberration correction and apparent sun longitude
+    delta_tau = -20.4898 / (3600 * radius)
+    lamda = np.radians(theta + delta_psi + delta_tau)
+
+    # 3.8 Apparent sidereal time at Greenwich
+    nu0 = (280.46061837 + 360.98564736629 * (jd - 2451545)
+           + 0.000387933 * jc**2 - jc**3 / 38710000) % 360
+    nu = nu0 + delta_psi * np.cos(eps)
+
+    # 3.9-3.10 Geocentric sun right ascension and declination
+    alpha = np.degrees(np.arctan2(
+        np.sin(lamda) * np.cos(eps) - np.tan(beta) * np.sin(eps),
+        np.cos(lamda))) % 360
+    delta = np.degrees(np.arcsin(
+        np.sin(beta) * np.cos(eps)
+        + np.cos(beta) * np.sin(eps) * np.sin(lamda)))
+
+    # 3.12.1 Equatorial horizontal parallax of the sun
+    xi = 8.794 / (3600 * radius)
+
+    return {'nu': nu, 'alpha': alpha, 'delta': delta, 'xi': xi,
+            'radius': radius}
+
+
+def _site_terms(lat, elevation):
+    """Get the (n_sites,) parallax terms x and y of SPA 3.12.2-3.12.4."""
+    lat = np.radians(lat)
+    u = np.arctan(0.99664719 * np.tan(lat))
+    x = np.cos(u) + elevation / EARTH_RADIUS * np.cos(lat)
+    y = 0.99664719 * np.sin(u) + elevation / EARTH_RADIUS * np.sin(lat)
+
+    return x, y
+
+
+def solar_zenith_angle(
+    time_index,
+    lat,
+    lon,
+    elevation=0,
+    pressure=1013.25,
+    temperature=12,
+    delta_t=DELTA_T,
+    atmos_refract=ATMOS_REFRACT,
+    refraction=True,
+    time_terms=None,
+):
+    """Calculate the topocentric solar zenith angle with the NREL SPA.
+
+    Parameters
+    ----------
+    time_index : pandas.core.indexes.datetimes.DatetimeIndex
+        Time series (UTC if timezone naive) with n_times timestamps.
+    lat : np.ndarray | float
+        Site latitudes (degrees, north positive), shape (n_sites,).
+    lon : np.ndarray | float
+        Site longitudes (degrees, east positive), shape (n_sites,).
+    elevation : np.ndarray | float
+        Site elevations (m), shape (n_sites,).
+    pressure : np.ndarray | float
+        Annual average surface pressure (mbar) for the refraction
+        correction. Broadcast against the (n_times, n_sites) output.
+    temperature : np.ndarray | float
+        Annual average air temperature (C) for the refraction correction.
+        Broadcast against the (n_times, n_sites) output.
+    delta_t : float
+        Difference between the earth rotation time and terrestrial time
+        (seconds).
+    atmos_refract : float
+        Atmospheric refraction at sunrise and sunset (degrees). No
+        refraction correction is applied when the sun is further below the
+        horizon.
+    refraction : bool
+        Flag to apply the atmospheric refraction correction (apparent
+        zenith angle, as in the NSRDB). Otherwise the true (geometric)
+        topocentric zenith angle is returned.
+    time_terms : dict | None
+        Optional precomputed :func:`solar_time_terms` of time_index, e.g.
+        to reuse them across blocks of sites.
+
+    Returns
+    -------
+    sza : np.ndarray
+        (n_times, n_sites) solar zenith angle in degrees.
+    """
+    if time_terms is None:
+        time_terms = solar_time_terms(time_index, delta_t=delta_t)
+
+    lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+    elevation = np.atleast_1d(np.asarray(elevation, dtype=np.float64))
+    site_x, site_y = _site_terms(lat, elevation)
+
+    delta = np.radians(time_terms['delta'])[:, None]
+    sin_xi = np.sin(np.radians(time_terms['xi']))[:, None]
+
+    # 3.11 Observer local hour angle
+    hour_angle = np.radians(time_terms['nu'][:, None] + lon
+                            - time_terms['alpha'][:, None])
+    cos_h = np.cos(hour_angle)
+    sin_h = np.sin(hour_angle)
+
+    # 3.12-3.14 Parallax in right ascension, topocentric declination, and
+    # topocentric elevation angle without the trigonometric round trips:
+    # with den = cos(delta) - x sin(xi) cos(H), num = -x sin(xi) sin(H), and
+    # s = sin(delta) - y sin(xi), r cos(H') = cos(H) den + sin(H) num and
+    # sin(e0) = (sin(lat) s + cos(lat) r cos(H')) / sqrt(r^2 + s^2)
+    x_sin_xi = site_x * sin_xi
+    den = np.cos(delta) - x_sin_xi * cos_h
+    num = -x_sin_xi * sin_h
+    s = np.sin(delta) - site_y * sin_xi
+    lat = np.radians(lat)
+    sin_e0 = np.sin(lat) * s + np.cos(lat) * (cos_h * den + sin_h * num)
+    sin_e0 /= np.sqrt(den**2 + num**2 + s**2)
+    e0 = np.degrees(np.arcsin(np.clip(sin_e0, -1, 1, out=sin_e0)))
+
+    # 3.14.2-3.14.3 Atmospheric refraction correction
+    if refraction:
+        delta_e = (np.asarray(pressure) / 1010 * 283
+                   / (273 + np.asarray(temperature)) * 1.02
+                   / (60 * np.tan(np.radians(e0 + 10.3 / (e0 + 5.11)))))
+        e0 += np.where(e0 >= -(0.26667 + atmos_refract), delta_e, 0)
+
+    return 90 - e0
+
+
+def _period_centers(time_index, period, label):
+    """Get the period length (s) and the centres of labeled periods."""
+    import pandas as pd
+
+    period = pd.Timedelta(period)
+    offsets = {'start': period / 2, 'center': pd.Timedelta(0),
+               'end': -period / 2}
+    if label not in offsets:
+        msg = ('Did not recognize period label "{}", must be one of: {}'
+               .format(label, list(offsets)))
+        raise ValueError(msg)
+
+    if not pd.Timedelta(0) < period <= pd.Timedelta(days=1):
+        msg = 'Averaging period must be within (0, 1 day], got: {}'.format(
+            period)
+        raise ValueError(msg)
+
+    return period.total_seconds(), time_index + offsets[label]
+
+
+def mean_cos_zenith(
+    time_index,
+    lat,
+    lon,
+    period='1h',
+    label='center',
+    delta_t=DELTA_T,
+    time_terms=None,
+):
+    """Calculate the period-averaged cosine of the solar zenith angle.
+
+    The mean of max(cos(sza), 0) over each period is integrated
+    analytically from cos(sza) = sin(lat) sin(delta) + cos(lat) cos(delta)
+    cos(H), with the declination delta held at its value at the period
+    centre and the hour angle H advancing at 360 degrees per day. Only the
+    daylight part of each period (|H| below the sunset hour angle)
+    contributes. Parallax and refraction are neglected.
+
+    Parameters
+    ----------
+    time_index : pandas.core.indexes.datetimes.DatetimeIndex
+        Period labels (UTC if timezone naive) with n_times timestamps.
+    lat : np.ndarray | float
+        Site latitudes (degrees, north positive), shape (n_sites,).
+    lon : np.ndarray | float
+        Site longitudes (degrees, east positive), shape (n_sites,).
+    period : str | pd.Timedelta
+        Length of the averaging period (up to one day), e.g. "1h" or
+        "30min".
+    label : str
+        Position of the time_index labels within their periods: "start",
+        "center", or "end".
+    delta_t : float
+        Difference between the earth rotation time and terrestrial time
+        (seconds).
+    time_terms : dict | None
+        Optional precomputed :func:`solar_time_terms` of the period centres
+        (time_index itself if label is "center").
+
+    Returns
+    -------
+    mean_cos : np.ndarray
+        (n_times, n_sites) period-averaged cos(sza), zero for periods
+        entirely at night.
+    """
+    seconds, centers = _period_centers(time_index, period, label)
+    if time_terms is None:
+        time_terms = solar_time_terms(centers, delta_t=delta_t)
+
+    lat = np.radians(np.atleast_1d(np.asarray(lat, dtype=np.float64)))
+    lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+    delta = np.radians(time_terms['delta'])[:, None]
+
+    # cos(sza) = a + b cos(H)
+    a = np.sin(lat) * np.sin(delta)
+    b = np.cos(lat) * np.cos(delta)
+
+    # sunset hour angle (0 for polar night and pi for polar day)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sunset = np.arccos(np.clip(-a / b, -1, 1))
+    sunset = np.where(b == 0, np.where(a > 0, np.pi, 0), sunset)
+
+    # period centre hour angle wrapped to [-pi, pi)
+    hour_angle = np.radians(time_terms['nu'][:, None] + lon
+                            - time_terms['alpha'][:, None])
+    hour_angle = (hour_angle + np.pi) % (2 * np.pi) - np.pi
+    half_width = HOUR_ANGLE_RATE * seconds / 2
+    start = hour_angle - half_width
+    end = hour_angle + half_width
+
+    # integrate a + b cos(H) over the overlap of [start, end] with the
+    # daylight intervals [-sunset, sunset] + 2 pi k
+    integral = np.zeros(np.broadcast(a, start).shape)
+    for k in (-1, 0, 1):
+        lo = np.maximum(start, 2 * np.pi * k - sunset)
+        hi = np.minimum(end, 2 * np.pi * k + sunset)
+        day = hi > lo
+        integral += np.where(day, a * (hi - lo)
+                             + b * (np.sin(hi) - np.sin(lo)), 0)
+
+    return np.maximum(integral / (2 * half_width), 0)
+
+
+def mean_solar_zenith_angle(time_index, lat, lon, period='1h',
+                            label='center', delta_t=DELTA_T,
+                            time_terms=None):
+    """Calculate the period-averaged solar zenith angle for FARMS.
+
+    The angle is arccos of the period-averaged cos(sza), see
+    :func:`mean_cos_zenith`, so that FARMS irradiance scaled by cos(sza)
+    represents the period average.
+
+    Parameters
+    ----------
+    time_index : pandas.core.indexes.datetimes.DatetimeIndex
+        Period labels (UTC if timezone naive) with n_times timestamps.
+    lat : np.ndarray | float
+        Site latitudes (degrees, north positive), shape (n_sites,).
+    lon : np.ndarray | float
+        Site longitudes (degrees, east positive), shape (n_sites,).
+    period : str | pd.Timedelta
+        Length of the averaging period (up to one day), e.g. "1h".
+    label : str
+        Position of the time_index labels within their periods: "start",
+        "center", or "end".
+    delta_t : float
+        Difference between the earth rotation time and terrestrial time
+        (seconds).
+    time_terms : dict | None
+        Optional precomputed :func:`solar_time_terms` of the period centres.
+
+    Returns
+    -------
+    sza : np.ndarray
+        (n_times, n_sites) period-averaged solar zenith angle in degrees
+        (90 for periods entirely at night).
+    """
+    mean_cos = mean_cos_zenith(time_index, lat, lon, period=period,
+                               label=label, delta_t=delta_t,
+                               time_terms=time_terms)
+
+    return np.degrees(np.arccos(np.minimum(mean_cos, 1, out=mean_cos)))
@@ -2,16 +2,32 @@
 
 import os
 from copy import deepcopy
+from functools import lru_cache
 from warnings import warn
 
 import numpy as np
-import pandas as pd
-import pytest
 
-from farms import CLEAR_TYPES, CLOUD_TYPES, RADIUS, SZA_LIM
+from farms import (
+    CATEGORY_CLEAR,
+    CATEGORY_ICE,
+    CATEGORY_OTHER,
+    CATEGORY_WATER,
+    CLEAR_TYPES,
+    FARMSDIR,
+    ICE_TYPES,
+    SZA_LIM,
+    WATER_TYPES,
+)
+from farms.philox import cell_random
 
 RANDOM_GENERATOR = np.random.default_rng(seed=42)
 
+# Approximate peak working-set bytes per cell of cloud_variability()
+VARIABILITY_CELL_BYTES = 64
+
+# Modes of validate_inputs()
+VALIDATION_MODES = ('strict', 'warn', 'sampled', 'off')
+
 
 def execute_pytest(file, capture='all', flags='-rapP'):
     """Execute module as pytest with detailed summary report.
@@ -26,11 +42,105 @@ def execute_pytest(file, capture='all', flags='-rapP'):
     flags : str
         Which tests to show logs and results for.
     """
+    import pytest
 
     fname = os.path.basename(file)
     pytest.main(['-q', '--show-capture={}'.format(capture), fname, flags])
 
 
+@lru_cache(maxsize=1)
+def cloud_type_table():
+    """Get the lookup table from cloud type code to cloud type category.
+
+    Returns
+    -------
+    table : np.ndarray
+        Read-only int8 array where table[code - offset] is the category
+        (CATEGORY_OTHER, CATEGORY_WATER, CATEGORY_ICE, or CATEGORY_CLEAR) of
+        cloud type code. The first and last entries are CATEGORY_OTHER so
+        that clipped out-of-range codes map to "other".
+    offset : int
+        Cloud type code of the first table entry.
+    """
+    categories = ((CLEAR_TYPES, CATEGORY_CLEAR), (WATER_TYPES, CATEGORY_WATER),
+                  (ICE_TYPES, CATEGORY_ICE))
+    codes = [code for types, _ in categories for code in types]
+    offset = min(codes) - 1
+    table = np.full(max(codes) - offset + 2, CATEGORY_OTHER, dtype=np.int8)
+    for types, category in categories:
+        table[np.array(types) - offset] = category
+
+    table.flags.writeable = False
+
+    return table, offset
+
+
+def classify_cloud_type(cloud_type):
+    """Classify cloud type codes into int8 categories with a single table
+    lookup (instead of one np.isin pass per group of cloud types).
+
+    Parameters
+    ----------
+    cloud_type : np.ndarray
+        Array of numerical cloud types.
+
+    Returns
+    -------
+    category : np.ndarray
+        int8 array with the shape of cloud_type: CATEGORY_WATER (1) and
+        CATEGORY_ICE (2) for WATER_TYPES and ICE_TYPES (these match the
+        FARMS-DNI cloud phase), CATEGORY_CLEAR (3) for CLEAR_TYPES, and
+        CATEGORY_OTHER (0) for all other codes (including NaN and
+        non-integer float codes). Can be passed as category to
+        farms(), merge_rest_farms(), and the cloud variability functions so
+        that the classification is only done once per chunk.
+    """
+    table, offset = cloud_type_table()
+    cloud_type = np.asarray(cloud_type)
+    if cloud_type.dtype.kind == 'f':
+        # NaN, inf, and non-integer codes (e.g. 3.7) are "other" like in
+        # np.isin instead of being truncated to a valid code
+        valid = np.isfinite(cloud_type) & (cloud_type == np.trunc(cloud_type))
+        cloud_type = np.where(valid, cloud_type, offset)
+
+    index = cloud_type.astype(np.int64) - offset
+
+    return table.take(index, mode='clip')
+
+
+def is_cloudy(category):
+    """Get a mask of the cloudy (CLOUD_TYPES) cells from cloud type
+    categories.
+
+    Parameters
+    ----------
+    category : np.ndarray
+        Cloud type categories from :func:`classify_cloud_type`.
+
+    Returns
+    -------
+    cloudy : np.ndarray
+        Boolean array, True for water and ice cloud categories.
+    """
+    return (category == CATEGORY_WATER) | (category == CATEGORY_ICE)
+
+
+def is_memmap(*arrays):
+    """Check if any of the arrays is a memory-mapped array (np.memmap).
+
+    Parameters
+    ----------
+    arrays : np.ndarray
+        Arrays to check.
+
+    Returns
+    -------
+    memmap : bool
+        True if any of the arrays is a np.memmap.
+    """
+    return any(isinstance(arr, np.memmap) for arr in arrays)
+
+
 def check_range(data, name, rang=(0, 1)):
     """Ensure that data values are in correct range."""
     if np.nanmin(data) < rang[0] or np.nanmax(data) > rang[1]:
@@ -45,7 +155,107 @@ def check_range(data, name, rang=(0, 1)):
         )
 
 
-def ti_to_radius_csv(time_index, n_cols=1):
+def validate_inputs(inputs, mode='strict', sample_size=65536):
+    """Check that input data is within its expected ranges and report all
+    range violations together.
+
+    Only the NaN-ignoring min and max of each array are computed (without
+    the copies of np.nanmin/np.nanmax). The violating values are only
+    counted for arrays that are out of range.
+
+    Parameters
+    ----------
+    inputs : dict
+        {name: (data, (min, max))} of arrays and their inclusive valid range.
+    mode : str
+        Validation mode (see VALIDATION_MODES). "strict" checks all values
+        and raises a ValueError describing every violation, "warn" checks
+        all values and emits a warning instead, "sampled" raises like
+        "strict" but only checks ~sample_size evenly strided values of each
+        array (e.g. for trusted production reruns), and "off" skips the
+        validation.
+    sample_size : int
+        Number of values checked per array in "sampled" mode.
+
+    Returns
+    -------
+    violations : list
+        Descriptions of the range violations (empty if all data is valid or
+        the validation is off).
+    """
+    if mode not in VALIDATION_MODES:
+        msg = 'Did not recognize validation mode: {}'.format(mode)
+        raise ValueError(msg)
+
+    violations = []
+    if mode == 'off':
+        return violations
+
+    for name, (data, (lo, hi)) in inputs.items():
+        data = np.asarray(data)
+        if mode == 'sampled' and data.size > sample_size:
+            step = -(-data.size // sample_size)
+            if data.flags.c_contiguous:
+                data = data.reshape(-1)[::step]
+            else:
+                data = np.take(data, np.arange(0, data.size, step))
+
+        if not data.size:
+            continue
+
+        mn = np.fmin.reduce(data, axis=None)
+        mx = np.fmax.reduce(data, axis=None)
+        if mn < lo or mx > hi:
+            n_bad = np.count_nonzero((data < lo) | (data > hi))
+            violations.append(
+                '"{}" has {} value(s) outside of [{}, {}]. Min/max of {} = '
+                '{}/{}'.format(name, n_bad, lo, hi, name, mn, mx)
+            )
+
+    if violations:
+        msg = ('FARMS input validation found {} variable(s) out of their '
+               'expected range. Recommend checking solar zenith angle to '
+               'ensure cos(sza) is non-negative and non-zero.\n{}'
+               .format(len(violations), '\n'.join(violations)))
+        if mode == 'warn':
+            warn(msg)
+        else:
+            raise ValueError(msg)
+
+    return violations
+
+
+@lru_cache(maxsize=1)
+def radius_by_doy():
+    """Get the tabulated earth-sun radius vector indexed by day of year.
+
+    Returns
+    -------
+    radius : np.ndarray
+        Read-only 1D array of radius values where radius[doy] is the radius
+        for day of year doy (1-366). Index 0 is NaN.
+    """
+    fpath = os.path.join(FARMSDIR, 'sun_earth_radius_vector.npz')
+    with np.load(fpath) as data:
+        radius = np.full(data['doy'].max() + 1, np.nan)
+        radius[data['doy']] = data['r']
+
+    radius.flags.writeable = False
+
+    return radius
+
+
+def _expand_radius(radius, n_cols, broadcast):
+    """Expand a 1D radius vector to (n_times, n_cols) by tiling or as a
+    read-only broadcast view."""
+    radius = radius.reshape((len(radius), 1))
+    if broadcast:
+        return np.broadcast_to(radius, (len(radius), n_cols))
+
+    return np.tile(radius, n_cols)
+
+
+def ti_to_radius_csv(time_index, n_cols=1, broadcast=False):
     """Convert a time index to radius.
 
     Parameters
@@ -56,6 +266,10 @@ def ti_to_radius_csv(time_index, n_cols=1):
     n_cols : int
         Number of columns to output. The radius vertical 1D array will be
         copied this number of times horizontally (np.tile).
+    broadcast : bool
+        Flag to return a read-only np.broadcast_to view of the (n_times, 1)
+        radius array instead of tiling it n_cols times. The view uses no
+        additional memory per column.
 
     Returns
     -------
@@ -63,19 +277,163 @@ def ti_to_radius_csv(time_index, n_cols=1):
         Array of radius values matching the time index.
         Shape is (len(time_index), n_cols).
     """
-    doy = pd.DataFrame(index=time_index.dayofyear)
-    radius = doy.join(RADIUS)
-    radius = np.tile(radius.values, n_cols)
+    radius = radius_by_doy()[np.asarray(time_index.dayofyear)]
 
-    return radius
+    return _expand_radius(radius, n_cols, broadcast)
+
+
+def julian_ephemeris_millennium(time_index, delta_t=64.797):
+    """Get the Julian Ephemeris Millennium (JME) of a time index.
+
+    Reference:
+    http://www.nrel.gov/docs/fy08osti/34302.pdf
+
+    Parameters
+    ----------
+    time_index : pandas.core.indexes.datetimes.DatetimeIndex
+        NSRDB time series (UTC).
+    delta_t : float
+        Difference between the earth rotation time and terrestrial time
+        (seconds).
+
+    Returns
+    -------
+    jme : np.ndarray
+        1D float64 array of Julian Ephemeris Millennium values.
+    """
+    # 3.1.1 (4). Julian Date.
+    jd = np.array(time_index.to_julian_date(), dtype=np.float64)
+    # 3.1.2 (5). Julian Ephemeris Date
+    jde = jd + delta_t / 86400
+    # 3.1.3 (7). Julian Century Ephemeris
+    jce = (jde - 2451545) / 36525
+    # 3.1.4 (8). Julian Ephemeris Millennium
+
+    return jce / 10
+
+
+@lru_cache(maxsize=1)
+def earth_periodic_terms():
+    """Load the earth heliocentric radius periodic terms (cached).
+
+    Returns
+    -------
+    terms : list
+        List of (a, b, c) coefficient arrays for the terms R0 through R5.
+    """
+    fpath = os.path.join(FARMSDIR, 'earth_periodic_terms.npz')
+    with np.load(fpath) as data:
+        return [tuple(data[term].T) for term in sorted(data.files)]
+
+
+def periodic_series(jme, terms, chunk_size=65536):
+    """Evaluate a series of SPA earth periodic terms.
+
+    Reference:
+    http://www.nrel.gov/docs/fy08osti/34302.pdf
+
+    Parameters
+    ----------
+    jme : np.ndarray
+        1D array of Julian Ephemeris Millennium values, see
+        :func:`julian_ephemeris_millennium`.
+    terms : list
+        List of (a, b, c) coefficient arrays for the terms X0, X1, ...
+        e.g. from :func:`earth_periodic_terms`.
+    chunk_size : int
+        Number of timesteps to evaluate at once. Limits the size of the
+        (timesteps, periodic terms) intermediate array.
 
+    Returns
+    -------
+    out : np.ndarray
+        sum_k(sum_i(a_i cos(b_i + c_i jme)) jme^k) for each jme (not yet
+        divided by 1e8).
+    """
+    jme = np.asarray(jme, dtype=np.float64)
+    out = np.zeros_like(jme)
+    for start in range(0, len(jme), chunk_size):
+        j = jme[start:start + chunk_size]
+        # 3.2.1-3.2.4 (9-11). sum_k(sum_i(a_i cos(b_i + c_i jme)) jme^k)
+        x = np.zeros_like(j)
+        for a, b, c in reversed(terms):
+            x = x * j + np.cos(b + np.multiply.outer(j, c)) @ a
+        out[start:start + chunk_size] = x
+
+    return out
+
+
+def heliocentric_radius(jme, chunk_size=65536):
+    """Calculate the Earth heliocentric radius vector.
+
+    Reference:
+    http://www.nrel.gov/docs/fy08osti/34302.pdf
+
+    Parameters
+    ----------
+    jme : np.ndarray
+        1D array of Julian Ephemeris Millennium values, see
+        :func:`julian_ephemeris_millennium`.
+    chunk_size : int
+        Number of timesteps to evaluate at once. Limits the size of the
+        (timesteps, periodic terms) intermediate array.
 
-def ti_to_radius(time_index, n_cols=1):
+    Returns
+    -------
+    radius : np.ndarray
+        Earth-sun radius vector (AU) for each jme.
+    """
+    return periodic_series(jme, earth_periodic_terms(), chunk_size) / 1e8
+
+
+# Memoized earth-sun radius vector keyed by sorted jme values
+_RADIUS_CACHE = {'jme': np.empty(0), 'radius': np.empty(0)}
+
+# Max number of timesteps to hold in the radius cache
+RADIUS_CACHE_SIZE = 2**22
+
+
+def _cached_radius(jme):
+    """Get the heliocentric radius for jme values, only computing values
+    that are not in the module cache yet."""
+    keys, inverse = np.unique(jme, return_inverse=True)
+    cache_keys = _RADIUS_CACHE['jme']
+    cache_radius = _RADIUS_CACHE['radius']
+
+    radius = np.empty(len(keys))
+    hit = np.zeros(len(keys), dtype=bool)
+    if len(cache_keys):
+        idx = np.minimum(np.searchsorted(cache_keys, keys),
+                         len(cache_keys) - 1)
+        hit = cache_keys[idx] == keys
+        radius[hit] = cache_radius[idx[hit]]
+
+    miss = ~hit
+    if miss.any():
+        radius[miss] = heliocentric_radius(keys[miss])
+        if len(cache_keys) + miss.sum() > RADIUS_CACHE_SIZE:
+            cache_keys, cache_radius = keys, radius
+        else:
+            cache_keys = np.concatenate((cache_keys, keys[miss]))
+            cache_radius = np.concatenate((cache_radius, radius[miss]))
+            order = np.argsort(cache_keys, kind='stable')
+            cache_keys, cache_radius = cache_keys[order], cache_radius[order]
+
+        _RADIUS_CACHE['jme'] = cache_keys
+        _RADIUS_CACHE['radius'] = cache_radius
+
+    return radius[inverse.ravel()]
+
+
+def ti_to_radius(time_index, n_cols=1, broadcast=False):
     """Calculates Earth-Sun Radius Vector.
 
     Reference:
     http://www.nrel.gov/docs/fy08osti/34302.pdf
 
+    Results are memoized per timestamp so repeated time indices (e.g.
+    chunks of the same year) are only computed once per process.
+
     Parameters
     ----------
     time_index : pandas.core.indexes.datetimes.DatetimeIndex
@@ -84,6 +442,10 @@ def ti_to_radius(time_index, n_cols=1):
     n_cols : int
         Number of columns to output. The radius vertical 1D array will be
         copied this number of times horizontally (np.tile).
+    broadcast : bool
+        Flag to return a read-only np.broadcast_to view of the (n_times, 1)
+        radius array instead of tiling it n_cols times. The view uses no
+        additional memory per column.
 
     Returns
     -------
@@ -91,43 +453,9 @@ def ti_to_radius(time_index, n_cols=1):
         Array of radius values matching the time index.
         Shape is (len(time_index), n_cols).
     """
-    # load earth periodic table
-    path = os.path.dirname(os.path.realpath(__file__))
-    df = pd.read_csv(os.path.join(path, 'earth_periodic_terms.csv'))
-    df['key'] = 1
-    # 3.1.1 (4). Julian Date.
-    j = time_index.to_julian_date().values
-    # 3.1.2 (5). Julian Ephermeris Date
-    j += 64.797 / 86400
-    # 3.1.3 (7). Julian Century Ephemeris
-    j = (j - 2451545) / 36525
-    # 3.1.4 (8). Julian Ephemeris Millennium
-    j /= 10
-    df_jme = pd.DataFrame({'uid': range(len(j)), 'jme': j, 'key': 1})
-    # Merge JME with Periodic Table
-    df_merge = pd.merge(df_jme, df, on='key')
-    # 3.2.1 (9). Heliocentric radius vector.
-    df_merge['r'] = df_merge['a'] * np.cos(
-        df_merge['b'] + df_merge['c'] * df_merge['jme']
-    )
-    # 3.2.2 (10).
-    dfs = df_merge.groupby(by=['uid', 'term'])['r'].sum().unstack()
-    # 3.2.4 (11). Earth Heliocentric radius vector
-    radius = (
-        (
-            dfs['R0']
-            + dfs['R1'] * j
-            + dfs['R2'] * np.power(j, 2)
-            + dfs['R3'] * np.power(j, 3)
-            + dfs['R4'] * np.power(j, 4)
-            + dfs['R5'] * np.power(j, 5)
-        )
-        / np.power(10, 8)
-    ).values
-    radius = radius.reshape((len(time_index), 1))
-    radius = np.tile(radius, n_cols)
+    radius = _cached_radius(julian_ephemeris_millennium(time_index))
 
-    return radius
+    return _expand_radius(radius, n_cols, broadcast)
 
 
 def calc_beta(aod, alpha):
@@ -231,7 +559,7 @@ def rayleigh(dhi, cs_dhi, fill_flag, rayleigh_flag=7):
     return fill_flag
 
 
-def merge_rest_farms(clearsky_irrad, cloudy_irrad, cloud_type):
+def merge_rest_farms(clearsky_irrad, cloudy_irrad, cloud_type, category=None):
     """Combine clearsky and rest data into all-sky irradiance array.
 
     Parameters
@@ -243,6 +571,9 @@ def merge_rest_farms(clearsky_irrad, cloudy_irrad, cloud_type):
     cloud_type : np.ndarray
         Cloud type array which acts as a mask specifying where to take
         cloud/clear data.
+    category : np.ndarray | None
+        Optional cloud type categories from :func:`classify_cloud_type`.
+        Computed from cloud_type if None.
 
     Returns
     -------
@@ -254,8 +585,11 @@ def merge_rest_farms(clearsky_irrad, cloudy_irrad, cloud_type):
     np.seterr(divide='ignore', invalid='ignore')
 
     # combine clearsky and farms according to the cloud types.
+    if category is None:
+        category = classify_cloud_type(cloud_type)
+
     all_sky_irrad = np.where(
-        np.isin(cloud_type, CLEAR_TYPES), clearsky_irrad, cloudy_irrad
+        category == CATEGORY_CLEAR, clearsky_irrad, cloudy_irrad
     )
 
     return all_sky_irrad
@@ -336,6 +670,11 @@ def cloud_variability(
     option='tri',
     tri_center=0.9,
     random_seed=123,
+    dtype=None,
+    generator='legacy',
+    index_offset=(0, 0),
+    category=None,
+    max_memory=None,
 ):
     """Add syntehtic variability to irradiance when it's cloudy.
 
@@ -359,6 +698,35 @@ def cloud_variability(
         Number to seed the numpy random number generator. Used to generate
         reproducable psuedo-random cloud variability. Numpy random will be
         seeded with the system time if this is None.
+    dtype : np.dtype | str | None
+        Floating point dtype for the computation (e.g. "float32"). irrad and
+        cs_irrad are cast to this dtype (irrad is copied if its dtype
+        differs) and random numbers are drawn directly in this dtype. If
+        None, the computation follows the input dtypes with float64 random
+        numbers.
+    generator : str
+        Random number generator. "legacy" reseeds the module-global
+        RANDOM_GENERATOR and draws a random number for every cell so results
+        depend on the shape of the arrays. "philox" uses a counter-based
+        generator (see :mod:`farms.philox`) keyed by random_seed and the
+        global (time, site) index of each cell, and only draws random numbers
+        for cloudy cells. Results are then identical for any chunking of the
+        domain and independent of the processing order.
+    index_offset : tuple
+        Global (time, site) index of the first cell of the arrays, e.g. the
+        start of a chunk within the full domain. Only used with the "philox"
+        generator.
+    category : np.ndarray | None
+        Optional cloud type categories from :func:`classify_cloud_type`.
+        Computed from cloud_type if None.
+    max_memory : int | float | None
+        Memory budget in bytes for the working set. If given, the
+        variability is added block-by-block over complete rows (timesteps)
+        so that memory-mapped arrays are streamed sequentially through the
+        page cache. The results are identical to a single block. Defaults to
+        farms.chunking.MEMMAP_MEMORY if irrad, cs_irrad, or cloud_type is a
+        np.memmap. A memory-mapped irrad is modified in-place if dtype is
+        None or matches its dtype.
 
     Returns
     -------
@@ -369,36 +737,138 @@ def cloud_variability(
     # disable divide by zero warnings
     np.seterr(divide='ignore', invalid='ignore')
 
+    if max_memory is None and is_memmap(irrad, cs_irrad, cloud_type):
+        from farms.chunking import MEMMAP_MEMORY
+
+        max_memory = MEMMAP_MEMORY
+
+    if dtype is not None:
+        irrad = np.asarray(irrad, dtype=dtype)
+        cs_irrad = np.asarray(cs_irrad, dtype=dtype)
+
     if var_frac:
-        # set a seed for psuedo-random but repeatable results
-        state = np.random.default_rng(random_seed).bit_generator.state
-        RANDOM_GENERATOR.bit_generator.state = state
-
-        # update the clearsky ratio (1 is clear, 0 is cloudy or dark)
-        csr = irrad / cs_irrad
-        # Set the cloud/clear ratio to zero when it's nighttime
-        csr[(cs_irrad == 0)] = 0
-
-        if distribution == 'uniform':
-            variability_scalar = uniform_variability(
-                csr, cloud_type, var_frac, option=option, tri_center=tri_center
-            )
-        elif distribution == 'normal':
-            variability_scalar = normal_variability(
-                csr, cloud_type, var_frac, option=option, tri_center=tri_center
+        if generator == 'legacy':
+            # set a seed for psuedo-random but repeatable results
+            state = np.random.default_rng(random_seed).bit_generator.state
+            RANDOM_GENERATOR.bit_generator.state = state
+        elif generator != 'philox':
+            msg = 'Did not recognize random generator: {}'.format(generator)
+            raise ValueError(msg)
+
+        # blocks of complete rows draw the same legacy random numbers (in the
+        # same order) as a single draw over the full arrays
+        n_rows = irrad.shape[0]
+        if max_memory is not None:
+            n_cells = max_memory // (VARIABILITY_CELL_BYTES
+                                     * np.prod(irrad.shape[1:]))
+            n_rows = max(int(n_cells), 1)
+
+        for start in range(0, irrad.shape[0], n_rows):
+            rows = slice(start, start + n_rows)
+            block_category = (classify_cloud_type(cloud_type[rows])
+                              if category is None else category[rows])
+            rand_arr = None
+            if generator == 'philox':
+                rand_arr = philox_variability_random(
+                    cloud_type[rows], distribution, random_seed,
+                    index_offset=(index_offset[0] + start, index_offset[1]),
+                    dtype=dtype, category=block_category,
+                )
+
+            _add_variability(
+                irrad[rows], cs_irrad[rows], cloud_type[rows], var_frac,
+                distribution, option=option, tri_center=tri_center,
+                dtype=dtype, rand_arr=rand_arr, category=block_category,
             )
-        else:
-            raise ValueError(
-                'Did not recognize distribution: {}'.format(distribution)
-            )
-
-        irrad *= variability_scalar
 
     return irrad
 
 
+def _add_variability(irrad, cs_irrad, cloud_type, var_frac, distribution,
+                     **kwargs):
+    """Multiply irrad in-place with uniform or normal variability scalars
+    (kwargs are passed to uniform_variability or normal_variability)."""
+    # update the clearsky ratio (1 is clear, 0 is cloudy or dark)
+    csr = irrad / cs_irrad
+    # Set the cloud/clear ratio to zero when it's nighttime
+    csr[(cs_irrad == 0)] = 0
+
+    if distribution == 'uniform':
+        variability_scalar = uniform_variability(
+            csr, cloud_type, var_frac, **kwargs
+        )
+    elif distribution == 'normal':
+        variability_scalar = normal_variability(
+            csr, cloud_type, var_frac, **kwargs
+        )
+    else:
+        raise ValueError(
+            'Did not recognize distribution: {}'.format(distribution)
+        )
+
+    irrad *= variability_scalar
+
+
+def philox_variability_random(
+    cloud_type,
+    distribution,
+    random_seed,
+    index_offset=(0, 0),
+    dtype=None,
+    category=None,
+):
+    """Draw counter-based random numbers for the cloudy cells of a
+    (time, sites) chunk.
+
+    Parameters
+    ----------
+    cloud_type : np.ndarray
+        (time, sites) or (time,) array of numerical cloud types.
+    distribution : str
+        "uniform" or "normal".
+    random_seed : int | None
+        Philox seed, see :func:`farms.philox.seed_to_key`.
+    index_offset : tuple
+        Global (time, site) index of the first cell of cloud_type.
+    dtype : np.dtype | str | None
+        Floating point dtype of the random numbers. Defaults to float64.
+    category : np.ndarray | None
+        Optional cloud type categories from :func:`classify_cloud_type`.
+        Computed from cloud_type if None.
+
+    Returns
+    -------
+    rand_arr : np.ndarray
+        Array with the shape of cloud_type with random numbers for cells
+        with a cloud type in CLOUD_TYPES. Other cells are filled with 0.5
+        (uniform) or 0 (normal), i.e. no variability.
+    """
+    dtype = np.float64 if dtype is None else dtype
+    if category is None:
+        category = classify_cloud_type(cloud_type)
+
+    cloudy = is_cloudy(category)
+    fill = 0.5 if distribution == 'uniform' else 0.0
+    rand_arr = np.full(cloud_type.shape, fill, dtype=dtype)
+
+    index = np.nonzero(cloudy)
+    time_index = index[0] + index_offset[0]
+    site_index = (index[1] if cloudy.ndim > 1 else 0) + index_offset[1]
+    rand_arr[cloudy] = cell_random(time_index, site_index, random_seed,
+                                   distribution=distribution, dtype=dtype)
+
+    return rand_arr
+
+
 def uniform_variability(
-    csr, cloud_type, var_frac, option='tri', tri_center=0.9
+    csr,
+    cloud_type,
+    var_frac,
+    option='tri',
+    tri_center=0.9,
+    dtype=None,
+    rand_arr=None,
+    category=None,
 ):
     """Get an array with uniform variability scalars centered at 1 that can be
     multiplied by a irradiance array with the same shape as csr.
@@ -417,6 +887,14 @@ def uniform_variability(
     tri_center : float
         Value of the clearsky ratio at which there is maximum variability
         (only used for the triangular distribution).
+    dtype : np.dtype | str | None
+        Floating point dtype of the random numbers. Defaults to float64.
+    rand_arr : np.ndarray | None
+        Optional uniform random numbers in [0, 1) with the shape of csr
+        (only used for cloudy cells). Drawn from RANDOM_GENERATOR if None.
+    category : np.ndarray | None
+        Optional cloud type categories from :func:`classify_cloud_type`.
+        Computed from cloud_type if None.
 
     Returns
     -------
@@ -435,21 +913,33 @@ def uniform_variability(
         )
 
     # get a uniform random scalar array 0 to 1 with data shape
-    rand_arr = RANDOM_GENERATOR.uniform(size=(csr.shape[0], csr.shape[1]))
+    if rand_arr is None:
+        dtype = np.float64 if dtype is None else dtype
+        rand_arr = RANDOM_GENERATOR.random(
+            size=(csr.shape[0], csr.shape[1]), dtype=dtype
+        )
 
     # Center the random array at 1 +/- var_frac_arr (with csr scaling)
     variability_scalar = 1 + var_frac_arr * (rand_arr * 2 - 1)
 
     # only apply rand to the applicable cloudy timesteps
-    variability_scalar = np.where(
-        np.isin(cloud_type, CLOUD_TYPES), variability_scalar, 1
-    )
+    if category is None:
+        category = classify_cloud_type(cloud_type)
+
+    variability_scalar = np.where(is_cloudy(category), variability_scalar, 1)
 
     return variability_scalar
 
 
 def normal_variability(
-    csr, cloud_type, var_frac, option='tri', tri_center=0.9
+    csr,
+    cloud_type,
+    var_frac,
+    option='tri',
+    tri_center=0.9,
+    dtype=None,
+    rand_arr=None,
+    category=None,
 ):
     """Get an array with a normal distribution of variability scalars centered
     at 1 that can be multiplied by a irradiance array with the same shape as
@@ -470,6 +960,14 @@ def normal_variability(
     tri_center : float
         Value of the clearsky ratio at which there is maximum variability
         (only used for the triangular distribution).
+    dtype : np.dtype | str | None
+        Floating point dtype of the random numbers. Defaults to float64.
+    rand_arr : np.ndarray | None
+        Optional standard normal random numbers with the shape of csr (only
+        used for cloudy cells). Drawn from RANDOM_GENERATOR if None.
+    category : np.ndarray | None
+        Optional cloud type categories from :func:`classify_cloud_type`.
+        Computed from cloud_type if None.
 
     Returns
     -------
@@ -488,15 +986,19 @@ def normal_variability(
         )
 
     # get a normal distribution of data centered at 0 with stdev 1
-    rand_arr = RANDOM_GENERATOR.normal(loc=0.0, scale=1.0, size=csr.shape)
+    if rand_arr is None:
+        dtype = np.float64 if dtype is None else dtype
+        rand_arr = RANDOM_GENERATOR.standard_normal(size=csr.shape,
+                                                    dtype=dtype)
 
     # Center the random array at 1 +/- var_frac_arr (with csr scaling)
     variability_scalar = 1 + var_frac_arr * rand_arr
 
     # only apply rand to the applicable cloudy timesteps
-    variability_scalar = np.where(
-        np.isin(cloud_type, CLOUD_TYPES), variability_scalar, 1
-    )
+    if category is None:
+        category = classify_cloud_type(cloud_type)
+
+    variability_scalar = np.where(is_cloudy(category), variability_scalar, 1)
 
     return variability_scalar
 
@@ -29,7 +29,9 @@ class PostDevelopCommand(develop):
 
 setup(
     package_data={
-        'farms': ['earth_periodic_terms.csv', 'sun_earth_radius_vector.csv']
+        'farms': ['sun_earth_radius_vector.csv', 'earth_periodic_terms.npz',
+                  'sun_earth_radius_vector.npz', 'farms_lut.npz',
+                  'spa_periodic_terms.npz']
     },
     test_suite='tests',
     cmdclass={'develop': PostDevelopCommand},
@@ -0,0 +1,62 @@
+"""
+PyTest file for the xarray FARMS accessor.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from test_farms import make_inputs
+
+from farms.farms import FARMS_OUTPUTS, farms
+from farms.utilities import execute_pytest, ti_to_radius
+
+xr = pytest.importorskip('xarray')
+pytest.importorskip('dask')
+from farms import accessor  # noqa: E402, F401
+
+
+def make_dataset(n_times=48, n_lat=4, n_lon=5):
+    """Make a (time, lat, lon) Dataset with NSRDB-style variable names and
+    the equivalent farms() keyword arguments."""
+    inputs = make_inputs(shape=(n_times, n_lat * n_lon))
+    time_index = pd.date_range('2020-06-01', periods=n_times, freq='h')
+    inputs['radius'] = ti_to_radius(time_index)
+    inputs['albedo'] = inputs['albedo'][:1]
+
+    shape = (n_times, n_lat, n_lon)
+    dims = ('time', 'lat', 'lon')
+    names = {'tau': 'cld_opd_dcomp', 'cloud_effective_radius':
+             'cld_reff_dcomp', 'albedo': 'surface_albedo'}
+    data = {names.get(k, k): (dims, v.reshape(shape)) for k, v in
+            inputs.items() if k not in ('radius', 'albedo')}
+    data['surface_albedo'] = (('lat', 'lon'), inputs['albedo'].reshape(
+        shape[1:]))
+    coords = {'time': time_index, 'lat': np.arange(n_lat),
+              'lon': np.arange(n_lon)}
+
+    return xr.Dataset(data, coords=coords), inputs
+
+
+def test_accessor():
+    """Test the lazy accessor against farms() on numpy arrays."""
+    ds, inputs = make_dataset()
+    truth = farms(**inputs)
+
+    out = ds.chunk({'time': 10, 'lat': 2}).farms.run()
+    assert out.ghi.chunks is not None
+    out = out.compute()
+    assert out.ghi.dims == ('time', 'lat', 'lon')
+    assert (out.time == ds.time).all()
+    for name, x in zip(FARMS_OUTPUTS, truth):
+        y = out[name].values.reshape(x.shape)
+        assert np.allclose(x, y, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+    out = ds.farms.run(dtype=np.float32)
+    assert out.ghi.dtype == np.float32
+
+    with pytest.raises(KeyError, match='Tddclr'):
+        ds.drop_vars('Tddclr').farms.run()
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
@@ -0,0 +1,75 @@
+"""
+PyTest file for the fused all-sky pipeline.
+"""
+
+import numpy as np
+import pytest
+from test_farms import make_inputs
+
+from farms import SZA_LIM
+from farms import utilities as ut
+from farms.all_sky import all_sky
+from farms.farms import farms
+from farms.utilities import execute_pytest
+
+
+def sequential_all_sky(inputs, clearsky_ghi, clearsky_dni,
+                       cld_range=(0, 160)):
+    """Run the all-sky stages one after another on copies of the inputs."""
+    inputs = {k: np.array(v) for k, v in inputs.items()}
+    sza = ut.screen_sza(inputs['solar_zenith_angle'], lim=SZA_LIM)
+    inputs['tau'] = ut.screen_cld(inputs['tau'], rng=cld_range)
+    inputs['cloud_effective_radius'] = ut.screen_cld(
+        inputs['cloud_effective_radius'], rng=cld_range)
+
+    ghi, dni, _ = farms(**inputs)
+    ghi = ut.merge_rest_farms(clearsky_ghi, ghi, inputs['cloud_type'])
+    dni = ut.merge_rest_farms(clearsky_dni, dni, inputs['cloud_type'])
+    dhi, dni = ut.calc_dhi(dni, ghi, sza)
+    ghi = ut.dark_night(ghi, sza, lim=SZA_LIM)
+    dni = ut.dark_night(dni, sza, lim=SZA_LIM)
+    dhi = ut.dark_night(dhi, sza, lim=SZA_LIM)
+
+    return ghi, dni, dhi
+
+
+def test_all_sky():
+    """Test the fused all-sky pipeline against the sequential stages."""
+    inputs = make_inputs()
+    inputs['solar_zenith_angle'][:3] = 95
+    inputs['tau'][3, :5] = [np.nan, -1, 200, 0, 160]
+    inputs['cloud_effective_radius'][4, :2] = [np.nan, 200]
+    rng = np.random.default_rng(1)
+    clearsky_ghi = rng.uniform(0, 1000, inputs['tau'].shape)
+    clearsky_dni = rng.uniform(0, 1000, inputs['tau'].shape)
+    original = {k: v.copy() for k, v in inputs.items()}
+
+    truth = sequential_all_sky(inputs, clearsky_ghi, clearsky_dni)
+    out = tuple(np.full(inputs['tau'].shape, -1.0) for _ in range(3))
+    test = all_sky(**inputs, clearsky_ghi=clearsky_ghi,
+                   clearsky_dni=clearsky_dni, out=out, chunks=(5, 20))
+
+    assert all(x is y for x, y in zip(test, out))
+    for x, y in zip(truth, test):
+        assert np.allclose(x, y, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+    for k, v in original.items():
+        assert np.array_equal(v, inputs[k], equal_nan=True)
+
+    # NaN cloud properties are set to zero before clipping to the range
+    cld_range = (0.5, 100)
+    truth = sequential_all_sky(inputs, clearsky_ghi, clearsky_dni,
+                               cld_range=cld_range)
+    test = all_sky(**inputs, clearsky_ghi=clearsky_ghi,
+                   clearsky_dni=clearsky_dni, cld_range=cld_range,
+                   chunks=(5, 20))
+    for x, y in zip(truth, test):
+        assert np.allclose(x, y, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+    with pytest.raises(ValueError, match='debug'):
+        all_sky(**inputs, clearsky_ghi=clearsky_ghi,
+                clearsky_dni=clearsky_dni, debug=True)
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
@@ -0,0 +1,128 @@
+"""
+PyTest file for the HDF5 batch runner and command line interface.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from test_farms import make_inputs
+
+from farms.all_sky import all_sky
+from farms.utilities import execute_pytest, ti_to_radius
+
+h5py = pytest.importorskip('h5py')
+from farms.batch import aligned_chunks, run_file  # noqa: E402
+from farms.cli import main  # noqa: E402
+
+
+def write_inputs(tmpdir, shape=(48, 20), convention='psm', chunks=(24, 5)):
+    """Write NSRDB-style cloud and REST2 files with scaled integer data and
+    return the all_sky() inputs. The cloud data is packed with the NSRDB
+    psm_scale_factor ("psm") or the CF scale_factor and add_offset ("cf")
+    convention. Datasets are contiguous if chunks is None."""
+    inputs = make_inputs(shape=shape)
+    inputs['clearsky_ghi'] = np.round(1000 * inputs['Tddclr'])
+    inputs['clearsky_dni'] = np.round(900 * inputs['Tddclr'])
+    time_index = pd.date_range('2020-06-01', periods=shape[0], freq='h')
+    inputs['radius'] = ti_to_radius(time_index)
+
+    # stored as integers with a resolution of 0.01 (values are rounded)
+    for name in ('tau', 'cloud_effective_radius', 'solar_zenith_angle'):
+        inputs[name] = np.round(inputs[name] * 100) / 100
+
+    cld_fpath = os.path.join(tmpdir, 'cloud.h5')
+    rest_fpath = os.path.join(tmpdir, 'rest2.h5')
+    cld = {'cld_opd_dcomp': 'tau', 'cld_reff_dcomp': 'cloud_effective_radius',
+           'solar_zenith_angle': 'solar_zenith_angle'}
+    with h5py.File(cld_fpath, 'w') as f:
+        f['time_index'] = np.array(time_index.astype(str), dtype='S')
+        f.create_dataset('cloud_type', data=inputs['cloud_type'],
+                         dtype=np.int8, chunks=chunks)
+        for dset, arg in cld.items():
+            if convention == 'psm':
+                data = np.round(inputs[arg] * 100).astype(np.uint16)
+                f.create_dataset(dset, data=data, chunks=chunks)
+                f[dset].attrs['psm_scale_factor'] = 100
+            else:
+                data = np.round((inputs[arg] - 30) * 100).astype(np.int16)
+                f.create_dataset(dset, data=data, chunks=chunks)
+                f[dset].attrs['scale_factor'] = 0.01
+                f[dset].attrs['add_offset'] = 30
+
+    rest = ('Tuuclr', 'Ruuclr', 'Tddclr', 'Tduclr', 'clearsky_ghi',
+            'clearsky_dni')
+    with h5py.File(rest_fpath, 'w') as f:
+        for name in rest:
+            f.create_dataset(name, data=inputs[name], chunks=chunks)
+        f.create_dataset('surface_albedo', data=inputs['albedo'])
+
+    return [cld_fpath, rest_fpath], inputs
+
+
+def test_aligned_chunks():
+    """Test that blocks are made of whole storage chunks."""
+    assert aligned_chunks((8760, 1000), (8760, 10), 8760 * 30 * 128) == (
+        8760, 30)
+    assert aligned_chunks((8760, 1000), (100, 10), 1) == (100, 10)
+    assert aligned_chunks((8760, 1000), (100, 10), 50 * 1000 * 128) == (
+        5000, 10)
+    assert aligned_chunks((48, 20), None, 1e12) == (48, 20)
+    assert aligned_chunks((8760, 1000), None, 50 * 1000 * 128) == (50, 1000)
+    assert aligned_chunks((8760, 1000), None, 1) == (1, 1)
+
+
+@pytest.mark.parametrize('convention', ['psm', 'cf'])
+def test_run_file(tmpdir, convention):
+    """Test the HDF5 batch runner and CLI against all_sky()."""
+    in_fpaths, inputs = write_inputs(str(tmpdir), convention=convention)
+    truth = all_sky(**inputs)
+
+    out_fpath = os.path.join(str(tmpdir), 'farms.h5')
+    run_file(in_fpaths, out_fpath, max_memory=48 * 5 * 128, n_workers=2)
+    with h5py.File(out_fpath, 'r') as f:
+        assert 'time_index' in f
+        for name, x in zip(('ghi', 'dni', 'dhi'), truth):
+            assert f[name].compression == 'gzip'
+            assert f[name].dtype == np.float32
+            assert np.allclose(f[name][...], x, rtol=1e-5, atol=1e-3)
+
+    status = main([*in_fpaths, '-o', out_fpath, '--out-dtype', 'uint16',
+                   '--scale-factor', '1', '--name', 'albedo=surface_albedo'])
+    assert status == 0
+    with h5py.File(out_fpath, 'r') as f:
+        assert f['ghi'].dtype == np.uint16
+        assert f['ghi'].attrs['psm_scale_factor'] == 1
+        assert np.allclose(f['ghi'][...], truth[0], atol=0.5)
+
+    with pytest.raises(ValueError, match='scale_factor'):
+        run_file(in_fpaths, out_fpath, out_dtype='int16')
+
+    for name in ('albedo', 'surface_albedo=albedo'):
+        with pytest.raises(SystemExit):
+            main([*in_fpaths, '-o', out_fpath, '--name', name])
+
+
+def test_run_file_contiguous(tmpdir):
+    """Test that contiguous datasets are processed in blocks that fit the
+    memory budget."""
+    in_fpaths, inputs = write_inputs(str(tmpdir), chunks=None)
+    truth = all_sky(**inputs)
+
+    max_memory = 48 * 5 * 128
+    with h5py.File(in_fpaths[0], 'r') as f:
+        dset = f['cloud_type']
+        assert dset.chunks is None
+        chunks = aligned_chunks(dset.shape, dset.chunks, max_memory)
+        assert np.prod(chunks) < np.prod(dset.shape)
+
+    out_fpath = os.path.join(str(tmpdir), 'farms.h5')
+    run_file(in_fpaths, out_fpath, max_memory=max_memory)
+    with h5py.File(out_fpath, 'r') as f:
+        for name, x in zip(('ghi', 'dni', 'dhi'), truth):
+            assert np.allclose(f[name][...], x, rtol=1e-5, atol=1e-3)
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
@@ -0,0 +1,207 @@
+"""
+PyTest file for chunked FARMS execution.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+from test_farms import make_inputs
+
+from farms.chunking import (
+    estimate_cell_bytes,
+    farms_chunked,
+    iter_chunks,
+    open_memmap_outputs,
+    plan_chunks,
+)
+from farms.disc import disc
+from farms.farms import farms
+from farms.shared import SharedArray, farms_multiprocess
+from farms.utilities import cloud_variability, execute_pytest
+
+
+def test_plan_chunks():
+    """Test that planned blocks fit in the memory budget and tile the full
+    domain."""
+    shape = (17520, 1000)
+    cell_bytes = estimate_cell_bytes()
+
+    chunks = plan_chunks(shape, 1e9, cell_bytes)
+    assert chunks[1] == shape[1]
+    assert np.prod(chunks) * cell_bytes <= 1e9
+
+    chunks = plan_chunks(shape, 100 * cell_bytes, cell_bytes)
+    assert chunks == (1, 100)
+
+    count = np.zeros(shape, dtype=int)
+    for block in iter_chunks(shape, (1000, 300)):
+        count[block] += 1
+    assert (count == 1).all()
+
+    shape = (48, 20, 30)
+    assert plan_chunks(shape, 1e9, cell_bytes) == shape
+    assert plan_chunks(shape, 1300 * cell_bytes, cell_bytes) == (2, 20, 30)
+    assert plan_chunks(shape, 100 * cell_bytes, cell_bytes) == (1, 3, 30)
+    assert plan_chunks(shape, 10 * cell_bytes, cell_bytes) == (1, 1, 10)
+
+
+def test_farms_chunked():
+    """Test that chunked FARMS matches a single call to FARMS."""
+    inputs = make_inputs(shape=(50, 30))
+    inputs['radius'] = inputs['radius'][:, :1]
+    truth = farms(**inputs)
+
+    max_memory = 7 * 30 * estimate_cell_bytes()
+    out = farms_chunked(**inputs, max_memory=max_memory)
+    for x, y in zip(truth, out):
+        assert np.allclose(x, y, equal_nan=True)
+
+    out = farms_chunked(**inputs, chunks=(13, 7))
+    for x, y in zip(truth, out):
+        assert np.allclose(x, y, equal_nan=True)
+
+    with pytest.raises(ValueError):
+        farms_chunked(**inputs, chunks=(13, 7),
+                      category=np.zeros((50, 30), dtype=np.int8))
+    with pytest.raises(ValueError):
+        farms(**inputs, n_workers=2,
+              category=np.zeros((50, 30), dtype=np.int8))
+
+
+def test_farms_threaded():
+    """Test that FARMS split across a thread pool matches a single call."""
+    inputs = make_inputs(shape=(50, 30))
+    truth = farms(**inputs)
+
+    out = farms(**inputs, n_workers=4)
+    for x, y in zip(truth, out):
+        assert np.allclose(x, y, equal_nan=True)
+
+    out = farms_chunked(**inputs, n_workers=3, max_memory=1e5)
+    for x, y in zip(truth, out):
+        assert np.allclose(x, y, equal_nan=True)
+
+
+def test_farms_multiprocess():
+    """Test that FARMS on a shared memory process pool matches a single
+    call."""
+    inputs = make_inputs(shape=(50, 30))
+    inputs['radius'] = inputs['radius'][:, :1]
+    truth = farms(**inputs)
+
+    out = farms_multiprocess(**inputs, n_workers=2, chunks=(25, 10))
+    for x, y in zip(truth, out):
+        assert np.allclose(x, y, equal_nan=True)
+
+    tau = SharedArray.from_array(inputs.pop('tau'))
+    out = [SharedArray(tau.shape, tau.dtype) for _ in range(3)]
+    try:
+        farms_multiprocess(tau=tau, **inputs, n_workers=2, out=out)
+        for x, y in zip(truth, out):
+            assert np.allclose(x, y.array, equal_nan=True)
+    finally:
+        for arr in [tau, *out]:
+            arr.unlink()
+
+
+def test_farms_multiprocess_cleanup(monkeypatch):
+    """Test that shared memory blocks are freed if an allocation fails."""
+    inputs = make_inputs(shape=(50, 30))
+    from_array = SharedArray.from_array
+    names = []
+
+    def fail_fifth(arr):
+        if len(names) == 4:
+            msg = 'No space left on device'
+            raise OSError(msg)
+        arr = from_array(arr)
+        names.append(arr.spec[0])
+        return arr
+
+    monkeypatch.setattr(SharedArray, 'from_array', fail_fifth)
+    with pytest.raises(OSError, match='No space'):
+        farms_multiprocess(**inputs, n_workers=2)
+
+    assert len(names) == 4
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_chunked_validation():
+    """Test that violations in different blocks are reported together before
+    any output is written."""
+    inputs = make_inputs(shape=(50, 30))
+    inputs['tau'][0, 0] = 165
+    inputs['tau'][-1, -1] = 170
+    inputs['Tddclr'][-1, 0] = 2
+    out = tuple(np.full((50, 30), -1.0) for _ in range(3))
+
+    match = r'(?s)"tau" has 2 value.*= -?[\d.]+/170\.0'
+    with pytest.raises(ValueError, match=match) as e:
+        farms_chunked(**inputs, chunks=(13, 7), out=out)
+    assert '"Tddclr" has 1 value' in str(e.value)
+    assert all((arr == -1).all() for arr in out)
+
+    with pytest.raises(ValueError, match=match):
+        farms(**inputs, max_memory=20000, out=out)
+    assert all((arr == -1).all() for arr in out)
+
+    with pytest.raises(ValueError, match=match):
+        farms_multiprocess(**inputs, n_workers=2, chunks=(25, 10))
+
+    with pytest.warns(UserWarning, match='"Tddclr"'):
+        farms_chunked(**inputs, chunks=(13, 7), out=out, validation='warn')
+    assert not any((arr == -1).any() for arr in out)
+
+
+def test_memmap(tmp_path):
+    """Test out-of-core execution on memory-mapped inputs and outputs."""
+    shape = (50, 30)
+    inputs = make_inputs(shape=shape)
+    inputs['radius'] = inputs['radius'][:, :1]
+    truth = farms(**inputs)
+
+    mm_inputs = {}
+    for name, arr in inputs.items():
+        fpath = str(tmp_path / '{}_in.npy'.format(name))
+        mm_inputs[name] = np.lib.format.open_memmap(
+            fpath, mode='w+', dtype=arr.dtype, shape=arr.shape)
+        mm_inputs[name][:] = arr
+
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    out = open_memmap_outputs(str(out_dir), shape, dtype=np.float64)
+    max_memory = 7 * 30 * estimate_cell_bytes()
+    farms(**mm_inputs, out=out, max_memory=max_memory)
+    for x, y in zip(truth, out):
+        assert np.allclose(x, y, equal_nan=True)
+
+    for x, y in zip(truth, open_memmap_outputs(str(out_dir), None,
+                                               mode='r')):
+        assert isinstance(y, np.memmap)
+        assert np.allclose(x, y, equal_nan=True)
+
+    ghi = truth[0]
+    sza = inputs['solar_zenith_angle']
+    doy = np.arange(1, shape[0] + 1)[:, None]
+    assert np.allclose(disc(ghi, sza, doy),
+                       disc(ghi, sza, doy, max_memory=1000), equal_nan=True)
+
+    cs_ghi = ghi / 0.7
+    for generator in ('legacy', 'philox'):
+        kwargs = {'var_frac': 0.1, 'generator': generator}
+        single = cloud_variability(ghi.copy(), cs_ghi, inputs['cloud_type'],
+                                   **kwargs)
+        mm_ghi = np.lib.format.open_memmap(
+            str(tmp_path / 'ghi_{}.npy'.format(generator)), mode='w+',
+            dtype=ghi.dtype, shape=shape)
+        mm_ghi[:] = ghi
+        cloud_variability(mm_ghi, cs_ghi, inputs['cloud_type'],
+                          max_memory=1000, **kwargs)
+        assert np.allclose(single, mm_ghi, equal_nan=True)
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
@@ -0,0 +1,80 @@
+"""
+PyTest file for the DISC model.
+"""
+
+import numpy as np
+
+from farms import SOLAR_CONSTANT
+from farms.disc import disc
+from farms.utilities import execute_pytest
+
+
+def masked_disc(ghi, sza, doy, pressure=1013.25, sza_lim=87):
+    """Original DISC implementation with boolean masks for each regime."""
+    A = np.zeros_like(ghi)
+    B = np.zeros_like(ghi)
+    C = np.zeros_like(ghi)
+
+    day_angle = 2. * np.pi * (doy - 1) / 365
+    re_var = (1.00011 + 0.034221 * np.cos(day_angle)
+              + 0.00128 * np.sin(day_angle)
+              + 0.000719 * np.cos(2. * day_angle)
+              + 7.7E-5 * np.sin(2. * day_angle))
+    re_var = np.tile(re_var.reshape((len(re_var), 1)), sza.shape[1])
+
+    I0 = re_var * SOLAR_CONSTANT
+    I0h = I0 * np.cos(np.radians(sza))
+    Ztemp = np.copy(sza)
+    Ztemp[Ztemp > sza_lim] = sza_lim
+    AM = (1. / (np.cos(np.radians(Ztemp))
+                + 0.15 * (np.power((93.885 - Ztemp), -1.253)))
+          * 100 * pressure / 101325)
+
+    Kt = ghi / I0h
+    Kt[Kt < 0] = 0
+    hi = Kt > 0.6
+    lo = Kt <= 0.6
+    A[hi] = -5.743 + 21.77 * Kt[hi] - 27.49 * Kt[hi]**2 + 11.56 * Kt[hi]**3
+    B[hi] = 41.4 - 118.5 * Kt[hi] + 66.05 * Kt[hi]**2 + 31.9 * Kt[hi]**3
+    C[hi] = -47.01 + 184.2 * Kt[hi] - 222. * Kt[hi]**2 + 73.81 * Kt[hi]**3
+    A[lo] = 0.512 - 1.56 * Kt[lo] + 2.286 * Kt[lo]**2 - 2.222 * Kt[lo]**3
+    B[lo] = 0.37 + 0.962 * Kt[lo]
+    C[lo] = -0.28 + 0.932 * Kt[lo] - 2.048 * Kt[lo]**2
+
+    delKn = A + B * np.exp(C * AM)
+    Knc = (0.866 - 0.122 * AM + 0.0121 * AM**2 - 0.000653 * AM**3
+           + 0.000014 * AM**4)
+    DNI = (Knc - delKn) * I0
+    DNI[np.logical_or.reduce((sza >= sza_lim, ghi < 1, DNI < 0))] = 0
+
+    return DNI
+
+
+def test_disc():
+    """Test the vectorized DISC model against the masked implementation."""
+    rng = np.random.default_rng(0)
+    shape = (48, 20)
+    ghi = rng.uniform(-5, 1100, shape)
+    ghi[::7, ::3] = np.nan
+    sza = rng.uniform(0, 86, shape)
+    sza[0] = [87, 88, 95] * 6 + [np.nan, 0]
+    doy = np.repeat(np.arange(1, 3), 24)
+    pressure = rng.uniform(700, 1050, shape)
+
+    truth = masked_disc(ghi, sza, doy, pressure=pressure)
+    test = disc(ghi, sza, doy, pressure=pressure)
+    assert np.array_equal(np.isnan(truth), np.isnan(test))
+    assert np.allclose(truth, test, rtol=1e-9, atol=1e-9, equal_nan=True)
+    assert (test[0, :18] == 0).all()
+
+    out = np.full(shape, -1.0)
+    disc(ghi, sza, doy[:, None], pressure=pressure, out=out)
+    assert np.array_equal(out, test, equal_nan=True)
+
+    test = disc(ghi, sza, doy, pressure=pressure, dtype=np.float32)
+    assert test.dtype == np.float32
+    assert np.allclose(truth, test, rtol=1e-3, atol=0.1, equal_nan=True)
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
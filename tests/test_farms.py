@@ -0,0 +1,172 @@
+"""
+PyTest file for FARMS.
+"""
+
+import numpy as np
+import pytest
+
+from farms import CLOUD_TYPES, SZA_LIM
+from farms.farms import (
+    FARMS_INPUTS,
+    farms,
+    farms_compact,
+    farms_stream,
+    scatter_compact,
+)
+from farms.utilities import execute_pytest
+
+CLOUD_TYPE_CODES = (-15, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12)
+
+
+def make_inputs(shape=(48, 20), seed=0):
+    """Make a dict of random but physically plausible FARMS inputs."""
+    rng = np.random.default_rng(seed)
+    return {
+        'tau': rng.uniform(0, 60, shape),
+        'cloud_type': rng.choice(CLOUD_TYPE_CODES, shape),
+        'cloud_effective_radius': rng.uniform(1, 70, shape),
+        'solar_zenith_angle': rng.uniform(0, 89, shape),
+        'radius': np.full(shape, 1.0),
+        'Tuuclr': rng.uniform(0.7, 0.95, shape),
+        'Ruuclr': rng.uniform(0.05, 0.2, shape),
+        'Tddclr': rng.uniform(0.4, 0.9, shape),
+        'Tduclr': rng.uniform(0.01, 0.2, shape),
+        'albedo': rng.uniform(0.05, 0.5, shape),
+    }
+
+
+def test_farms_numba_backend():
+    """Test that the numba backend matches the numpy backend within the
+    documented tolerance."""
+    pytest.importorskip('numba')
+    from farms.farms_numba import ATOL, RTOL
+
+    inputs = make_inputs()
+    inputs['tau'][0, :5] = 0
+    inputs['tau'][1, :5] = [0.05, 8.0, 100, 160, 1.0]
+    inputs['radius'] = inputs['radius'][:, :1]
+
+    truth = farms(**inputs)
+    test = farms(**inputs, backend='numba')
+
+    for x, y in zip(truth, test):
+        assert x.shape == y.shape
+        assert np.allclose(x, y, rtol=RTOL, atol=ATOL, equal_nan=True)
+        assert np.array_equal(np.isnan(x), np.isnan(y))
+
+
+def test_farms_float32():
+    """Test the float32 execution mode against float64."""
+    inputs = make_inputs()
+    truth = farms(**inputs)
+    test = farms(**inputs, dtype=np.float32)
+
+    for x, y in zip(truth, test):
+        assert y.dtype == np.float32
+        assert np.array_equal(np.isnan(x), np.isnan(y))
+        assert np.allclose(x, y, rtol=1e-3, atol=0.5, equal_nan=True)
+
+
+def test_farms_stream():
+    """Test streaming FARMS over time slices against a single FARMS run."""
+    inputs = make_inputs()
+    albedo = inputs.pop('albedo')[:1]
+    truth = farms(**inputs, albedo=np.broadcast_to(albedo, (48, 20)))
+
+    blocks = ({k: v[i:i + 5] for k, v in inputs.items()}
+              for i in range(0, 48, 5))
+    out = list(farms_stream(blocks, static={'albedo': albedo}))
+    assert len(out) == 10
+    for i, x in enumerate(truth):
+        y = np.concatenate([block[i] for block in out])
+        assert np.array_equal(x, y, equal_nan=True)
+
+    block = [inputs[name][:1] if name != 'albedo' else albedo
+             for name in FARMS_INPUTS]
+    out = next(farms_stream(iter([block]), dtype=np.float32))
+    assert out[0].shape == (1, 20)
+    assert out[0].dtype == np.float32
+
+    with pytest.raises(ValueError, match='missing'):
+        next(farms_stream([{'tau': inputs['tau']}]))
+
+
+def test_farms_compact():
+    """Test the compact daylight-cloudy FARMS mode against dense FARMS."""
+    inputs = make_inputs()
+    sza = np.linspace(0, 89.9, 48 * 20).reshape(48, 20)
+    inputs['solar_zenith_angle'] = sza
+    inputs['radius'] = inputs['radius'][:, :1]
+    truth = farms(**inputs)
+    test = farms(**inputs, compact=True)
+
+    mask = (np.isin(inputs['cloud_type'], CLOUD_TYPES)
+            & (inputs['solar_zenith_angle'] < SZA_LIM))
+    assert 0 < mask.sum() < mask.size
+    for x, y in zip(truth, test):
+        assert y.shape == x.shape
+        assert np.isnan(y[~mask]).all()
+        assert np.allclose(x[mask], y[mask], rtol=1e-12, atol=1e-9)
+
+    values, index = farms_compact(**inputs, return_index=True)
+    assert np.array_equal(index, np.flatnonzero(mask))
+    for x, y in zip(test, values):
+        assert y.shape == (mask.sum(),)
+        assert np.array_equal(scatter_compact(y, index, x.shape), x,
+                              equal_nan=True)
+
+    out = tuple(np.zeros((20, 48)).T for _ in range(3))
+    result = farms(**inputs, compact=True, out=out, max_memory=1000)
+    for x, y, z in zip(test, out, result):
+        assert z is y
+        assert np.array_equal(x, y, equal_nan=True)
+
+    with pytest.raises(ValueError):
+        farms_compact(**inputs, return_index=True, out=out)
+    with pytest.raises(ValueError, match='shape'):
+        farms(**inputs, compact=True, out=[arr.T for arr in out])
+
+    inputs['solar_zenith_angle'] = np.full((48, 20), 95.0)
+    values, index = farms_compact(**inputs, return_index=True,
+                                  dtype=np.float32)
+    assert index.size == 0
+    assert all(arr.shape == (0,) for arr in values)
+    assert all(arr.dtype == np.float32 for arr in values)
+
+
+def test_farms_validation():
+    """Test the FARMS input validation modes."""
+    inputs = make_inputs()
+    inputs['Tddclr'][0, 0] = 1.5
+    inputs['tau'][1, :] = 200
+    with pytest.raises(ValueError, match='2 variable') as err:
+        farms(**inputs)
+
+    assert '"Tddclr" has 1 value' in str(err.value)
+    assert '"tau" has 20 value' in str(err.value)
+
+    with pytest.warns(UserWarning, match='Tddclr'):
+        farms(**inputs, validation='warn')
+
+    truth = farms(**inputs, validation='off')
+    assert truth[0].shape == (48, 20)
+
+    inputs['Tddclr'][:] = np.nan
+    inputs['tau'][:] = np.clip(inputs['tau'], 0, 160)
+    farms(**inputs)
+    inputs['Tuuclr'][::2] = -1
+    with pytest.raises(ValueError, match='Tuuclr'):
+        farms(**inputs, validation='sampled')
+
+    with pytest.raises(ValueError, match='validation mode'):
+        farms(**inputs, validation='lenient')
+
+
+def test_farms_bad_backend():
+    """Test that an unknown backend raises an error."""
+    with pytest.raises(ValueError, match='backend'):
+        farms(**make_inputs(), backend='fortran')
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
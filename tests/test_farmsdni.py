@@ -50,5 +50,38 @@ def test_farmsdni():
     assert wrong_num == 0
 
 
+def test_transmittance_tables():
+    """Test the table-driven piecewise Pwater/Pice transmittance against
+    the equations of Yang et al. (2022) for a few explicit bands."""
+    umu0 = np.array([0.5, 0.95])
+    Z = np.degrees(np.arccos(umu0))
+    tau = np.array([5.0, 5.0])
+    De = np.array([20.0, 20.0])
+
+    # water: Tddp band 0.4694 <= umu0 < 0.7193, tau >= taup
+    u = umu0[0]
+    h = 0.005553 * np.log(20.0) + 0.002503
+    Tddp = h * (2.6399 * u * u - 3.2111 * u + 1.9434)
+    truth = Tddp * np.tanh(6.6421 * u**2.0672 / 25.0)
+    assert np.isclose(farms_dni.Pwater(Z, tau, De)[0], truth, rtol=1e-12)
+
+    # ice: Tddp band 0.9396 < umu0 <= 0.9702 with 10 < De <= 30
+    u = umu0[1]
+    ade = -0.000232338 * 400.0 + 0.012748726 * 20.0 + 0.046745083
+    Tddp = (-181.72 * u * u + 343.59 * u - 161.3) * ade
+    truth = Tddp * np.tanh(7.117 * u**1.9658 / 25.0)
+    assert np.isclose(farms_dni.Pice(Z, tau, De)[1], truth, rtol=1e-12)
+
+    # overlapping ice taup bands for large De: the later band takes
+    # precedence (taup = 0.5, not 0.3)
+    index = farms_dni._linear_band_index(
+        np.array([0.095]),
+        np.array([300.0]),
+        farms_dni.PICE_TAUP_SLOPES[1],
+        farms_dni.PICE_TAUP_INTERCEPTS[1],
+    )
+    assert farms_dni.PICE_TAUP_LINEAR[1][index[0]] == 0.5
+
+
 if __name__ == "__main__":
     execute_pytest(__file__)
@@ -0,0 +1,43 @@
+"""
+PyTest file for the FARMS import path.
+"""
+
+import subprocess
+import sys
+
+from farms.utilities import execute_pytest
+
+COMPUTE_MODULES = (
+    'farms.farms',
+    'farms.farms_dni',
+    'farms.utilities',
+    'farms.lut',
+    'farms.chunking',
+    'farms.shared',
+)
+
+
+def test_lightweight_import():
+    """Test that the compute modules do not import pandas or pytest."""
+    code = (
+        'import sys\n'
+        + ''.join('import {}\n'.format(m) for m in COMPUTE_MODULES)
+        + 'print(",".join(m for m in ("pandas", "pytest") '
+        'if m in sys.modules))'
+    )
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                         text=True, check=True)
+    assert out.stdout.strip() == ''
+
+
+def test_lazy_radius():
+    """Test the lazily loaded RADIUS table."""
+    from farms import RADIUS
+    from farms.utilities import radius_by_doy
+
+    assert len(RADIUS) == 366
+    assert (radius_by_doy()[RADIUS.index] == RADIUS['r'].values).all()
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
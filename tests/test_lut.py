@@ -0,0 +1,74 @@
+"""
+PyTest file for the FARMS lookup tables.
+"""
+
+import numpy as np
+from test_farms import make_inputs
+
+from farms import SOLAR_CONSTANT
+from farms.farms import farms
+from farms.lut import analytic_optics, cloud_optics, lut_error
+from farms.utilities import execute_pytest
+
+# Max absolute errors documented in farms.lut
+MAX_ERROR = {
+    'water': {'Tducld': 0.0047, 'Ruucld': 0.0001, 'Tddcld': 0.0032},
+    'ice': {'Tducld': 0.0134, 'Ruucld': 0.0001, 'Tddcld': 0.0366},
+}
+
+
+def test_lut_error():
+    """Test the LUT interpolation against the analytic parameterizations."""
+    errors = lut_error(n=100000, seed=1)
+    for phase, phase_errors in errors.items():
+        for var, error in phase_errors.items():
+            assert error <= MAX_ERROR[phase][var]
+
+
+def test_lut_outside_grid():
+    """Test that cells outside of the table grid match the analytic
+    parameterizations."""
+    rng = np.random.default_rng(2)
+    n = 1000
+    tau = rng.uniform(0, 160, n)
+    De = rng.uniform(160, 320, n)
+    cosz = np.cos(np.radians(rng.uniform(0, 89, n)))
+    tau[:100] = rng.uniform(160, 300, 100)
+    De[100:200] = rng.uniform(0.5, 2, 100)
+    cosz[200:300] = np.cos(np.radians(rng.uniform(89, 90, 100)))
+    for phase in (1, 2):
+        truth = analytic_optics(tau, De, cosz, phase)
+        test = cloud_optics(tau, De, cosz, np.full(n, phase))
+        for x, y in zip(truth, test):
+            assert np.allclose(x, y, rtol=1e-6, atol=1e-7, equal_nan=True)
+
+
+def test_farms_lut():
+    """Test FARMS with lut=True against the analytic FARMS."""
+    inputs = make_inputs()
+    truth = farms(**inputs)
+    test = farms(**inputs, lut=True)
+
+    # irradiance errors are bounded by the transmittance errors times F0
+    atol = 2 * SOLAR_CONSTANT * 0.0366
+    for x, y in zip(truth, test):
+        assert np.array_equal(np.isnan(x), np.isnan(y))
+        assert np.allclose(x, y, rtol=0, atol=atol, equal_nan=True)
+        assert np.nanmean(np.abs(x - y)) < 2
+
+
+def test_farms_lut_nan():
+    """Test that NaN cloud properties and solar zenith angles give the same
+    NaN outputs with lut=True as the analytic FARMS."""
+    inputs = make_inputs()
+    inputs['tau'][0, :4] = np.nan
+    inputs['cloud_effective_radius'][1, :4] = np.nan
+    inputs['solar_zenith_angle'][2, :4] = np.nan
+    truth = farms(**inputs)
+    test = farms(**inputs, lut=True)
+    for x, y in zip(truth, test):
+        assert np.array_equal(np.isnan(x), np.isnan(y))
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
@@ -0,0 +1,76 @@
+"""
+PyTest file for the counter-based random numbers and chunk-invariant cloud
+variability.
+"""
+
+import numpy as np
+import pytest
+
+from farms import CLOUD_TYPES
+from farms.philox import cell_random, philox4x32
+from farms.utilities import cloud_variability, execute_pytest
+
+
+@pytest.mark.parametrize(
+    ('counter', 'key', 'truth'),
+    [
+        ((0, 0, 0, 0), (0, 0),
+         (0x6627E8D5, 0xE169C58D, 0xBC57AC4C, 0x9B00DBD8)),
+        ((0xFFFFFFFF,) * 4, (0xFFFFFFFF,) * 2,
+         (0x408F276D, 0x41C83B0E, 0xA20BC7C6, 0x6D5451FD)),
+        ((0x243F6A88, 0x85A308D3, 0x13198A2E, 0x03707344),
+         (0xA4093822, 0x299F31D0),
+         (0xD16CFE09, 0x94FDCCEB, 0x5001E420, 0x24126EA1)),
+    ],
+)
+def test_philox_known_answers(counter, key, truth):
+    """Test Philox4x32-10 against the Random123 known-answer vectors."""
+    assert tuple(int(w) for w in philox4x32(counter, key)) == truth
+
+
+def test_cell_random():
+    """Test the distribution and cell keying of the random numbers."""
+    t, s = np.meshgrid(np.arange(1000), np.arange(200), indexing='ij')
+    for dtype in (np.float32, np.float64):
+        u = cell_random(t, s, 42, dtype=dtype)
+        assert u.dtype == dtype
+        assert u.min() >= 0 and u.max() < 1
+        assert np.isclose(u.mean(), 0.5, atol=0.01)
+        z = cell_random(t, s, 42, distribution='normal', dtype=dtype)
+        assert np.isclose(z.mean(), 0, atol=0.01)
+        assert np.isclose(z.std(), 1, atol=0.01)
+
+    assert cell_random(17, 3, 42) == cell_random(t, s, 42)[17, 3]
+    assert cell_random(17, 3, 42) != cell_random(17, 3, 43)
+    assert cell_random(17, 3, 42) != cell_random(3, 17, 42)
+
+
+@pytest.mark.parametrize('distribution', ['uniform', 'normal'])
+def test_chunk_invariant_variability(distribution):
+    """Test that philox cloud variability does not depend on chunking."""
+    rng = np.random.default_rng(0)
+    cs_irrad = rng.uniform(100, 1000, (100, 30))
+    irrad = cs_irrad * rng.uniform(0.1, 1, (100, 30))
+    cloud_type = rng.choice([0, 1, 3, 7], (100, 30))
+    kwargs = {'distribution': distribution, 'generator': 'philox'}
+
+    truth = cloud_variability(irrad.copy(), cs_irrad, cloud_type, **kwargs)
+    test = np.empty_like(truth)
+    for i in range(0, 100, 33):
+        for j in range(0, 30, 7):
+            block = (slice(i, i + 33), slice(j, j + 7))
+            test[block] = cloud_variability(
+                irrad[block].copy(), cs_irrad[block], cloud_type[block],
+                index_offset=(i, j), **kwargs)
+
+    assert np.array_equal(truth, test)
+    clear = ~np.isin(cloud_type, CLOUD_TYPES)
+    assert np.array_equal(truth[clear], irrad[clear])
+    assert not np.array_equal(truth[~clear], irrad[~clear])
+
+    with pytest.raises(ValueError, match='generator'):
+        cloud_variability(irrad, cs_irrad, cloud_type, generator='mt')
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
@@ -0,0 +1,51 @@
+"""
+PyTest file for the FARMS stage timing instrumentation.
+"""
+
+import json
+
+import numpy as np
+from test_farms import make_inputs
+
+from farms import ICE_TYPES, WATER_TYPES, profiling
+from farms.farms import farms
+from farms.profiling import StageTimer, stage
+from farms.utilities import execute_pytest
+
+
+def test_stage_timer(tmpdir):
+    """Test the per-stage timings of farms()."""
+    inputs = make_inputs()
+    calls = []
+    with StageTimer(callback=lambda *args: calls.append(args)) as timer:
+        farms(**inputs)
+        farms(**inputs)
+
+    stages = timer.to_dict()
+    expected = ('validation', 'classify', 'water_phase', 'ice_phase',
+                'irradiance', 'farms_dni', 'scale_tau', 'narrow_beam',
+                'TDDP', 'Pwater', 'Pice', 'TDD2', 'nan_mask')
+    assert set(stages) == set(expected)
+    assert len(calls) == 2 * len(expected)
+    assert all(stats['calls'] == 2 for stats in stages.values())
+    assert stages['irradiance']['cells'] == 2 * inputs['tau'].size
+    n_water = np.isin(inputs['cloud_type'], WATER_TYPES).sum()
+    n_ice = np.isin(inputs['cloud_type'], ICE_TYPES).sum()
+    assert stages['water_phase']['cells'] == 2 * n_water
+    assert stages['Pice']['cells'] == 2 * n_ice
+    assert stages['farms_dni']['seconds'] >= stages['TDDP']['seconds']
+
+    fpath = str(tmpdir.join('timing.json'))
+    assert json.loads(timer.to_json(fpath)) == stages
+    with open(fpath) as f:
+        assert json.load(f) == stages
+
+    # timing is disabled outside of the StageTimer context
+    assert profiling._TIMER is None
+    assert stage('farms', inputs['tau']) is profiling._NULL_STAGE
+    farms(**inputs)
+    assert timer.to_dict() == stages
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
@@ -0,0 +1,99 @@
+"""
+PyTest file for the REST2 clear-sky transmittances.
+"""
+
+import numpy as np
+
+from farms.farms import farms
+from farms.rest2 import (
+    _angle_terms,
+    rest2,
+    rest2_irradiance,
+    tuuclr_quadrature,
+)
+from farms.utilities import calc_beta, execute_pytest
+
+
+def make_rest2_inputs(shape=(48, 20), seed=0):
+    """Make a dict of random but physically plausible REST2 inputs."""
+    rng = np.random.default_rng(seed)
+    return {
+        'solar_zenith_angle': rng.uniform(0, 89, shape),
+        'pressure': rng.uniform(700, 1013.25, shape),
+        'ozone': rng.uniform(0.2, 0.45, shape),
+        'w': rng.uniform(0.1, 5, shape),
+        'aod': rng.uniform(0.01, 0.8, shape),
+        'alpha': rng.uniform(0, 2.5, shape),
+        'ssa': rng.uniform(0.8, 0.99, shape),
+    }
+
+
+def test_rest2():
+    """Test the REST2 transmittance ranges and angular behavior."""
+    inputs = make_rest2_inputs()
+    out = rest2(**inputs)
+    for arr in out:
+        assert arr.shape == (48, 20)
+        assert np.isfinite(arr).all()
+        assert (arr >= 0).all() and (arr <= 1).all()
+
+    out32 = rest2(**inputs, dtype='float32')
+    inputs32 = {k: v.astype(np.float32) for k, v in inputs.items()}
+    for arr in (*out32, *rest2(**inputs32)):
+        assert arr.dtype == np.float32
+    for x, y in zip(out, out32):
+        assert np.allclose(x, y, rtol=0, atol=1e-5)
+
+    sza = np.arange(0, 90, 5.0)
+    tuu, ruu, tdd, tdu = rest2(sza, 1013.25, 0.3, 1.5, 0.1, 1.3, 0.92)
+    assert (np.diff(tdd) < 0).all()
+    assert np.allclose(tuu, tuu[0]) and np.allclose(ruu, ruu[0])
+    assert tdd[-1] < tuu[0] < tdd[0]
+
+    ghi, dni, dhi = rest2_irradiance(sza[:1], 1.0, 0.2, ruu[:1], tdd[:1],
+                                     tdu[:1])
+    assert 900 < dni[0] < 1100
+    assert 950 < ghi[0] < 1150
+    assert np.allclose(ghi, dni + dhi)
+
+
+def test_tuuclr_quadrature():
+    """Test the fixed-node Tuuclr quadrature against a dense rule and a
+    per-angle integration of Tddclr."""
+    inputs = make_rest2_inputs()
+    beta = calc_beta(inputs['aod'], inputs['alpha'])
+    terms = _angle_terms(inputs['ozone'], inputs['w'], 0.0002,
+                         inputs['alpha'], beta)
+    p_ratio = inputs['pressure'] / 1013.25
+
+    truth = tuuclr_quadrature(terms, p_ratio, n_nodes=256)
+    assert np.allclose(tuuclr_quadrature(terms, p_ratio), truth, rtol=0,
+                       atol=5e-5)
+
+    z = np.arange(0.05, 90, 0.1)
+    dz = np.radians(0.1)
+    tdd = [rest2(zi, inputs['pressure'], inputs['ozone'], inputs['w'],
+                 inputs['aod'], inputs['alpha'], inputs['ssa'])[2]
+           for zi in z]
+    riemann = sum(2 * t * np.cos(np.radians(zi)) * np.sin(np.radians(zi))
+                  * dz for t, zi in zip(tdd, z))
+    assert np.allclose(riemann, truth, rtol=0, atol=1e-4)
+
+
+def test_rest2_farms():
+    """Test that rest2() feeds farms() and that FARMS without cloud optical
+    depth reproduces the REST2 clear-sky ghi."""
+    inputs = make_rest2_inputs(shape=(24, 5))
+    clear = rest2(**inputs)
+    sza = inputs['solar_zenith_angle']
+    radius = np.ones_like(sza)
+    albedo = np.full_like(sza, 0.2)
+    ghi, _, _ = farms(np.zeros_like(sza), np.full(sza.shape, 3),
+                      np.full_like(sza, 10), sza, radius, *clear, albedo)
+
+    truth, _, _ = rest2_irradiance(sza, radius, albedo, *clear[1:])
+    assert np.allclose(ghi, truth, rtol=1e-6)
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
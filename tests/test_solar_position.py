@@ -0,0 +1,96 @@
+"""
+PyTest file for the vectorized solar position algorithm.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from farms.solar_position import (
+    mean_cos_zenith,
+    mean_solar_zenith_angle,
+    solar_time_terms,
+    solar_zenith_angle,
+)
+from farms.utilities import execute_pytest
+
+
+def test_spa_reference():
+    """Test against the SPA reference example (Reda and Andreas, 2008,
+    table A5.1)."""
+    ti = pd.DatetimeIndex(['2003-10-17 12:30:30']).tz_localize('Etc/GMT+7')
+    terms = solar_time_terms(ti, delta_t=67)
+    assert np.allclose(terms['alpha'], 202.22741, rtol=0, atol=1e-5)
+    assert np.allclose(terms['delta'], -9.31434, rtol=0, atol=1e-5)
+    assert np.allclose(terms['radius'], 0.9965422974, rtol=0, atol=1e-9)
+
+    sza = solar_zenith_angle(ti, 39.742476, -105.1786, 1830.14,
+                             pressure=820, temperature=11, delta_t=67)
+    assert sza.shape == (1, 1)
+    assert np.allclose(sza, 50.11162, rtol=0, atol=1e-5)
+
+
+def test_solar_zenith_angle():
+    """Test the (time, sites) broadcasting, time term reuse, and agreement
+    with the pvlib SPA."""
+    ti = pd.date_range('2019-01-01', periods=24 * 30, freq='h')
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-70, 70, 8)
+    lon = rng.uniform(-180, 180, 8)
+    elevation = rng.uniform(0, 3000, 8)
+
+    sza = solar_zenith_angle(ti, lat, lon, elevation)
+    assert sza.shape == (len(ti), 8)
+    assert np.isfinite(sza).all()
+
+    terms = solar_time_terms(ti)
+    for i in range(8):
+        site = solar_zenith_angle(ti, lat[i], lon[i], elevation[i],
+                                  time_terms=terms)
+        assert np.allclose(site[:, 0], sza[:, i], rtol=0, atol=1e-10)
+
+    pvlib = pytest.importorskip('pvlib')
+    for i in range(8):
+        truth = pvlib.solarposition.spa_python(
+            ti, lat[i], lon[i], elevation[i], delta_t=64.797)
+        assert np.allclose(truth['apparent_zenith'], sza[:, i], rtol=0,
+                           atol=1e-6)
+        truth = truth['zenith'].values
+        geometric = solar_zenith_angle(ti, lat[i], lon[i], elevation[i],
+                                       refraction=False)
+        assert np.allclose(truth, geometric[:, 0], rtol=0, atol=1e-6)
+
+
+def test_mean_cos_zenith():
+    """Test the analytic period average against 1-minute quadrature of the
+    instantaneous zenith angle, including polar day and night."""
+    ti = pd.date_range('2019-03-01', periods=24 * 120, freq='h')
+    rng = np.random.default_rng(1)
+    lat = np.append(rng.uniform(-60, 60, 4), [80, -85])
+    lon = rng.uniform(-180, 180, 6)
+
+    for label, offset in (('start', '30min'), ('center', '0min'),
+                          ('end', '-30min')):
+        mean_cos = mean_cos_zenith(ti, lat, lon, period='1h', label=label)
+        sub = pd.date_range(ti[0] - pd.Timedelta('29min 30s'),
+                            periods=len(ti) * 60, freq='min')
+        sub += pd.Timedelta(offset)
+        cos = np.cos(np.radians(solar_zenith_angle(sub, lat, lon,
+                                                   refraction=False)))
+        truth = np.maximum(cos, 0).reshape(len(ti), 60, -1).mean(axis=1)
+        assert mean_cos.shape == truth.shape
+        assert np.allclose(mean_cos, truth, rtol=0, atol=2e-4)
+
+    # a very short period converges to the instantaneous zenith angle
+    sza = mean_solar_zenith_angle(ti, lat, lon, period='1s')
+    truth = solar_zenith_angle(ti, lat, lon, refraction=False)
+    assert np.allclose(sza, np.minimum(truth, 90), rtol=0, atol=0.05)
+
+    with pytest.raises(ValueError):
+        mean_cos_zenith(ti, lat, lon, label='middle')
+    with pytest.raises(ValueError):
+        mean_cos_zenith(ti, lat, lon, period='2D')
+
+
+if __name__ == "__main__":
+    execute_pytest(__file__)
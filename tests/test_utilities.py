@@ -8,8 +8,18 @@ Created on June 7th 2019.
 """
 
 import numpy as np
+import pandas as pd
 
-from farms.utilities import execute_pytest, rayleigh
+from farms import CLEAR_TYPES, CLOUD_TYPES, ICE_TYPES, WATER_TYPES, utilities
+from farms.utilities import (
+    classify_cloud_type,
+    cloud_variability,
+    execute_pytest,
+    merge_rest_farms,
+    rayleigh,
+    ti_to_radius,
+    ti_to_radius_csv,
+)
 
 RTOL = 0.001
 ATOL = 0.001
@@ -48,5 +58,108 @@ def test_rayleigh():
     assert np.array_equal(fill_flag, fill_out)
 
 
+def test_ti_to_radius():
+    """Test the earth-sun radius vector against the SPA reference example
+    (Reda and Andreas, 2008, table A5.1) and the radius cache."""
+    ti = pd.DatetimeIndex(['2003-10-17 19:30:30'])
+    radius = ti_to_radius(ti, n_cols=3)
+    assert radius.shape == (1, 3)
+    assert np.allclose(radius, 0.9965422974, rtol=0, atol=1e-7)
+
+    ti = pd.date_range('2015-01-01', '2016-01-01', freq='1h')
+    truth = ti_to_radius(ti)
+    assert np.allclose(truth.min(), 0.9833, atol=1e-4)
+    assert np.allclose(truth.max(), 1.0167, atol=1e-4)
+
+    n_cached = len(utilities._RADIUS_CACHE['jme'])
+    radius = ti_to_radius(ti[::-1][:100])
+    assert len(utilities._RADIUS_CACHE['jme']) == n_cached
+    assert np.array_equal(radius, truth[::-1][:100])
+
+
+def test_radius_broadcast():
+    """Test the zero-copy broadcast radius outputs."""
+    ti = pd.date_range('2016-01-01', '2017-01-01', freq='1D')
+    for func in (ti_to_radius, ti_to_radius_csv):
+        truth = func(ti, n_cols=4)
+        radius = func(ti, n_cols=4, broadcast=True)
+        assert radius.shape == truth.shape == (len(ti), 4)
+        assert np.array_equal(radius, truth)
+        assert radius.strides[1] == 0
+        assert not radius.flags.writeable
+
+    radius = ti_to_radius_csv(ti)
+    assert np.allclose(radius[[0, 365], 0], [0.98331, 0.98331])
+    assert np.allclose(radius, ti_to_radius(ti), atol=5e-4)
+
+
+def test_cloud_variability_dtype():
+    """Test the float32 cloud variability against float64."""
+    rng = np.random.default_rng(0)
+    cs_irrad = rng.uniform(100, 1000, (100, 10))
+    irrad = cs_irrad * rng.uniform(0.1, 1, (100, 10))
+    cloud_type = rng.choice([0, 3, 7], (100, 10))
+    clear = cloud_type == 0
+
+    for distribution in ('uniform', 'normal'):
+        # the philox random numbers only differ by the float32 rounding, so
+        # float32 matches float64 to ~1e-7
+        truth = cloud_variability(irrad.copy(), cs_irrad, cloud_type,
+                                  distribution=distribution,
+                                  generator='philox')
+        test = cloud_variability(irrad, cs_irrad, cloud_type,
+                                 distribution=distribution, dtype='float32',
+                                 generator='philox')
+        assert test.dtype == np.float32
+        assert irrad.dtype == np.float64
+        assert np.allclose(test, truth, rtol=1e-5, atol=0)
+        assert np.allclose(test[clear], irrad[clear], rtol=1e-6)
+
+        # numpy draws float32 legacy random numbers from other bits of the
+        # bit generator than float64, so only the clear cells and the
+        # variability bounds are comparable
+        truth = cloud_variability(irrad.copy(), cs_irrad, cloud_type,
+                                  distribution=distribution)
+        test = cloud_variability(irrad, cs_irrad, cloud_type,
+                                 distribution=distribution, dtype='float32')
+        assert test.dtype == np.float32
+        assert np.allclose(test[clear], truth[clear], rtol=1e-6)
+        assert np.allclose(test, irrad, rtol=0.2)
+        assert np.allclose(truth, irrad, rtol=0.2)
+
+
+def test_classify_cloud_type():
+    """Test the cloud type category lookup against np.isin."""
+    cloud_type = np.arange(-20, 20).reshape(4, 10)
+    category = classify_cloud_type(cloud_type)
+    assert category.dtype == np.int8
+    assert category.shape == cloud_type.shape
+    for types, code in ((WATER_TYPES, 1), (ICE_TYPES, 2), (CLEAR_TYPES, 3)):
+        assert np.array_equal(category == code, np.isin(cloud_type, types))
+
+    other = ~np.isin(cloud_type, CLEAR_TYPES + CLOUD_TYPES)
+    assert (category[other] == 0).all()
+    assert np.array_equal(classify_cloud_type(cloud_type.astype(float)),
+                          category)
+    assert classify_cloud_type(np.array([np.nan]))[0] == 0
+
+    cloud_type = np.arange(-20, 20, 0.1)
+    category = classify_cloud_type(cloud_type)
+    for types, code in ((WATER_TYPES, 1), (ICE_TYPES, 2), (CLEAR_TYPES, 3)):
+        assert np.array_equal(category == code, np.isin(cloud_type, types))
+    category = classify_cloud_type(np.array([3.7, 6.5, 0.2, 3.0, 6.0]))
+    assert np.array_equal(category, [0, 0, 0, 1, 2])
+    assert (classify_cloud_type(np.array([np.inf, -np.inf])) == 0).all()
+
+    cloud_type = np.arange(-20, 20).reshape(4, 10)
+    category = classify_cloud_type(cloud_type)
+    clearsky = np.ones(cloud_type.shape)
+    cloudy = np.zeros(cloud_type.shape)
+    truth = merge_rest_farms(clearsky, cloudy, cloud_type)
+    test = merge_rest_farms(clearsky, cloudy, None, category=category)
+    assert np.array_equal(truth, np.isin(cloud_type, CLEAR_TYPES))
+    assert np.array_equal(truth, test)
+
+
 if __name__ == "__main__":
     execute_pytest(__file__)